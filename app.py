@@ -1,4 +1,8 @@
-from flask import Flask, jsonify, request
+# Início da inicialização do worker (métrica de startup)
+import time
+STARTUP_STARTED = time.perf_counter()
+
+from flask import Flask, jsonify, request, g
 from flask_cors import CORS
 import os
 import requests
@@ -7,10 +11,31 @@ import secrets
 import re
 import sqlite3
 import json
-from datetime import datetime, timedelta
+import hmac
+import threading
+from functools import wraps
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as futures_wait
+from werkzeug.test import EnvironBuilder
+from werkzeug.exceptions import HTTPException
 from telegram_mock import get_mock_validation, generate_mock_uuid
+from static_responses import static_responses
+from jobs import JobQueue
+from scheduler import GroupRefreshScheduler
+from user_versions import UserDataVersions
+from optimizations import init_optimizations, metrics_collector, performance_optimizer, rate_limiter, LRUCache
+from json_provider import FastJSONProvider
+from db_profiler import query_profiler, ProfiledConnection
+from sampling_profiler import sampling_profiler, ProfilerBusy
+from tracing import tracer, TraceSink, INTERNAL_REQUEST_KEY
+from long_poll import KeyedWaiters
+from db_maintenance import DatabaseMaintenanceScheduler
+from password_hashing import PasswordHasher, HashingBusy
+from session_tokens import SessionTokens, InvalidToken, load_or_create_secret
+from expiring_store import ExpiringDict, ExpirySweeper
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
 
 # Configuração para produção
@@ -21,15 +46,25 @@ else:
 
 # Banco de dados simples em memória para usuários
 users_db = {}
-verification_codes = {}
-password_reset_tokens = {}
+
+# Cadastros e resets abandonados expiram sozinhos (timing wheel + varredura em background)
+expiry_sweeper = ExpirySweeper(interval=int(os.environ.get('EXPIRY_SWEEP_INTERVAL', 30)))
+verification_codes = expiry_sweeper.register(ExpiringDict('verification_codes', ttl=30 * 60))
+password_reset_tokens = expiry_sweeper.register(ExpiringDict('password_reset_tokens', ttl=60 * 60))
 
 # Banco de dados SQLite para persistência Telegram
 DATABASE_PATH = 'nexocrypto_telegram.db'
 
+# Incrementar sempre que o DDL de init_telegram_db mudar
+SCHEMA_VERSION = 4
+
+# Fast-start: pula o DDL se o schema já está na versão atual, tira VACUUM/ANALYZE
+# da inicialização e aquece os caches em background
+FAST_START = os.environ.get('FAST_START', '1') == '1'
+
 def init_telegram_db():
     """Inicializa banco de dados para Telegram"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
     cursor = conn.cursor()
     
     # Tabela de usuários Telegram validados
@@ -87,14 +122,233 @@ def init_telegram_db():
         )
     ''')
     
+    # Versão dos dados de cada usuário (usada como ETag)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_data_versions (
+            uuid TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    # Conta que gerou cada UUID de validação (checagem de dono nas rotas com UUID)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS telegram_uuid_owners (
+            uuid TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Tabela de jobs em background (sobrevive a reinícios de worker)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS background_jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            payload TEXT,
+            progress INTEGER DEFAULT 0,
+            message TEXT,
+            result TEXT,
+            error TEXT,
+            attempts INTEGER DEFAULT 0,
+            worker_pid INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            owner TEXT
+        )
+    ''')
+    
+    # Bancos anteriores à versão 4 não têm o dono do job
+    job_columns = {row[1] for row in cursor.execute('PRAGMA table_info(background_jobs)')}
+    if 'owner' not in job_columns:
+        cursor.execute('ALTER TABLE background_jobs ADD COLUMN owner TEXT')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_background_jobs_status
+        ON background_jobs (status, updated_at)
+    ''')
+    
+    # Revogações de tokens de sessão (logout e troca de senha)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT UNIQUE NOT NULL,
+            revoked_before INTEGER NOT NULL DEFAULT 0,
+            expires REAL NOT NULL
+        )
+    ''')
+    
+    cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    
     conn.commit()
     conn.close()
 
+def schema_is_current():
+    """Verifica a versão do schema com uma única consulta"""
+    try:
+        conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
+        try:
+            return conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+
 # Inicializar banco na inicialização
-init_telegram_db()
+if not (FAST_START and schema_is_current()):
+    init_telegram_db()
+
+# Cache, compressão, headers e métricas
+init_optimizations(app, DATABASE_PATH, factory=ProfiledConnection)
+
+# Profiling de SQL: X-DB-Queries/X-DB-Time em debug, log de consultas lentas e N+1
+query_profiler.slow_threshold = float(os.environ.get('DB_SLOW_QUERY_MS', 50)) / 1000
+query_profiler.repeat_threshold = int(os.environ.get('DB_REPEAT_THRESHOLD', 5))
+query_profiler.max_queries = int(os.environ.get('DB_MAX_QUERIES', 25))
+query_profiler.init_app(app, log_path=os.environ.get('DB_SLOW_QUERY_LOG', f"{DATABASE_PATH}.slow-queries.log"))
+
+# Tracing de requisição, SQLite e HTTP (traces amostrados em arquivo rotativo por worker)
+tracer.sample_rate = float(os.environ.get('TRACE_SAMPLE_RATE', 0.05))
+tracer.sink = TraceSink(
+    os.environ.get('TRACE_DIR', f"{DATABASE_PATH}.traces"),
+    batch_size=int(os.environ.get('TRACE_BATCH_SIZE', 50))
+)
+tracer.init_app(app)
+
+# Fila de jobs para operações lentas do userbot
+job_queue = JobQueue(
+    DATABASE_PATH,
+    factory=ProfiledConnection,
+    max_attempts=int(os.environ.get('JOB_MAX_ATTEMPTS', 3)),
+    retention=int(os.environ.get('JOB_RETENTION_SECONDS', 7 * 24 * 3600))
+)
+
+# Versões por usuário para respostas condicionais (ETag/304)
+user_versions = UserDataVersions(
+    DATABASE_PATH,
+    sync_interval=float(os.environ.get('USER_VERSION_SYNC_INTERVAL', 1.0)),
+    factory=ProfiledConnection
+)
+
+# Cache negativo da validação: uuid -> versão em que não estava validado no banco.
+# Enquanto a versão do usuário não muda, o polling não consulta o SQLite
+validation_negative_cache = LRUCache(
+    max_bytes=4 * 1024 * 1024,
+    default_timeout=float(os.environ.get('VALIDATION_NEGATIVE_TTL', 2))
+)
+
+# Long-poll de validação (/api/telegram/wait-validation)
+WAIT_VALIDATION_MAX_TIMEOUT = 30
+WAIT_VALIDATION_POLL_INTERVAL = float(os.environ.get('WAIT_VALIDATION_POLL_INTERVAL', 1.0))
+validation_waiters = KeyedWaiters(max_waiters=int(os.environ.get('WAIT_VALIDATION_MAX_WAITERS', 200)))
 
 # URL da API Telegram
-TELEGRAM_API_URL = "https://5002-iqrmmohoou2pzfnpp8zc0-6721939a.manusvm.computer/api"
+TELEGRAM_API_URL = os.environ.get('TELEGRAM_API_URL', "https://5002-iqrmmohoou2pzfnpp8zc0-6721939a.manusvm.computer/api")
+
+# Dados mock servidos como respostas estáticas pré-codificadas
+FALLBACK_SIGNALS = [
+    {
+        'id': 1,
+        'pair': 'BTCUSDT',
+        'direction': 'LONG',
+        'entry': 115000,
+        'currentPrice': 115045,
+        'targets': [118500, 122000, 128000],
+        'stopLoss': 110500,
+        'confidence': 89,
+        'timeframe': '1D',
+        'status': 'active',
+        'created': '07/08/2025 - 22:30',
+        'analysis': 'BTC testando resistência em $115K com volume institucional forte.',
+        'source': 'NexoCrypto IA'
+    },
+    {
+        'id': 2,
+        'pair': 'ETHUSDT',
+        'direction': 'LONG',
+        'entry': 3675,
+        'currentPrice': 3674,
+        'targets': [3850, 4100, 4400],
+        'stopLoss': 3450,
+        'confidence': 82,
+        'timeframe': '4H',
+        'status': 'active',
+        'created': '07/08/2025 - 22:15',
+        'analysis': 'ETH rompeu $3700 com força. Empresas públicas acumulando ETH.'
+    }
+]
+
+GEMS_DATA = [
+    {
+        'id': 1,
+        'name': 'Bitcoin Hyper',
+        'symbol': 'BTHYP',
+        'rating': 5,
+        'potential': '1000%+',
+        'category': 'Layer-2',
+        'description': 'Layer-2 em presale com backing institucional'
+    },
+    {
+        'id': 2,
+        'name': 'Biconomy',
+        'symbol': 'BICO',
+        'rating': 4,
+        'potential': '500%+',
+        'category': 'Web3',
+        'description': 'Web3 com backing Coinbase - Target $5+'
+    }
+]
+
+NEWS_DATA = [
+    {
+        'id': 1,
+        'title': 'SEC aprova resgates in-kind para ETFs',
+        'impact': 8.5,
+        'sentiment': 'BULLISH',
+        'timestamp': '07/08/2025 - 22:45',
+        'description': 'Decisão histórica facilita operações institucionais'
+    },
+    {
+        'id': 2,
+        'title': 'Empresas públicas acumulam ETH',
+        'impact': 7.8,
+        'sentiment': 'BULLISH',
+        'timestamp': '07/08/2025 - 22:30',
+        'description': 'Movimento massivo de adoção corporativa'
+    }
+]
+
+DEMO_GROUPS_DATA = [
+    {
+        'id': 'demo_1',
+        'name': 'Binance Killers VIP',
+        'type': 'group',
+        'members': 12500,
+        'signals_count': 0,
+        'source': 'demo'
+    },
+    {
+        'id': 'demo_2', 
+        'name': 'Crypto Signals Pro',
+        'type': 'group',
+        'members': 8750,
+        'signals_count': 0,
+        'source': 'demo'
+    }
+]
+
+def register_static_responses():
+    """Pré-serializa as respostas estáticas (chamar novamente se o conteúdo mudar)"""
+    static_responses.register('signals_fallback', FALLBACK_SIGNALS)
+    static_responses.register('gems', GEMS_DATA)
+    static_responses.register('news', NEWS_DATA)
+    static_responses.register('demo_groups', {
+        'success': True,
+        'groups': DEMO_GROUPS_DATA,
+        'total': len(DEMO_GROUPS_DATA)
+    })
+
+register_static_responses()
 
 def format_brazilian_date(date_str):
     """Converte data para formato brasileiro"""
@@ -114,9 +368,91 @@ def format_brazilian_date(date_str):
     except:
         return datetime.now().strftime('%d/%m/%Y - %H:%M')
 
+# Campos aceitos em ?fields= (campo da resposta -> colunas necessárias)
+SIGNAL_FIELDS = (
+    'id', 'pair', 'direction', 'entry', 'currentPrice', 'targets', 'stopLoss',
+    'confidence', 'timeframe', 'status', 'created', 'analysis', 'source'
+)
+
+CAPTURED_SIGNAL_FIELDS = (
+    'id', 'group_name', 'signal_type', 'pair', 'entry_price', 'take_profit',
+    'stop_loss', 'timestamp', 'status'
+)
+
+# user-groups responde com a lista montada em memória (as linhas do banco só
+# decidem se os grupos demo são semeados), então ?fields= ali corta só o payload
+GROUP_FIELDS = (
+    'id', 'name', 'type', 'is_monitored', 'signals_count', 'last_signal',
+    'added_at', 'status'
+)
+
+AVAILABLE_GROUP_FIELD_COLUMNS = {
+    'id': ('group_id',),
+    'name': ('group_name',),
+    'type': ('group_type',),
+    # telegram_groups não guarda o número de membros: sai sempre 0
+    'members': (),
+    'signals_count': ('signals_count',),
+    'username': ('group_name',),
+    'is_monitored': (),
+    'last_signal': (),
+    'source': ()
+}
+
+def parse_fields_param(allowed):
+    """Lê ?fields=a,b,c e retorna os campos válidos pedidos (None = todos)"""
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+    
+    fields = [f.strip() for f in raw.split(',') if f.strip() in allowed]
+    return tuple(dict.fromkeys(fields)) or None
+
+def select_columns(fields, field_columns, required=()):
+    """Monta a lista de colunas do SELECT para os campos pedidos"""
+    wanted = field_columns.keys() if fields is None else fields
+    columns = list(required)
+    for field in wanted:
+        columns.extend(field_columns.get(field, ()))
+    return ', '.join(dict.fromkeys(columns))
+
+def project_fields(data, fields):
+    """Mantém apenas os campos pedidos (em um item ou lista de itens)"""
+    if not fields:
+        return data
+    if isinstance(data, dict):
+        return {k: data[k] for k in fields if k in data}
+    return [{k: item[k] for k in fields if k in item} for item in data]
+
+# KDF das senhas em pool dedicado (parâmetros ajustáveis por ambiente)
+password_hasher = PasswordHasher(
+    algorithm=os.environ.get('PASSWORD_HASH_ALGORITHM', 'pbkdf2_sha256'),
+    iterations=int(os.environ.get('PASSWORD_HASH_ITERATIONS', 600_000)),
+    scrypt_n=int(os.environ.get('PASSWORD_SCRYPT_N', 2 ** 14)),
+    workers=int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None,
+    max_queue=int(os.environ.get('PASSWORD_HASH_QUEUE', 32)),
+    queue_timeout=float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2.0))
+)
+
 def hash_password(password):
-    """Hash da senha usando SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash da senha com o KDF configurado (HashingBusy se o pool estiver cheio)"""
+    return password_hasher.hash(password)
+
+def hashing_busy_response():
+    """503 imediato quando a fila de hashing está cheia"""
+    response = jsonify({'error': 'Servidor ocupado, tente novamente em instantes'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+def issue_session_token(user_id, plan):
+    """Campos de token da resposta de login"""
+    token, expires_at = session_tokens.issue(user_id, plan)
+    return {
+        'token': token,
+        'token_type': 'Bearer',
+        'expires_at': datetime.fromtimestamp(expires_at).isoformat()
+    }
 
 def generate_verification_code():
     """Gera código de verificação de 6 dígitos"""
@@ -153,6 +489,277 @@ def home():
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Métricas de latência por endpoint no formato Prometheus"""
+    return app.response_class(metrics_collector.render_prometheus() + expiry_sweeper.render_prometheus(),
+                              content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# Tokens de sessão assinados (segredo compartilhado pelos workers do host)
+session_tokens = SessionTokens(
+    os.environ.get('SESSION_TOKEN_SECRET') or load_or_create_secret(f"{DATABASE_PATH}.token-secret"),
+    db_path=DATABASE_PATH,
+    ttl=int(os.environ.get('SESSION_TOKEN_TTL', 24 * 3600)),
+    factory=ProfiledConnection
+)
+
+# Com AUTH_REQUIRED=0 (padrão durante a migração do frontend) requisições sem
+# token seguem anônimas; AUTH_REQUIRED=1 passa a exigir o token
+AUTH_REQUIRED = os.environ.get('AUTH_REQUIRED', '0') == '1'
+
+# Planos que acessam qualquer UUID (login administrativo e aquecimento interno)
+UUID_OWNER_EXEMPT_PLANS = {'admin', 'internal'}
+
+# uuid -> user_id do dono (o dono de um UUID nunca muda)
+uuid_owner_cache = LRUCache(max_bytes=2 * 1024 * 1024, default_timeout=3600)
+
+def authenticate_request():
+    """Valida o Bearer token (claims em g.auth); retorna a resposta de erro ou None"""
+    g.auth = None
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    try:
+        if scheme.lower() != 'bearer' or not token.strip():
+            raise InvalidToken('Token de acesso obrigatório')
+        g.auth = session_tokens.verify(token.strip())
+    except InvalidToken as e:
+        if not AUTH_REQUIRED:
+            return None
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 401, {'WWW-Authenticate': 'Bearer'}
+    return None
+
+def uuid_owner(uuid_code):
+    """user_id da conta que gerou o UUID (None para UUIDs anônimos ou anteriores ao registro de dono)"""
+    owner = uuid_owner_cache.get(uuid_code, None)
+    if owner is not None:
+        return owner
+    
+    conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
+    try:
+        row = conn.execute('SELECT user_id FROM telegram_uuid_owners WHERE uuid = ?',
+                           (uuid_code,)).fetchone()
+    finally:
+        conn.close()
+    
+    if row is None:
+        return None
+    uuid_owner_cache.set(uuid_code, row[0], size=len(uuid_code) + len(row[0]) + 64)
+    return row[0]
+
+def authorize_uuid(uuid_code):
+    """403 se o token (g.auth) não for do dono do UUID; None se o acesso é permitido
+
+    Limitações: UUIDs gerados sem token (AUTH_REQUIRED=0) ou antes do registro de
+    dono não têm dono conhecido e seguem acessíveis a qualquer token válido; e
+    com AUTH_REQUIRED=0 requisições anônimas não são checadas.
+    """
+    claims = g.get('auth')
+    if not uuid_code or not isinstance(uuid_code, str) or claims is None:
+        return None
+    if claims['plan'] in UUID_OWNER_EXEMPT_PLANS:
+        return None
+    
+    owner = uuid_owner(uuid_code)
+    if owner is not None and owner != claims['user_id']:
+        return jsonify({
+            'success': False,
+            'error': 'UUID pertence a outra conta'
+        }), 403
+    return None
+
+def current_user_id():
+    """user_id do token da requisição (None para requisições anônimas)"""
+    claims = g.get('auth')
+    return claims['user_id'] if claims else None
+
+def job_visible(job):
+    """Job só é visível para quem o enfileirou (jobs anônimos: para quem tem o id)"""
+    if job['owner'] is None:
+        return True
+    claims = g.get('auth')
+    if claims is None:
+        return False
+    return claims['plan'] in UUID_OWNER_EXEMPT_PLANS or claims['user_id'] == job['owner']
+
+def request_uuid(view_args):
+    """UUID alvo da requisição: parâmetro <uuid_code> da rota ou campo uuid do JSON"""
+    uuid_code = view_args.get('uuid_code')
+    if uuid_code is None and request.is_json:
+        uuid_code = (request.get_json(silent=True) or {}).get('uuid')
+    return uuid_code
+
+def require_auth(f):
+    """Exige um token de sessão válido no header Authorization e, nas rotas
+    com UUID, que o token seja da conta dona do UUID"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        error = authenticate_request()
+        if error is None:
+            error = authorize_uuid(request_uuid(kwargs))
+        if error is not None:
+            return error
+        return f(*args, **kwargs)
+    # Marca usada pelo asgi.py nas views assíncronas
+    decorated_function.auth_required = True
+    return decorated_function
+
+# Token das rotas administrativas (sem token configurado elas ficam desativadas)
+ADMIN_API_TOKEN = os.environ.get('ADMIN_API_TOKEN', '')
+
+def admin_required(f):
+    """Exige o header X-Admin-Token igual a ADMIN_API_TOKEN"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = request.headers.get('X-Admin-Token', '')
+        if not ADMIN_API_TOKEN or not hmac.compare_digest(token.encode(), ADMIN_API_TOKEN.encode()):
+            return jsonify({
+                'success': False,
+                'error': 'Acesso administrativo negado'
+            }), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+@app.route('/api/admin/profile', methods=['POST'])
+@admin_required
+def sample_profile():
+    """Inicia a amostragem das pilhas deste worker por N segundos (job em background)
+
+    A coleta roda numa thread da fila de jobs: o worker continua atendendo
+    requisições (inclusive com gunicorn sync, de uma thread só) enquanto é
+    amostrado. O resultado fica em /api/admin/profile/<job_id>.
+    """
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('interval_ms', 5)) / 1000
+        
+        if sampling_profiler.lock.locked():
+            return jsonify({
+                'success': False,
+                'error': 'Já existe uma coleta em andamento neste worker'
+            }), 409
+        
+        job_id = job_queue.submit('sampling_profile', {
+            'seconds': seconds,
+            'interval': interval
+        })
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'pid': os.getpid(),
+            'status_url': f'/api/admin/profile/{job_id}'
+        }), 202
+        
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Parâmetros seconds/interval_ms inválidos'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/admin/profile/<job_id>', methods=['GET'])
+@admin_required
+def get_profile_result(job_id):
+    """Estado/resultado de uma coleta (formato folded para flamegraph com ?format=folded)"""
+    try:
+        job = job_queue.get(job_id)
+        
+        if not job or job['kind'] != 'sampling_profile':
+            return jsonify({
+                'success': False,
+                'error': 'Coleta não encontrada'
+            }), 404
+        
+        if request.args.get('format') == 'folded' and job['status'] == 'completed':
+            return app.response_class(sampling_profiler.to_folded_text(job['result']),
+                                      content_type='text/plain; charset=utf-8')
+        
+        job.pop('owner')
+        return jsonify({
+            'success': True,
+            **job
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@job_queue.register('sampling_profile')
+def run_sampling_profile_job(payload, progress):
+    """Job: amostra as pilhas do worker que recebeu o pedido"""
+    try:
+        result = sampling_profiler.profile(payload['seconds'], payload['interval'])
+    except ProfilerBusy:
+        raise RuntimeError('Já existe uma coleta em andamento neste worker')
+    return {'pid': os.getpid(), **result}
+
+@app.route('/api/admin/db-maintenance')
+@admin_required
+def db_maintenance_stats():
+    """Tamanho, fragmentação e contadores da manutenção do banco"""
+    try:
+        return jsonify({
+            'success': True,
+            'maintenance': db_maintenance.get_stats()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/admin/db-maintenance/convert-incremental', methods=['POST'])
+@admin_required
+def db_convert_incremental():
+    """Converte o banco para auto_vacuum=INCREMENTAL (VACUUM completo, bloqueia escritas)"""
+    try:
+        return jsonify({
+            'success': True,
+            'conversion': db_maintenance.convert_to_incremental()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/admin/traces')
+@admin_required
+def recent_slow_traces():
+    """Traces recentes mais lentos (de todos os workers deste host)"""
+    try:
+        min_ms = float(request.args.get('min_ms', 500))
+        limit = min(int(request.args.get('limit', 20)), 200)
+        
+        traces = tracer.sink.recent(min_duration_ms=min_ms, limit=limit)
+        return jsonify({
+            'success': True,
+            'sample_rate': tracer.sample_rate,
+            'traces': traces,
+            'total': len(traces)
+        })
+        
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Parâmetros min_ms/limit inválidos'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/health')
 def health_check():
     return jsonify({
@@ -162,126 +769,89 @@ def health_check():
         'uptime': 'active'
     })
 
-@app.route('/api/signals')
-def get_signals():
+# Sinais do upstream ficam no cache compartilhado (memória + disco) por alguns segundos
+SIGNALS_CACHE_KEY = 'telegram:signals:CRP-DEFAULT'
+SIGNALS_CACHE_TTL = int(os.environ.get('SIGNALS_CACHE_TTL', 15))
+
+def fetch_telegram_signals():
+    """Busca sinais na API Telegram; None em caso de falha (não vai para o cache)"""
     try:
         # Tenta buscar sinais reais da API Telegram
-        response = requests.get(f"{TELEGRAM_API_URL}/signals/CRP-DEFAULT", timeout=5)
+        with tracer.span('telegram_api.signals', kind='http'):
+            response = requests.get(f"{TELEGRAM_API_URL}/signals/CRP-DEFAULT",
+                                    headers=tracer.outbound_headers(), timeout=5)
         if response.status_code == 200:
-            telegram_signals = response.json().get('signals', [])
-            
-            # Converte sinais do Telegram para formato do frontend
-            converted_signals = []
-            for signal in telegram_signals:
-                converted_signals.append({
-                    'id': len(converted_signals) + 1,
-                    'pair': signal.get('symbol', 'UNKNOWN'),
-                    'direction': signal.get('direction', 'UNKNOWN'),
-                    'entry': signal.get('entry_price', 0),
-                    'currentPrice': signal.get('entry_price', 0) * 1.001,  # Simula pequena variação
-                    'targets': [
-                        signal.get('take_profit_1', 0),
-                        signal.get('take_profit_2', 0),
-                        signal.get('take_profit_3', 0)
-                    ],
-                    'stopLoss': signal.get('stop_loss', 0),
-                    'confidence': int(signal.get('confidence_score', 0.75) * 100),
-                    'timeframe': '4H',
-                    'status': 'active',
-                    'created': format_brazilian_date(signal.get('processed_at', '')),
-                    'analysis': f'Sinal capturado do grupo {signal.get("source", "Telegram")}',
-                    'source': signal.get('source', 'Telegram Bot')
-                })
-            
-            # Se há sinais do Telegram, usa eles
-            if converted_signals:
-                return jsonify(converted_signals)
+            return response.json().get('signals', [])
     except Exception as e:
         print(f"Erro ao buscar sinais do Telegram: {e}")
+    return None
+
+@app.route('/api/signals')
+@require_auth
+def get_signals():
+    # Só um worker do host consulta o upstream quando a entrada expira
+    telegram_signals, computed = performance_optimizer.cache.get_or_compute(
+        SIGNALS_CACHE_KEY, fetch_telegram_signals,
+        timeout=SIGNALS_CACHE_TTL, cacheable=lambda signals: signals is not None
+    )
+    if computed:
+        metrics_collector.record_cache_miss()
+    else:
+        metrics_collector.record_cache_hit()
+    
+    return build_signals_response(telegram_signals or [])
+
+@tracer.traced()
+def build_signals_response(telegram_signals):
+    """Monta a resposta de /api/signals (compartilhado com o modo ASGI)"""
+    fields = parse_fields_param(SIGNAL_FIELDS)
+    
+    try:
+        # Converte sinais do Telegram para formato do frontend
+        converted_signals = []
+        for signal in telegram_signals:
+            converted_signals.append({
+                'id': len(converted_signals) + 1,
+                'pair': signal.get('symbol', 'UNKNOWN'),
+                'direction': signal.get('direction', 'UNKNOWN'),
+                'entry': signal.get('entry_price', 0),
+                'currentPrice': signal.get('entry_price', 0) * 1.001,  # Simula pequena variação
+                'targets': [
+                    signal.get('take_profit_1', 0),
+                    signal.get('take_profit_2', 0),
+                    signal.get('take_profit_3', 0)
+                ],
+                'stopLoss': signal.get('stop_loss', 0),
+                'confidence': int(signal.get('confidence_score', 0.75) * 100),
+                'timeframe': '4H',
+                'status': 'active',
+                'created': format_brazilian_date(signal.get('processed_at', '')),
+                'analysis': f'Sinal capturado do grupo {signal.get("source", "Telegram")}',
+                'source': signal.get('source', 'Telegram Bot')
+            })
+        
+        # Se há sinais do Telegram, usa eles
+        if converted_signals:
+            return jsonify(project_fields(converted_signals, fields))
+    except Exception as e:
+        print(f"Erro ao converter sinais do Telegram: {e}")
     
     # Fallback para dados mock se API Telegram não estiver disponível
-    signals = [
-        {
-            'id': 1,
-            'pair': 'BTCUSDT',
-            'direction': 'LONG',
-            'entry': 115000,
-            'currentPrice': 115045,
-            'targets': [118500, 122000, 128000],
-            'stopLoss': 110500,
-            'confidence': 89,
-            'timeframe': '1D',
-            'status': 'active',
-            'created': '07/08/2025 - 22:30',
-            'analysis': 'BTC testando resistência em $115K com volume institucional forte.',
-            'source': 'NexoCrypto IA'
-        },
-        {
-            'id': 2,
-            'pair': 'ETHUSDT',
-            'direction': 'LONG',
-            'entry': 3675,
-            'currentPrice': 3674,
-            'targets': [3850, 4100, 4400],
-            'stopLoss': 3450,
-            'confidence': 82,
-            'timeframe': '4H',
-            'status': 'active',
-            'created': '07/08/2025 - 22:15',
-            'analysis': 'ETH rompeu $3700 com força. Empresas públicas acumulando ETH.'
-        }
-    ]
-    return jsonify(signals)
+    if fields:
+        return jsonify(project_fields(FALLBACK_SIGNALS, fields))
+    return static_responses.respond('signals_fallback')
 
 @app.route('/api/gems')
 def get_gems():
-    # Dados mock das gems
-    gems = [
-        {
-            'id': 1,
-            'name': 'Bitcoin Hyper',
-            'symbol': 'BTHYP',
-            'rating': 5,
-            'potential': '1000%+',
-            'category': 'Layer-2',
-            'description': 'Layer-2 em presale com backing institucional'
-        },
-        {
-            'id': 2,
-            'name': 'Biconomy',
-            'symbol': 'BICO',
-            'rating': 4,
-            'potential': '500%+',
-            'category': 'Web3',
-            'description': 'Web3 com backing Coinbase - Target $5+'
-        }
-    ]
-    return jsonify(gems)
+    return static_responses.respond('gems')
 
 @app.route('/api/news')
 def get_news():
-    # Dados mock das notícias
-    news = [
-        {
-            'id': 1,
-            'title': 'SEC aprova resgates in-kind para ETFs',
-            'impact': 8.5,
-            'sentiment': 'BULLISH',
-            'timestamp': '07/08/2025 - 22:45',
-            'description': 'Decisão histórica facilita operações institucionais'
-        },
-        {
-            'id': 2,
-            'title': 'Empresas públicas acumulam ETH',
-            'impact': 7.8,
-            'sentiment': 'BULLISH',
-            'timestamp': '07/08/2025 - 22:30',
-            'description': 'Movimento massivo de adoção corporativa'
-        }
-    ]
-    return jsonify(news)
+    return static_responses.respond('news')
 
 @app.route('/api/telegram/generate-uuid', methods=['POST'])
+@rate_limiter.rate_limit('api')
+@require_auth
 def generate_telegram_uuid():
     """Gera UUID para validação Telegram"""
     try:
@@ -299,6 +869,17 @@ def generate_telegram_uuid():
             'username': None
         }
         
+        # Dono do UUID: só esta conta acessa as rotas do UUID depois
+        if g.get('auth'):
+            conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
+            try:
+                conn.execute('INSERT INTO telegram_uuid_owners (uuid, user_id) VALUES (?, ?)',
+                             (new_uuid, g.auth['user_id']))
+                conn.commit()
+            finally:
+                conn.close()
+        user_versions.bump(new_uuid)
+        
         return jsonify({
             'success': True,
             'uuid': new_uuid,
@@ -329,11 +910,11 @@ def validate_telegram_uuid():
             }), 400
         
         # Conecta ao banco de dados
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
         cursor = conn.cursor()
         
         # Verifica se UUID já existe
-        cursor.execute('SELECT * FROM telegram_users WHERE user_uuid = ?', (uuid_code,))
+        cursor.execute('SELECT * FROM telegram_users WHERE uuid = ?', (uuid_code,))
         existing_user = cursor.fetchone()
         
         if existing_user:
@@ -342,7 +923,7 @@ def validate_telegram_uuid():
                 UPDATE telegram_users 
                 SET telegram_id = ?, username = ?, first_name = ?, last_name = ?, 
                     phone_number = ?, validated_at = CURRENT_TIMESTAMP, is_active = TRUE
-                WHERE user_uuid = ?
+                WHERE uuid = ?
             ''', (telegram_id, username, first_name, last_name, phone_number, uuid_code))
         else:
             # Insere novo usuário
@@ -351,7 +932,11 @@ def validate_telegram_uuid():
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (uuid_code, telegram_id, username, first_name, last_name, phone_number))
         
+        version = user_versions.bump(uuid_code, cursor)
         conn.commit()
+        user_versions.bump_committed(uuid_code, version)
+        performance_optimizer.invalidate_user(uuid_code)
+        validation_negative_cache.delete(uuid_code)
         
         # Grupos reais serão gerados internamente
         # Não precisa de userbot externo - funcionalidade integrada
@@ -367,6 +952,7 @@ def validate_telegram_uuid():
             'telegram_id': telegram_id,
             'validated_at': datetime.now()
         }
+        validation_waiters.notify(uuid_code)
         
         return jsonify({
             'success': True,
@@ -380,59 +966,117 @@ def validate_telegram_uuid():
             'error': str(e)
         }), 500
 
-@app.route('/api/telegram/check-validation/<uuid_code>', methods=['GET'])
-def check_telegram_validation(uuid_code):
-    """Verifica validação do UUID Telegram com persistência"""
+def lookup_validation(uuid_code):
+    """Estado de validação do UUID (compartilhado por check- e wait-validation)"""
     try:
-        # Primeiro verifica no banco de dados
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT user_uuid, username, validated_at, is_active 
-            FROM telegram_users 
-            WHERE user_uuid = ? AND is_active = 1
-        ''', (uuid_code,))
-        
-        user_data = cursor.fetchone()
-        conn.close()
-        
-        if user_data:
-            return jsonify({
-                'success': True,
-                'validated': True,
-                'username': user_data[1],
-                'validated_at': user_data[2]
-            })
+        # Primeiro verifica no banco de dados (a menos que já se saiba que não está lá)
+        version = user_versions.get(uuid_code)
+        if validation_negative_cache.get(uuid_code, None) != version:
+            conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT uuid, username, validated_at, is_active 
+                FROM telegram_users 
+                WHERE uuid = ? AND is_active = 1
+            ''', (uuid_code,))
+            
+            user_data = cursor.fetchone()
+            conn.close()
+            
+            if user_data:
+                return {
+                    'success': True,
+                    'validated': True,
+                    'username': user_data[1],
+                    'validated_at': user_data[2]
+                }
+            
+            validation_negative_cache.set(uuid_code, version, size=len(uuid_code) + 64)
         
         # Fallback para memória (compatibilidade)
         if not hasattr(app, 'telegram_uuids'):
             app.telegram_uuids = {}
         
         if uuid_code not in app.telegram_uuids:
-            return jsonify({
+            return {
                 'success': False,
                 'validated': False,
                 'error': 'UUID não encontrado'
-            })
+            }
         
         uuid_data = app.telegram_uuids[uuid_code]
         
-        return jsonify({
+        return {
             'success': True,
             'validated': uuid_data['validated'],
             'username': uuid_data.get('username'),
             'validated_at': uuid_data.get('validated_at').isoformat() if uuid_data.get('validated_at') else None
-        })
+        }
         
     except Exception as e:
-        return jsonify({
+        return {
             'success': False,
             'validated': False,
             'error': str(e)
-        })
+        }
+
+@app.route('/api/telegram/check-validation/<uuid_code>', methods=['GET'])
+@rate_limiter.rate_limit('api')
+@require_auth
+@user_versions.conditional('validation')
+def check_telegram_validation(uuid_code):
+    """Verifica validação do UUID Telegram com persistência"""
+    return jsonify(lookup_validation(uuid_code))
+
+def parse_wait_timeout():
+    """?timeout= em segundos, limitado a WAIT_VALIDATION_MAX_TIMEOUT"""
+    timeout = float(request.args.get('timeout', WAIT_VALIDATION_MAX_TIMEOUT))
+    return min(max(timeout, 0), WAIT_VALIDATION_MAX_TIMEOUT)
+
+@app.route('/api/telegram/wait-validation/<uuid_code>', methods=['GET'])
+@rate_limiter.rate_limit('api')
+@require_auth
+def wait_telegram_validation(uuid_code):
+    """Long-poll: responde assim que o UUID for validado (ou ao fim do timeout)"""
+    try:
+        timeout = parse_wait_timeout()
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'timeout inválido'
+        }), 400
+    
+    result = lookup_validation(uuid_code)
+    if result['validated'] or timeout == 0 or not validation_waiters.try_acquire():
+        # Worker no limite de esperas: responde na hora, como check-validation
+        return jsonify({**result, 'timed_out': not result['validated']})
+    
+    try:
+        deadline = time.monotonic() + timeout
+        version = user_versions.get(uuid_code)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            
+            # Validações neste worker notificam na hora; as feitas em outros
+            # workers aparecem como mudança na versão do usuário
+            notified = validation_waiters.wait(uuid_code, min(remaining, WAIT_VALIDATION_POLL_INTERVAL))
+            current = user_versions.get(uuid_code)
+            if notified or current != version:
+                version = current
+                result = lookup_validation(uuid_code)
+                if result['validated']:
+                    break
+    finally:
+        validation_waiters.release()
+    
+    return jsonify({**result, 'timed_out': not result['validated']})
 
 @app.route('/api/telegram/disconnect', methods=['POST'])
+@rate_limiter.rate_limit('api')
+@require_auth
 def disconnect_telegram():
     """Desconecta usuário do Telegram"""
     try:
@@ -451,6 +1095,7 @@ def disconnect_telegram():
         if uuid_code in app.telegram_uuids:
             # Remove UUID da memória
             del app.telegram_uuids[uuid_code]
+            user_versions.bump(uuid_code)
         
         return jsonify({
             'success': True,
@@ -464,17 +1109,20 @@ def disconnect_telegram():
         }), 500
 
 @app.route('/api/telegram/user-groups/<uuid_code>', methods=['GET'])
+@rate_limiter.rate_limit('api')
+@require_auth
+@user_versions.conditional('groups')
 def get_telegram_groups(uuid_code):
     """Retorna grupos conectados do usuário"""
     try:
         # Verifica se usuário está validado no banco
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
         cursor = conn.cursor()
         
         cursor.execute('''
             SELECT uuid, username, telegram_id 
             FROM telegram_users 
-            WHERE user_uuid = ? AND is_active = 1
+            WHERE uuid = ? AND is_active = 1
         ''', (uuid_code,))
         
         user_data = cursor.fetchone()
@@ -488,6 +1136,9 @@ def get_telegram_groups(uuid_code):
             })
         
         # Busca grupos do usuário (prioriza grupos reais)
+        fields = parse_fields_param(GROUP_FIELDS)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
         cursor.execute('''
             SELECT group_id, group_name, group_type, is_monitored, 
                    signals_count, last_signal_at, added_at, source
@@ -500,8 +1151,9 @@ def get_telegram_groups(uuid_code):
         
         groups_data = cursor.fetchall()
         
-        # Se não há grupos reais, adiciona grupos demo
-        if not any(len(groups_data) > 0 and group[7] == 'userbot_real' for group in groups_data):
+        # Se o usuário ainda não tem grupos, adiciona grupos demo (uma vez só:
+        # telegram_groups não tem chave única, então o INSERT OR IGNORE não deduplica)
+        if not groups_data:
             demo_groups = [
                 ('demo_binance_killers', 'Binance Killers VIP', 'supergroup', False, 12, None, 'demo'),
                 ('demo_crypto_signals', 'Crypto Signals Pro', 'group', False, 8, None, 'demo'),
@@ -515,7 +1167,9 @@ def get_telegram_groups(uuid_code):
                     VALUES (?, ?, ?, ?, ?, ?, ?)
                 ''', (uuid_code, demo_group[0], demo_group[1], demo_group[2], demo_group[3], demo_group[4], demo_group[6]))
             
+            version = user_versions.bump(uuid_code, cursor)
             conn.commit()
+            user_versions.bump_committed(uuid_code, version)
             
             # Recarrega grupos após adicionar demos
             cursor.execute('''
@@ -534,16 +1188,17 @@ def get_telegram_groups(uuid_code):
         
         # Formata grupos para resposta
         groups = []
-        for group in groups_data:
+        for row in groups_data:
+            group = dict(zip(row.keys(), row))
             groups.append({
-                'id': group[0],
-                'name': group[1],
-                'type': group[2],
-                'is_monitored': bool(group[3]),
-                'signals_count': group[4] or 0,
-                'last_signal': group[5],
-                'source': group[7] if len(group) > 7 else 'demo',
-                'isDemo': len(group) <= 7 or group[7] != 'userbot_real'  # Marca como demo se não for userbot_real
+                'id': group.get('group_id'),
+                'name': group.get('group_name'),
+                'type': group.get('group_type'),
+                'is_monitored': bool(group.get('is_monitored')),
+                'signals_count': group.get('signals_count') or 0,
+                'last_signal': group.get('last_signal_at'),
+                'source': group['source'],
+                'isDemo': group['source'] != 'userbot_real'  # Marca como demo se não for userbot_real
             })
         
         # Se não há grupos, gera grupos reais simulados internamente
@@ -587,7 +1242,7 @@ def get_telegram_groups(uuid_code):
             
             return jsonify({
                 'success': True,
-                'groups': real_groups,
+                'groups': project_fields(real_groups, fields),
                 'source': 'userbot_real'
             })
             
@@ -627,7 +1282,7 @@ def get_telegram_groups(uuid_code):
         
         return jsonify({
             'success': True,
-            'groups': groups,
+            'groups': project_fields(groups, fields),
             'total_groups': len(groups),
             'monitored_groups': len([g for g in groups if g['is_monitored']])
         })
@@ -640,6 +1295,8 @@ def get_telegram_groups(uuid_code):
         }), 500
 
 @app.route('/api/telegram/toggle-group-monitoring', methods=['POST'])
+@rate_limiter.rate_limit('api')
+@require_auth
 def toggle_group_monitoring():
     """Ativa/desativa monitoramento de um grupo"""
     try:
@@ -655,11 +1312,11 @@ def toggle_group_monitoring():
             }), 400
         
         # Conecta ao banco de dados
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
         cursor = conn.cursor()
         
         # Verifica se usuário existe
-        cursor.execute('SELECT user_uuid FROM telegram_users WHERE user_uuid = ? AND is_active = 1', (uuid_code,))
+        cursor.execute('SELECT uuid FROM telegram_users WHERE uuid = ? AND is_active = 1', (uuid_code,))
         if not cursor.fetchone():
             conn.close()
             return jsonify({
@@ -674,8 +1331,11 @@ def toggle_group_monitoring():
             VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
         ''', (uuid_code, group_id, f"Grupo {group_id}", is_monitored))
         
+        version = user_versions.bump(uuid_code, cursor)
         conn.commit()
+        user_versions.bump_committed(uuid_code, version)
         conn.close()
+        performance_optimizer.invalidate_user(uuid_code)
         
         return jsonify({
             'success': True,
@@ -700,6 +1360,7 @@ def toggle_group_monitoring():
 # Endpoints de Autenticação
 
 @app.route('/api/auth/register', methods=['POST'])
+@rate_limiter.rate_limit('auth')
 def register():
     """Endpoint para cadastro de usuário"""
     try:
@@ -760,10 +1421,13 @@ def register():
             'sms_code': sms_code       # Para teste
         })
         
+    except HashingBusy:
+        return hashing_busy_response()
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
 @app.route('/api/auth/verify', methods=['POST'])
+@rate_limiter.rate_limit('auth')
 def verify_codes():
     """Endpoint para verificar códigos de validação"""
     try:
@@ -776,17 +1440,11 @@ def verify_codes():
         if not all([temp_user_id, email_code, sms_code]):
             return jsonify({'error': 'Dados incompletos'}), 400
         
-        # Verifica se existe
-        if temp_user_id not in verification_codes:
+        # Verifica se existe (entradas expiram após 30 minutos)
+        verification_data = verification_codes.get(temp_user_id)
+        if verification_data is None:
             return jsonify({'error': 'Sessão inválida ou expirada'}), 400
         
-        verification_data = verification_codes[temp_user_id]
-        
-        # Verifica se não expirou (30 minutos)
-        if datetime.now() - verification_data['created_at'] > timedelta(minutes=30):
-            del verification_codes[temp_user_id]
-            return jsonify({'error': 'Códigos expirados'}), 400
-        
         # Verifica códigos
         if (email_code == verification_data['email_code'] and 
             sms_code == verification_data['sms_code']):
@@ -807,7 +1465,7 @@ def verify_codes():
             }
             
             # Remove dados temporários
-            del verification_codes[temp_user_id]
+            verification_codes.pop(temp_user_id)
             
             return jsonify({
                 'success': True,
@@ -821,6 +1479,7 @@ def verify_codes():
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
 @app.route('/api/auth/login', methods=['POST'])
+@rate_limiter.rate_limit('auth')
 def login():
     """Endpoint para login"""
     try:
@@ -849,31 +1508,51 @@ def login():
                         'email': admin['email'],
                         'plan': 'admin'
                     },
-                    'token': 'admin_token'
+                    **issue_session_token('admin', 'admin')
                 })
         
-        # Verifica usuários cadastrados
-        if email in users_db:
-            user = users_db[email]
-            if user['password_hash'] == hash_password(password):
-                return jsonify({
-                    'success': True,
-                    'message': 'Login realizado com sucesso',
-                    'user': {
-                        'id': user['id'],
-                        'name': user['name'],
-                        'email': user['email'],
-                        'plan': user['plan']
-                    },
-                    'token': secrets.token_urlsafe(32)
-                })
+        # Verifica usuários cadastrados (e-mail inexistente custa o mesmo tempo)
+        user = users_db.get(email)
+        if password_hasher.verify(password, user['password_hash'] if user else None):
+            if password_hasher.needs_rehash(user['password_hash']):
+                user['password_hash'] = hash_password(password)
+            return jsonify({
+                'success': True,
+                'message': 'Login realizado com sucesso',
+                'user': {
+                    'id': user['id'],
+                    'name': user['name'],
+                    'email': user['email'],
+                    'plan': user['plan']
+                },
+                **issue_session_token(user['id'], user['plan'])
+            })
         
         return jsonify({'error': 'Credenciais inválidas'}), 401
         
+    except HashingBusy:
+        return hashing_busy_response()
+    except Exception as e:
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@app.route('/api/auth/logout', methods=['POST'])
+@require_auth
+def logout():
+    """Revoga o token da sessão atual"""
+    try:
+        if g.auth:
+            session_tokens.revoke(g.auth)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Logout realizado com sucesso'
+        })
+        
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
 @app.route('/api/auth/forgot-password', methods=['POST'])
+@rate_limiter.rate_limit('auth')
 def forgot_password():
     """Endpoint para recuperação de senha"""
     try:
@@ -911,6 +1590,7 @@ def forgot_password():
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
 @app.route('/api/auth/reset-password', methods=['POST'])
+@rate_limiter.rate_limit('auth')
 def reset_password():
     """Endpoint para redefinir senha"""
     try:
@@ -925,22 +1605,18 @@ def reset_password():
         if len(new_password) < 8:
             return jsonify({'error': 'Senha deve ter pelo menos 8 caracteres'}), 400
         
-        # Verifica token
-        if reset_token not in password_reset_tokens:
-            return jsonify({'error': 'Token inválido'}), 400
-        
-        token_data = password_reset_tokens[reset_token]
-        
-        # Verifica se não expirou (1 hora)
-        if datetime.now() - token_data['created_at'] > timedelta(hours=1):
-            del password_reset_tokens[reset_token]
-            return jsonify({'error': 'Token expirado'}), 400
+        # Verifica token (entradas expiram após 1 hora)
+        token_data = password_reset_tokens.get(reset_token)
+        if token_data is None:
+            return jsonify({'error': 'Token inválido ou expirado'}), 400
         
         # Atualiza senha
         email = token_data['email']
         if email in users_db:
             users_db[email]['password_hash'] = hash_password(new_password)
-            del password_reset_tokens[reset_token]
+            password_reset_tokens.pop(reset_token)
+            # Sessões abertas com a senha antiga deixam de valer
+            session_tokens.revoke_user(users_db[email]['id'])
             
             return jsonify({
                 'success': True,
@@ -949,11 +1625,15 @@ def reset_password():
         else:
             return jsonify({'error': 'Usuário não encontrado'}), 404
             
+    except HashingBusy:
+        return hashing_busy_response()
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
 # Integração com UserBot para grupos reais - Solução Alternativa
 @app.route('/api/telegram/start-userbot-session', methods=['POST'])
+@rate_limiter.rate_limit('api')
+@require_auth
 def start_userbot_session():
     """Inicia sessão do userbot para capturar grupos reais - Versão Alternativa"""
     try:
@@ -967,40 +1647,88 @@ def start_userbot_session():
                 'error': 'UUID e número de telefone são obrigatórios'
             }), 400
         
-        # Simula processo de autenticação bem-sucedido
-        # Gera grupos realistas baseados no telefone
-        import random
-        import time
+        # Captura roda em background; cliente acompanha pelo job
+        job_id = job_queue.submit('userbot_session', {
+            'uuid': uuid_code,
+            'phone_number': phone_number
+        }, owner=current_user_id())
         
-        # Simula delay de processamento
-        time.sleep(2)
-        
-        # Gera grupos realistas para o usuário
-        realistic_groups = generate_realistic_groups_for_user(phone_number)
+        return jsonify({
+            'success': True,
+            'status': 'queued',
+            'message': 'Captura de grupos iniciada',
+            'job_id': job_id,
+            'status_url': f'/api/telegram/jobs/{job_id}'
+        }), 202
+            
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erro ao capturar grupos: {str(e)}'
+        }), 500
+
+@job_queue.register('userbot_session')
+def run_userbot_session_job(payload, progress):
+    """Job: simula autenticação do userbot e captura grupos reais"""
+    import time
+    
+    uuid_code = payload['uuid']
+    phone_number = payload['phone_number']
+    
+    # Simula delay de processamento
+    progress(10, 'Autenticando sessão')
+    time.sleep(2)
+    
+    # Gera grupos realistas para o usuário
+    progress(60, 'Capturando grupos')
+    realistic_groups = generate_realistic_groups_for_user(phone_number)
+    
+    # Salva grupos no banco de dados
+    progress(80, 'Salvando grupos')
+    save_user_real_groups(uuid_code, phone_number, realistic_groups)
+    
+    return {
+        'success': True,
+        'status': 'authorized',
+        'message': 'Grupos reais capturados com sucesso!',
+        'groups_count': len(realistic_groups),
+        'user': {
+            'phone': phone_number,
+            'groups_found': len(realistic_groups)
+        }
+    }
+
+@app.route('/api/telegram/jobs/<job_id>', methods=['GET'])
+@rate_limiter.rate_limit('api')
+@require_auth
+def get_job_status(job_id):
+    """Retorna progresso e resultado de um job em background"""
+    try:
+        job = job_queue.get(job_id)
         
-        # Salva grupos no banco de dados
-        save_user_real_groups(uuid_code, phone_number, realistic_groups)
+        # Job de outra conta (ou coleta do profiler) responde como inexistente
+        if not job or job['kind'] == 'sampling_profile' or not job_visible(job):
+            return jsonify({
+                'success': False,
+                'error': 'Job não encontrado'
+            }), 404
         
+        job.pop('owner')
         return jsonify({
             'success': True,
-            'status': 'authorized',
-            'message': 'Grupos reais capturados com sucesso!',
-            'groups_count': len(realistic_groups),
-            'user': {
-                'phone': phone_number,
-                'groups_found': len(realistic_groups)
-            }
+            **job
         })
-            
+        
     except Exception as e:
         return jsonify({
             'success': False,
-            'error': f'Erro ao capturar grupos: {str(e)}'
+            'error': str(e)
         }), 500
 
 def generate_realistic_groups_for_user(phone_number):
-    """Gera grupos realistas baseados no telefone do usuário"""
+    """Gera grupos realistas baseados no telefone do usuário (determinístico por telefone)"""
     import random
+    import zlib
     
     # Base de grupos realistas de trading
     realistic_groups_pool = [
@@ -1016,11 +1744,13 @@ def generate_realistic_groups_for_user(phone_number):
         {'name': 'Margin Trading Pro', 'type': 'supergroup', 'members': 6780}
     ]
     
-    # Seleciona 3-6 grupos aleatórios baseado no hash do telefone
-    phone_hash = hash(phone_number) % 1000
+    # Seleciona 3-6 grupos baseado no hash do telefone; crc32 e Random com semente
+    # dão o mesmo resultado em todo worker e reinício (ids estáveis entre chamadas)
+    phone_hash = zlib.crc32(str(phone_number).encode('utf-8')) % 1000
     num_groups = 3 + (phone_hash % 4)  # 3 a 6 grupos
+    rng = random.Random(phone_hash)
     
-    selected_groups = random.sample(realistic_groups_pool, min(num_groups, len(realistic_groups_pool)))
+    selected_groups = rng.sample(realistic_groups_pool, min(num_groups, len(realistic_groups_pool)))
     
     # Adiciona dados específicos para cada grupo
     for i, group in enumerate(selected_groups):
@@ -1028,7 +1758,7 @@ def generate_realistic_groups_for_user(phone_number):
             'id': f"real_{phone_hash}_{i}",
             'username': f"@{group['name'].lower().replace(' ', '_')}",
             'is_monitored': False,
-            'signals_count': random.randint(0, 25),
+            'signals_count': rng.randint(0, 25),
             'last_signal': None,
             'source': 'userbot_real'
         })
@@ -1038,7 +1768,7 @@ def generate_realistic_groups_for_user(phone_number):
 def save_user_real_groups(uuid_code, phone_number, groups):
     """Salva grupos reais do usuário no banco"""
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
         cursor = conn.cursor()
         
         # Remove grupos antigos do userbot para este usuário
@@ -1064,8 +1794,11 @@ def save_user_real_groups(uuid_code, phone_number, groups):
                 phone_number
             ))
         
+        version = user_versions.bump(uuid_code, cursor)
         conn.commit()
+        user_versions.bump_committed(uuid_code, version)
         conn.close()
+        performance_optimizer.invalidate_user(uuid_code)
         
         print(f"✅ Salvos {len(groups)} grupos reais para usuário {uuid_code}")
         
@@ -1073,7 +1806,71 @@ def save_user_real_groups(uuid_code, phone_number, groups):
         print(f"❌ Erro ao salvar grupos reais: {e}")
         raise e
 
+def merge_user_real_groups(uuid_code, phone_number, groups):
+    """Mescla grupos re-sincronizados com os já salvos, sem trocar ids
+    
+    Grupos existentes mantêm group_id, monitoramento e contagem de sinais;
+    grupos novos são inseridos; grupos monitorados nunca são removidos.
+    """
+    import zlib
+    
+    conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, group_id, group_name, is_monitored FROM telegram_groups 
+            WHERE user_uuid = ? AND source = 'userbot_real'
+        ''', (uuid_code,))
+        existing = {row[2]: row for row in cursor.fetchall()}
+        used_ids = {row[1] for row in existing.values()}
+        fetched_names = {group['name'] for group in groups}
+        
+        changed = 0
+        for group in groups:
+            row = existing.get(group['name'])
+            if row is not None:
+                cursor.execute('UPDATE telegram_groups SET group_type = ? WHERE id = ? AND group_type != ?',
+                               (group['type'], row[0], group['type']))
+                changed += cursor.rowcount
+                continue
+            
+            group_id = group['id']
+            if group_id in used_ids:
+                # id já pertence a outro grupo do usuário: id estável pelo nome
+                group_id = f"real_{zlib.crc32(group['name'].encode('utf-8')):08x}"
+            used_ids.add(group_id)
+            cursor.execute('''
+                INSERT INTO telegram_groups 
+                (user_uuid, group_id, group_name, group_type, is_monitored, signals_count, source, phone_number)
+                VALUES (?, ?, ?, ?, 0, ?, 'userbot_real', ?)
+            ''', (uuid_code, group_id, group['name'], group['type'], group['signals_count'], phone_number))
+            changed += 1
+        
+        # Grupos que sumiram: remove apenas os não monitorados
+        for name, row in existing.items():
+            if name not in fetched_names and not row[3]:
+                cursor.execute('DELETE FROM telegram_groups WHERE id = ?', (row[0],))
+                changed += 1
+        
+        version = user_versions.bump(uuid_code, cursor) if changed else None
+        conn.commit()
+    finally:
+        conn.close()
+    
+    if changed:
+        user_versions.bump_committed(uuid_code, version)
+        performance_optimizer.invalidate_user(uuid_code)
+    return changed
+
+def refresh_user_groups(uuid_code, phone_number):
+    """Re-sincroniza grupos do usuário preservando ids e monitoramento"""
+    groups = generate_realistic_groups_for_user(phone_number)
+    merge_user_real_groups(uuid_code, phone_number, groups)
+    return len(groups)
+
 @app.route('/api/userbot/verify-code', methods=['POST'])
+@rate_limiter.rate_limit('api')
+@require_auth
 def verify_userbot_code():
     """Verifica código de autorização do userbot - Versão Alternativa"""
     try:
@@ -1088,23 +1885,20 @@ def verify_userbot_code():
                 'error': 'UUID, telefone e código são obrigatórios'
             }), 400
         
-        # Simula verificação de código bem-sucedida
-        # Em um ambiente real, aqui verificaríamos o código com o Telegram
-        import time
-        time.sleep(1)  # Simula processamento
-        
-        # Gera grupos realistas para o usuário
-        realistic_groups = generate_realistic_groups_for_user(phone_number)
-        
-        # Salva grupos no banco de dados
-        save_user_real_groups(uuid_code, phone_number, realistic_groups)
+        # Verificação e captura de grupos rodam em background
+        job_id = job_queue.submit('userbot_verify_code', {
+            'uuid': uuid_code,
+            'phone_number': phone_number,
+            'code': code
+        }, owner=current_user_id())
         
         return jsonify({
             'success': True,
-            'status': 'authorized',
-            'message': 'Autorização bem-sucedida!',
-            'groups_count': len(realistic_groups)
-        })
+            'status': 'queued',
+            'message': 'Verificação iniciada',
+            'job_id': job_id,
+            'status_url': f'/api/telegram/jobs/{job_id}'
+        }), 202
             
     except Exception as e:
         return jsonify({
@@ -1112,12 +1906,42 @@ def verify_userbot_code():
             'error': f'Erro ao verificar código: {str(e)}'
         }), 500
 
+@job_queue.register('userbot_verify_code')
+def run_userbot_verify_code_job(payload, progress):
+    """Job: simula verificação do código e captura grupos reais"""
+    import time
+    
+    uuid_code = payload['uuid']
+    phone_number = payload['phone_number']
+    
+    # Simula verificação de código bem-sucedida
+    # Em um ambiente real, aqui verificaríamos o código com o Telegram
+    progress(10, 'Verificando código')
+    time.sleep(1)  # Simula processamento
+    
+    # Gera grupos realistas para o usuário
+    progress(60, 'Capturando grupos')
+    realistic_groups = generate_realistic_groups_for_user(phone_number)
+    
+    # Salva grupos no banco de dados
+    progress(80, 'Salvando grupos')
+    save_user_real_groups(uuid_code, phone_number, realistic_groups)
+    
+    return {
+        'success': True,
+        'status': 'authorized',
+        'message': 'Autorização bem-sucedida!',
+        'groups_count': len(realistic_groups)
+    }
+
 @app.route('/api/telegram/user-groups/<uuid_code>', methods=['GET'])
+@rate_limiter.rate_limit('api')
+@require_auth
 def get_user_groups_from_userbot(uuid_code):
     """Obtém grupos reais do usuário - Versão Alternativa"""
     try:
         # Retorna grupos salvos no banco de dados local
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -1153,6 +1977,8 @@ def get_user_groups_from_userbot(uuid_code):
         }), 500
 
 @app.route('/api/telegram/toggle-group-monitoring', methods=['POST'])
+@rate_limiter.rate_limit('api')
+@require_auth
 def toggle_group_monitoring_userbot():
     """Ativa/desativa monitoramento de grupo - Versão Alternativa"""
     try:
@@ -1168,7 +1994,7 @@ def toggle_group_monitoring_userbot():
             }), 400
         
         # Atualiza status no banco de dados local
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -1177,8 +2003,11 @@ def toggle_group_monitoring_userbot():
             WHERE user_uuid = ? AND group_id = ?
         ''', (is_monitored, uuid_code, group_id))
         
+        version = user_versions.bump(uuid_code, cursor)
         conn.commit()
+        user_versions.bump_committed(uuid_code, version)
         conn.close()
+        performance_optimizer.invalidate_user(uuid_code)
         
         return jsonify({
             'success': True,
@@ -1192,10 +2021,13 @@ def toggle_group_monitoring_userbot():
         }), 500
 
 @app.route('/api/telegram/captured-signals/<uuid_code>', methods=['GET'])
+@rate_limiter.rate_limit('api')
+@require_auth
 def get_captured_signals_from_userbot(uuid_code):
     """Obtém sinais capturados - Versão Alternativa"""
     try:
         limit = request.args.get('limit', 50, type=int)
+        fields = parse_fields_param(CAPTURED_SIGNAL_FIELDS)
         
         # Retorna sinais simulados para demonstração
         # Em um ambiente real, estes viriam do banco de dados de sinais capturados
@@ -1226,7 +2058,7 @@ def get_captured_signals_from_userbot(uuid_code):
         
         return jsonify({
             'success': True,
-            'signals': mock_signals[:limit],
+            'signals': project_fields(mock_signals[:limit], fields),
             'total': len(mock_signals)
         })
             
@@ -1237,6 +2069,8 @@ def get_captured_signals_from_userbot(uuid_code):
         }), 500
 
 @app.route('/api/telegram/userbot-status', methods=['GET'])
+@rate_limiter.rate_limit('api')
+@require_auth
 def get_userbot_status():
     """Obtém status do userbot - Versão Alternativa"""
     try:
@@ -1259,6 +2093,8 @@ def get_userbot_status():
         })
 
 @app.route('/api/telegram/verify-userbot-code', methods=['POST'])
+@rate_limiter.rate_limit('api')
+@require_auth
 def verify_telegram_userbot_code():
     """Verifica código de autorização do userbot - Endpoint Telegram"""
     try:
@@ -1278,7 +2114,7 @@ def verify_telegram_userbot_code():
         normalized_phone = re.sub(r'[^\d+]', '', phone_number)
         
         # Verifica se o telefone foi compartilhado com o bot
-        phone_validated = validate_phone_with_bot(normalized_phone)
+        phone_validated = is_phone_shared_with_bot(normalized_phone)
         
         if not phone_validated:
             return jsonify({
@@ -1293,32 +2129,19 @@ def verify_telegram_userbot_code():
                 'error': 'Código inválido. Digite um código válido recebido no Telegram'
             }), 400
         
-        # Simula processamento
-        import time
-        time.sleep(1)
-        
-        # Salva o usuário como validado
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        # Salva ou atualiza usuário validado
-        cursor.execute('''
-            INSERT OR REPLACE INTO telegram_users 
-            (uuid, phone_number, validated_at, is_active)
-            VALUES (?, ?, CURRENT_TIMESTAMP, TRUE)
-        ''', (uuid_code, normalized_phone))
-        
-        conn.commit()
-        conn.close()
-        
-        print(f"✅ Usuário {uuid_code} validado com telefone {normalized_phone}")
+        # Persistência roda em background; cliente acompanha pelo job
+        job_id = job_queue.submit('telegram_verify_code', {
+            'uuid': uuid_code,
+            'phone_number': normalized_phone
+        }, owner=current_user_id())
         
         return jsonify({
             'success': True,
-            'status': 'authorized',
-            'message': 'Telefone validado com sucesso!',
-            'phone_validated': True
-        })
+            'status': 'queued',
+            'message': 'Validação do telefone iniciada',
+            'job_id': job_id,
+            'status_url': f'/api/telegram/jobs/{job_id}'
+        }), 202
             
     except Exception as e:
         print(f"❌ Erro ao verificar código: {e}")
@@ -1327,7 +2150,48 @@ def verify_telegram_userbot_code():
             'error': f'Erro ao verificar código: {str(e)}'
         }), 500
 
-def validate_phone_with_bot(phone_number):
+@job_queue.register('telegram_verify_code')
+def run_telegram_verify_code_job(payload, progress):
+    """Job: salva o usuário como validado pelo telefone"""
+    import time
+    
+    uuid_code = payload['uuid']
+    normalized_phone = payload['phone_number']
+    
+    # Simula processamento
+    progress(10, 'Validando telefone')
+    time.sleep(1)
+    
+    # Salva o usuário como validado
+    progress(60, 'Salvando usuário')
+    conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
+    cursor = conn.cursor()
+    
+    # Salva ou atualiza usuário validado
+    cursor.execute('''
+        INSERT OR REPLACE INTO telegram_users 
+        (uuid, phone_number, validated_at, is_active)
+        VALUES (?, ?, CURRENT_TIMESTAMP, TRUE)
+    ''', (uuid_code, normalized_phone))
+    
+    version = user_versions.bump(uuid_code, cursor)
+    conn.commit()
+    user_versions.bump_committed(uuid_code, version)
+    conn.close()
+    performance_optimizer.invalidate_user(uuid_code)
+    validation_negative_cache.delete(uuid_code)
+    validation_waiters.notify(uuid_code)
+    
+    print(f"✅ Usuário {uuid_code} validado com telefone {normalized_phone}")
+    
+    return {
+        'success': True,
+        'status': 'authorized',
+        'message': 'Telefone validado com sucesso!',
+        'phone_validated': True
+    }
+
+def is_phone_shared_with_bot(phone_number):
     """Valida se o telefone foi compartilhado com o bot"""
     try:
         # Simula validação com bot (em produção seria consulta real ao bot)
@@ -1358,33 +2222,12 @@ def validate_phone_with_bot(phone_number):
 
 # Endpoint para grupos demo (fallback)
 @app.route('/api/telegram/demo-groups', methods=['GET'])
+@rate_limiter.rate_limit('api')
+@require_auth
 def get_demo_groups():
     """Retorna grupos demo para fallback"""
     try:
-        demo_groups = [
-            {
-                'id': 'demo_1',
-                'name': 'Binance Killers VIP',
-                'type': 'group',
-                'members': 12500,
-                'signals_count': 0,
-                'source': 'demo'
-            },
-            {
-                'id': 'demo_2', 
-                'name': 'Crypto Signals Pro',
-                'type': 'group',
-                'members': 8750,
-                'signals_count': 0,
-                'source': 'demo'
-            }
-        ]
-        
-        return jsonify({
-            'success': True,
-            'groups': demo_groups,
-            'total': len(demo_groups)
-        })
+        return static_responses.respond('demo_groups')
         
     except Exception as e:
         return jsonify({
@@ -1393,17 +2236,23 @@ def get_demo_groups():
         }), 500
 
 @app.route('/api/telegram/available-groups/<uuid_code>', methods=['GET'])
+@rate_limiter.rate_limit('api')
+@require_auth
+@user_versions.conditional('available-groups')
+@performance_optimizer.cache_api_response(timeout=300, version=lambda uuid_code: user_versions.get(uuid_code))
 def get_available_groups(uuid_code):
     """Retorna grupos disponíveis para seleção do usuário"""
     try:
+        fields = parse_fields_param(AVAILABLE_GROUP_FIELD_COLUMNS)
+        
         # Verifica se usuário está validado
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
         cursor = conn.cursor()
         
         cursor.execute('''
             SELECT phone_number 
             FROM telegram_users 
-            WHERE user_uuid = ? AND is_active = 1
+            WHERE uuid = ? AND is_active = 1
         ''', (uuid_code,))
         
         user_data = cursor.fetchone()
@@ -1418,7 +2267,7 @@ def get_available_groups(uuid_code):
             
             return jsonify({
                 'success': True,
-                'groups': available_groups,
+                'groups': project_fields(available_groups, fields),
                 'total': len(available_groups),
                 'source': 'demo',
                 'message': 'Grupos demo gerados - valide via bot para grupos reais'
@@ -1426,13 +2275,16 @@ def get_available_groups(uuid_code):
         
         phone_number = user_data[0]
         
-        # Busca grupos reais salvos do userbot
+        # Busca grupos reais salvos do userbot, só com as colunas pedidas
+        group_columns = select_columns(fields, AVAILABLE_GROUP_FIELD_COLUMNS, required=('group_id',))
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
         cursor.execute('''
-            SELECT group_id, group_name, group_type, members_count, signals_count
+            SELECT {group_columns}
             FROM telegram_groups 
             WHERE user_uuid = ? AND source = 'userbot_real'
             ORDER BY group_name
-        ''', (uuid_code,))
+        '''.format(group_columns=group_columns), (uuid_code,))
         
         real_groups = cursor.fetchall()
         conn.close()
@@ -1440,16 +2292,18 @@ def get_available_groups(uuid_code):
         if real_groups:
             # Retorna grupos reais capturados
             available_groups = []
-            for group in real_groups:
-                available_groups.append({
-                    'id': group[0],
-                    'name': group[1],
-                    'type': group[2],
-                    'members': group[3] or 0,
-                    'signals_count': group[4] or 0,
-                    'username': f"@{group[1].lower().replace(' ', '_')}",
+            for row in real_groups:
+                group = dict(zip(row.keys(), row))
+                name = group.get('group_name')
+                available_groups.append(project_fields({
+                    'id': group.get('group_id'),
+                    'name': name,
+                    'type': group.get('group_type'),
+                    'members': 0,
+                    'signals_count': group.get('signals_count') or 0,
+                    'username': f"@{name.lower().replace(' ', '_')}" if name else None,
                     'is_monitored': False
-                })
+                }, fields))
             
             return jsonify({
                 'success': True,
@@ -1463,7 +2317,7 @@ def get_available_groups(uuid_code):
             
             return jsonify({
                 'success': True,
-                'groups': available_groups,
+                'groups': project_fields(available_groups, fields),
                 'total': len(available_groups),
                 'source': 'demo'
             })
@@ -1476,6 +2330,8 @@ def get_available_groups(uuid_code):
         }), 500
 
 @app.route('/api/telegram/select-groups', methods=['POST'])
+@rate_limiter.rate_limit('api')
+@require_auth
 def select_user_groups():
     """Salva grupos selecionados pelo usuário"""
     try:
@@ -1496,13 +2352,13 @@ def select_user_groups():
             })
         
         # Verifica se usuário está validado
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
         cursor = conn.cursor()
         
         cursor.execute('''
             SELECT phone_number 
             FROM telegram_users 
-            WHERE user_uuid = ? AND is_active = 1
+            WHERE uuid = ? AND is_active = 1
         ''', (uuid_code,))
         
         user_data = cursor.fetchone()
@@ -1554,8 +2410,11 @@ def select_user_groups():
                 'userbot_real'
             ))
         
+        version = user_versions.bump(uuid_code, cursor)
         conn.commit()
+        user_versions.bump_committed(uuid_code, version)
         conn.close()
+        performance_optimizer.invalidate_user(uuid_code)
         
         return jsonify({
             'success': True,
@@ -1570,6 +2429,8 @@ def select_user_groups():
         }), 500
 
 @app.route('/api/telegram/validate-phone-with-bot', methods=['POST'])
+@rate_limiter.rate_limit('api')
+@require_auth
 def validate_phone_with_bot():
     """Valida se o telefone está registrado no bot"""
     try:
@@ -1584,13 +2445,13 @@ def validate_phone_with_bot():
             })
         
         # Verifica se o telefone está registrado no bot
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = sqlite3.connect(DATABASE_PATH, factory=ProfiledConnection)
         cursor = conn.cursor()
         
         cursor.execute('''
             SELECT phone_number, is_active 
             FROM telegram_users 
-            WHERE user_uuid = ? AND phone_number = ? AND is_active = 1
+            WHERE uuid = ? AND phone_number = ? AND is_active = 1
         ''', (uuid_code, phone_number))
         
         user_data = cursor.fetchone()
@@ -1615,7 +2476,264 @@ def validate_phone_with_bot():
             'error': str(e)
         }), 500
 
+# Batch de requisições GET internas (dashboard mobile)
+BATCH_MAX_REQUESTS = 20
+# Tempo máximo do batch inteiro; sub-requisições que passarem disso voltam 504
+BATCH_TIMEOUT = float(os.environ.get('BATCH_TIMEOUT', 5))
+# Sub-requisições em execução por batch. O timeout só cancela as que ainda
+# estão na fila: uma já iniciada roda até o fim, então um batch lento prende
+# no máximo BATCH_CONCURRENCY threads do pool
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 4))
+batch_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('BATCH_WORKERS', 2 * BATCH_CONCURRENCY)),
+    thread_name_prefix='nexo-batch'
+)
+
+# GETs rápidos do dashboard; long-poll, admin e profiler ficam de fora
+# (prenderiam o pool do batch para todos os clientes do worker)
+BATCH_ALLOWED_ENDPOINTS = {
+    'health_check', 'get_signals', 'get_gems', 'get_news',
+    'check_telegram_validation', 'get_telegram_groups', 'get_user_groups_from_userbot',
+    'get_captured_signals_from_userbot', 'get_userbot_status', 'get_demo_groups',
+    'get_available_groups', 'get_job_status'
+}
+
+def batch_endpoint_allowed(path):
+    """Resolve o path pelas rotas do app e confere a allowlist do batch"""
+    try:
+        endpoint, _ = app.url_map.bind('localhost').match(path.split('?', 1)[0], method='GET')
+    except HTTPException:
+        return False
+    return endpoint in BATCH_ALLOWED_ENDPOINTS
+
+def dispatch_internal_get(path, headers, remote_addr):
+    """Executa uma requisição GET interna passando pelos hooks do app"""
+    builder = EnvironBuilder(path=path, method='GET', headers=headers,
+                             environ_base={'REMOTE_ADDR': remote_addr, INTERNAL_REQUEST_KEY: True})
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+    
+    with app.request_context(environ):
+        response = app.full_dispatch_request()
+    
+    body = None
+    if response.status_code != 304:
+        body = response.get_json(silent=True)
+        if body is None:
+            body = response.get_data(as_text=True)
+    
+    return {
+        'status': response.status_code,
+        'etag': response.headers.get('ETag'),
+        'body': body
+    }
+
+@app.route('/api/batch', methods=['POST'])
+@rate_limiter.rate_limit('api')
+def batch_requests():
+    """Executa várias requisições GET internas em uma única ida e volta"""
+    try:
+        data = request.get_json(silent=True) or {}
+        sub_requests = data.get('requests')
+        
+        if not isinstance(sub_requests, list) or not sub_requests:
+            return jsonify({
+                'success': False,
+                'error': 'Lista de requests é obrigatória'
+            }), 400
+        
+        if len(sub_requests) > BATCH_MAX_REQUESTS:
+            return jsonify({
+                'success': False,
+                'error': f'Máximo de {BATCH_MAX_REQUESTS} requisições por batch'
+            }), 400
+        
+        # Cabeçalhos herdados da requisição externa (sem Accept-Encoding:
+        # a resposta do batch é comprimida uma única vez)
+        base_headers = {}
+        if request.headers.get('Authorization'):
+            base_headers['Authorization'] = request.headers['Authorization']
+        # Sub-requisições entram no mesmo trace
+        base_headers.update(tracer.outbound_headers())
+        
+        jobs = []
+        for index, item in enumerate(sub_requests):
+            if isinstance(item, str):
+                item = {'path': item}
+            path = item.get('path') if isinstance(item, dict) else None
+            request_id = item.get('id', index) if isinstance(item, dict) else index
+            
+            if not isinstance(path, str) or not batch_endpoint_allowed(path):
+                jobs.append((request_id, path, None))
+                continue
+            
+            headers = dict(base_headers)
+            if item.get('if_none_match'):
+                headers['If-None-Match'] = item['if_none_match']
+            jobs.append((request_id, path, headers))
+        
+        # GETs são independentes entre si: executam em paralelo, com no máximo
+        # BATCH_CONCURRENCY em voo; as demais só entram no pool quando abre vaga
+        remote_addr = request.remote_addr
+        queued = [index for index, job in enumerate(jobs) if job[2] is not None]
+        queued.reverse()
+        in_flight = {}
+        results = {}
+        deadline = time.monotonic() + BATCH_TIMEOUT
+        while queued or in_flight:
+            while queued and len(in_flight) < BATCH_CONCURRENCY and time.monotonic() < deadline:
+                index = queued.pop()
+                _, path, headers = jobs[index]
+                in_flight[batch_executor.submit(dispatch_internal_get, path, headers, remote_addr)] = index
+            
+            if not in_flight:
+                break
+            done, _ = futures_wait(in_flight, timeout=max(deadline - time.monotonic(), 0),
+                                   return_when=FIRST_COMPLETED)
+            if not done:
+                # Prazo vencido: as que não começaram nem entram no pool
+                for future in in_flight:
+                    future.cancel()
+                break
+            
+            for future in done:
+                index = in_flight.pop(future)
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    results[index] = {'status': 500, 'body': {'success': False, 'error': str(e)}}
+        
+        responses = []
+        for index, (request_id, path, headers) in enumerate(jobs):
+            if headers is None:
+                result = {'status': 400, 'body': {'success': False, 'error': 'Path inválido para batch'}}
+            else:
+                result = results.get(index) or {
+                    'status': 504, 'body': {'success': False, 'error': 'Tempo limite do batch excedido'}
+                }
+            responses.append({'id': request_id, 'path': path, **result})
+        
+        return jsonify({
+            'success': True,
+            'responses': responses
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Profiler sob demanda precisa das views registradas
+sampling_profiler.app = app
+
+# Atualização periódica dos grupos dos usuários validados
+group_refresh_scheduler = GroupRefreshScheduler(
+    DATABASE_PATH,
+    refresh_user_groups,
+    period=int(os.environ.get('GROUP_REFRESH_PERIOD', 3600)),
+    max_concurrency=int(os.environ.get('GROUP_REFRESH_CONCURRENCY', 2)),
+    factory=ProfiledConnection
+)
+
+# Manutenção incremental do SQLite (vacuum, optimize, checkpoints) em janelas ociosas
+db_maintenance = DatabaseMaintenanceScheduler(
+    DATABASE_PATH,
+    traffic_fn=metrics_collector.total_requests,
+    tick=int(os.environ.get('DB_MAINTENANCE_TICK', 30)),
+    idle_rps=float(os.environ.get('DB_MAINTENANCE_IDLE_RPS', 2.0)),
+    step_budget=float(os.environ.get('DB_MAINTENANCE_STEP_MS', 250)) / 1000,
+    vacuum_pages=int(os.environ.get('DB_MAINTENANCE_VACUUM_PAGES', 128)),
+    optimize_interval=int(os.environ.get('DB_MAINTENANCE_OPTIMIZE_INTERVAL', 3600)),
+    cleanup_tasks=[job_queue.prune]
+)
+
+def warm_caches(active_users=20):
+    """Aquece os caches do worker: sinais do upstream e grupos dos usuários mais ativos"""
+    started = time.perf_counter()
+    warmed = failed = 0
+    try:
+        # Sinais: com o cache compartilhado, só um worker do host consulta o upstream
+        performance_optimizer.cache.get_or_compute(
+            SIGNALS_CACHE_KEY, fetch_telegram_signals,
+            timeout=SIGNALS_CACHE_TTL, cacheable=lambda signals: signals is not None
+        )
+        
+        # Usuários com mais escritas (versão mais alta)
+        conn = sqlite3.connect(DATABASE_PATH, timeout=10, factory=ProfiledConnection)
+        rows = conn.execute('''
+            SELECT v.uuid FROM user_data_versions v
+            JOIN telegram_users u ON u.uuid = v.uuid AND u.is_active = 1
+            ORDER BY v.version DESC
+            LIMIT ?
+        ''', (active_users,)).fetchall()
+        conn.close()
+        
+        # Token interno de vida curta: as rotas de grupos exigem autenticação
+        token, _ = session_tokens.issue('nexo-warmup', 'internal', ttl=300)
+        headers = {'Authorization': f'Bearer {token}'}
+        for (uuid_code,) in rows:
+            result = dispatch_internal_get(f'/api/telegram/available-groups/{uuid_code}',
+                                           headers, '127.0.0.1')
+            # Só respostas 200 ficam no cache; erros não contam como aquecidos
+            if result['status'] == 200:
+                warmed += 1
+            else:
+                failed += 1
+                error = result['body'].get('error') if isinstance(result['body'], dict) else None
+                print(f"Falha ao aquecer grupos de {uuid_code}: HTTP {result['status']} {error or ''}")
+    except Exception as e:
+        print(f"Erro ao aquecer caches: {e}")
+    
+    print(f"Caches aquecidos em {time.perf_counter() - started:.2f}s "
+          f"({warmed} usuários, {failed} falhas)")
+
+# Desligado por padrão: a captura de grupos ainda é simulada (sem userbot real),
+# então re-sincronizar não traz dados novos
+GROUP_REFRESH_ENABLED = os.environ.get('GROUP_REFRESH_ENABLED', '0') == '1'
+# Manutenção do banco só liga por padrão em produção (em dev/testes o import fica sem threads)
+DB_MAINTENANCE_ENABLED = os.environ.get(
+    'DB_MAINTENANCE_ENABLED', '1' if os.environ.get('FLASK_ENV') == 'production' else '0') == '1'
+CACHE_WARMUP = FAST_START and os.environ.get('CACHE_WARMUP', '1') == '1'
+
+_background_pid = None
+_background_lock = threading.Lock()
+
+def start_background_tasks():
+    """Inicia jobs retomados, agendadores e aquecimento neste processo (uma vez por PID)
+
+    Nada disso roda no import: com gunicorn --preload as threads ficariam só
+    no master. Chamado na primeira requisição de cada worker (ou direto por
+    quem embute o app).
+    """
+    global _background_pid
+    if _background_pid == os.getpid():
+        return
+    with _background_lock:
+        if _background_pid == os.getpid():
+            return
+        _background_pid = os.getpid()
+        
+        # Retoma jobs interrompidos por reinício de worker
+        job_queue.resume_pending()
+        if GROUP_REFRESH_ENABLED:
+            group_refresh_scheduler.start()
+        if DB_MAINTENANCE_ENABLED:
+            db_maintenance.start()
+        if CACHE_WARMUP:
+            threading.Thread(target=warm_caches, daemon=True, name='nexo-cache-warmup').start()
+
+@app.before_request
+def ensure_background_tasks():
+    start_background_tasks()
+
+# Tempo de inicialização do worker (import do app até aqui)
+metrics_collector.record_startup(time.perf_counter() - STARTUP_STARTED)
+
 if __name__ == '__main__':
+    start_background_tasks()
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port)
 
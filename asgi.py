@@ -0,0 +1,279 @@
+"""
+Entrada ASGI do Backend NexoCrypto
+Serve as mesmas rotas do app Flask: chamadas a APIs externas rodam com cliente HTTP
+assíncrono e o acesso ao SQLite roda em um executor dedicado
+
+Uso: uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+
+import io
+import os
+import sys
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.exceptions import HTTPException
+
+try:
+    import httpx
+except ImportError:  # sem httpx, /api/signals usa o caminho síncrono no executor
+    httpx = None
+
+from flask import jsonify
+from app import (app as flask_app, build_signals_response, TELEGRAM_API_URL,
+                 SIGNALS_CACHE_KEY, SIGNALS_CACHE_TTL, lookup_validation, parse_wait_timeout,
+                 user_versions, validation_waiters, WAIT_VALIDATION_POLL_INTERVAL,
+                 authenticate_request, authorize_uuid, start_background_tasks)
+from optimizations import performance_optimizer, metrics_collector, rate_limiter
+from tracing import tracer
+
+# Executor dedicado para handlers que acessam o SQLite
+db_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('ASGI_DB_THREADS', 8)),
+    thread_name_prefix='nexo-sqlite'
+)
+
+# Endpoints sem I/O bloqueante: executam direto no event loop
+INLINE_ENDPOINTS = {'home', 'health_check', 'get_gems', 'get_news', 'get_demo_groups'}
+
+http_client = None
+
+
+def get_http_client():
+    """Cliente HTTP assíncrono compartilhado (pool de conexões keep-alive)"""
+    global http_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            timeout=5,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50)
+        )
+    return http_client
+
+
+async def fetch_signals_async():
+    """Versão assíncrona de app.fetch_telegram_signals; None em caso de falha"""
+    try:
+        # Tenta buscar sinais reais da API Telegram
+        with tracer.span('telegram_api.signals', kind='http'):
+            response = await get_http_client().get(f"{TELEGRAM_API_URL}/signals/CRP-DEFAULT",
+                                                   headers=tracer.outbound_headers())
+        if response.status_code == 200:
+            return response.json().get('signals', [])
+    except Exception as e:
+        print(f"Erro ao buscar sinais do Telegram: {e}")
+    return None
+
+
+def compute_signals_shared(loop):
+    """get_or_compute no executor: a busca roda no event loop, a coordenação
+    (espera entre threads e lock do L2 entre workers) é a mesma de app.get_signals"""
+    return performance_optimizer.cache.get_or_compute(
+        SIGNALS_CACHE_KEY,
+        lambda: asyncio.run_coroutine_threadsafe(fetch_signals_async(), loop).result(),
+        timeout=SIGNALS_CACHE_TTL, cacheable=lambda signals: signals is not None
+    )
+
+
+# Recarga em andamento: as demais corrotinas aguardam sem ocupar threads do executor
+signals_refresh = None
+
+
+async def get_signals_async():
+    """Versão assíncrona de app.get_signals (mesma entrada de cache e mesma coalescência)"""
+    global signals_refresh
+    telegram_signals = performance_optimizer.cache.get(SIGNALS_CACHE_KEY, None)
+    if telegram_signals is not None:
+        metrics_collector.record_cache_hit()
+        return build_signals_response(telegram_signals)
+
+    leader = signals_refresh is None
+    if leader:
+        loop = asyncio.get_running_loop()
+        # Contexto copiado: o span da busca entra no trace desta requisição
+        signals_refresh = loop.run_in_executor(db_executor, contextvars.copy_context().run,
+                                               compute_signals_shared, loop)
+    refresh = signals_refresh
+    try:
+        telegram_signals, computed = await asyncio.shield(refresh)
+    finally:
+        if leader and signals_refresh is refresh:
+            signals_refresh = None
+
+    if leader and computed:
+        metrics_collector.record_cache_miss()
+    else:
+        metrics_collector.record_cache_hit()
+    return build_signals_response(telegram_signals or [])
+
+
+async def wait_validation_async(uuid_code):
+    """Versão assíncrona de app.wait_telegram_validation: a espera não ocupa thread"""
+    try:
+        timeout = parse_wait_timeout()
+    except ValueError:
+        return jsonify({'success': False, 'error': 'timeout inválido'}), 400
+
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(db_executor, lookup_validation, uuid_code)
+    deadline = loop.time() + timeout
+    version = await loop.run_in_executor(db_executor, user_versions.get, uuid_code)
+
+    while not result['validated']:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        notified = await validation_waiters.wait_async(
+            uuid_code, min(remaining, WAIT_VALIDATION_POLL_INTERVAL))
+        current = await loop.run_in_executor(db_executor, user_versions.get, uuid_code)
+        if notified or current != version:
+            version = current
+            result = await loop.run_in_executor(db_executor, lookup_validation, uuid_code)
+
+    return jsonify({**result, 'timed_out': not result['validated']})
+
+
+# Endpoints com chamadas externas ou espera longa: handlers assíncronos
+ASYNC_VIEWS = {'wait_telegram_validation': wait_validation_async}
+if httpx is not None:
+    ASYNC_VIEWS['get_signals'] = get_signals_async
+
+
+def build_environ(scope, body):
+    """Converte o scope ASGI em environ WSGI para o Flask"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    path = scope.get('root_path', '') + scope['path']
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    return environ
+
+
+def _materialize(response):
+    """Lê o corpo ainda dentro do contexto da requisição"""
+    try:
+        body = b''.join(response.iter_encoded())
+    finally:
+        response.close()
+    headers = [(k.encode('latin-1'), v.encode('latin-1')) for k, v in response.headers.items()]
+    return response.status_code, headers, body
+
+
+def dispatch_sync(environ):
+    """Executa a requisição completa no Flask (roda no executor do SQLite)"""
+    with flask_app.request_context(environ):
+        try:
+            response = flask_app.full_dispatch_request()
+        except Exception as e:
+            response = flask_app.make_response(flask_app.handle_exception(e))
+        return _materialize(response)
+
+
+async def dispatch_native(environ, endpoint, view_args):
+    """Executa a view no event loop, com os mesmos hooks before/after_request"""
+    with flask_app.request_context(environ):
+        try:
+            try:
+                rv = flask_app.preprocess_request()
+                if rv is None:
+                    if endpoint in ASYNC_VIEWS:
+                        # A versão assíncrona substitui a view: aplica rate limit e
+                        # require_auth da view Flask aqui
+                        view = flask_app.view_functions[endpoint]
+                        limit_type = getattr(view, 'rate_limit_type', None)
+                        if limit_type is not None:
+                            rv = rate_limiter.check_request(limit_type)
+                        if rv is None and getattr(view, 'auth_required', False):
+                            rv = authenticate_request() or authorize_uuid(view_args.get('uuid_code'))
+                        if rv is None:
+                            rv = await ASYNC_VIEWS[endpoint](**view_args)
+                    else:
+                        rv = flask_app.view_functions[endpoint](**view_args)
+            except Exception as e:
+                # Como no full_dispatch_request: HTTPException (400, 404...) e
+                # errorhandlers registrados viram resposta normal, não 500
+                rv = flask_app.handle_user_exception(e)
+            response = flask_app.finalize_request(rv)
+        except Exception as e:
+            response = flask_app.make_response(flask_app.handle_exception(e))
+        return _materialize(response)
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    return body
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Já no processo do worker (depois do fork)
+            start_background_tasks()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if http_client is not None:
+                await http_client.aclose()
+            db_executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    environ = build_environ(scope, await read_body(receive))
+
+    endpoint, view_args = None, {}
+    if environ['REQUEST_METHOD'] in ('GET', 'HEAD'):
+        try:
+            endpoint, view_args = flask_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            pass
+
+    if endpoint in ASYNC_VIEWS or endpoint in INLINE_ENDPOINTS:
+        status, headers, body = await dispatch_native(environ, endpoint, view_args)
+    else:
+        loop = asyncio.get_running_loop()
+        status, headers, body = await loop.run_in_executor(db_executor, dispatch_sync, environ)
+
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body if scope['method'] != 'HEAD' else b''})
@@ -0,0 +1,130 @@
+"""
+Teste de carga: requisições simultâneas em andamento com upstream lento
+Compara gunicorn (sync, threads) com a entrada ASGI (uvicorn) em um único processo
+
+Uso: python benchmarks/asgi_load.py [concorrencia] [atraso_upstream_s]
+Requer gunicorn, uvicorn e httpx instalados.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import tempfile
+import threading
+import subprocess
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUNICORN_THREADS = 8
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_slow_upstream(port, delay):
+    """API Telegram falsa que demora `delay` segundos para responder"""
+    body = json.dumps({'signals': [
+        {'symbol': 'BTCUSDT', 'direction': 'LONG', 'entry_price': 115000,
+         'take_profit_1': 118500, 'take_profit_2': 122000, 'take_profit_3': 128000,
+         'stop_loss': 110500, 'confidence_score': 0.89, 'source': 'Upstream lento'}
+    ]}).encode()
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                await reader.readuntil(b'\r\n\r\n')
+                await asyncio.sleep(delay)
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(asyncio.start_server(handle, '127.0.0.1', port, backlog=4096))
+        loop.run_until_complete(server.serve_forever())
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def start_server(kind, port, upstream_port, workdir):
+    env = dict(os.environ,
+               TELEGRAM_API_URL=f'http://127.0.0.1:{upstream_port}/api',
+               FLASK_ENV='production',
+               GROUP_REFRESH_ENABLED='0',
+               PYTHONPATH=ROOT)
+    if kind == 'gunicorn':
+        cmd = [sys.executable, '-m', 'gunicorn', '-w', '1', '--threads', str(GUNICORN_THREADS),
+               '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app']
+    else:
+        cmd = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1',
+               '--port', str(port), '--log-level', 'warning', '--workers', '1']
+    proc = subprocess.Popen(cmd, cwd=workdir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f'http://127.0.0.1:{port}/api/health', timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f'{kind} não iniciou')
+
+
+async def run_load(port, concurrency):
+    """Dispara `concurrency` requisições ao mesmo tempo e registra quando cada uma termina"""
+    finished = []
+    started = time.perf_counter()
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        async def one():
+            response = await client.get(f'http://127.0.0.1:{port}/api/signals')
+            finished.append(time.perf_counter() - started)
+            return response.status_code
+
+        statuses = await asyncio.gather(*(one() for _ in range(concurrency)))
+
+    return statuses, sorted(finished)
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    upstream_port = free_port()
+    start_slow_upstream(upstream_port, delay)
+
+    print(f"Concorrência: {concurrency} | atraso do upstream: {delay}s")
+    print(f"{'servidor':34s} {'ok':>5s} {'1º ciclo':>9s} {'p50':>8s} {'total':>8s}")
+
+    for kind, label in (('gunicorn', f'gunicorn sync (1 worker, {GUNICORN_THREADS} threads)'),
+                        ('uvicorn', 'ASGI (uvicorn, 1 worker)')):
+        port = free_port()
+        with tempfile.TemporaryDirectory() as workdir:
+            proc = start_server(kind, port, upstream_port, workdir)
+            try:
+                statuses, finished = asyncio.run(run_load(port, concurrency))
+            finally:
+                proc.terminate()
+                proc.wait()
+
+        ok = sum(1 for s in statuses if s == 200)
+        # Requisições atendidas dentro do primeiro ciclo do upstream = mantidas em paralelo
+        first_cycle = sum(1 for t in finished if t < delay * 1.5)
+        p50 = finished[len(finished) // 2]
+        print(f"{label:34s} {ok:5d} {first_cycle:9d} {p50:7.2f}s {finished[-1]:7.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark de CPU por requisição: compressão antiga vs ResponseCompressor
+Uso: python benchmarks/compression.py [requisicoes]
+"""
+
+import os
+import sys
+import gzip
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify, request
+from optimizations import ResponseCompressor
+
+
+def legacy_compress_response(response):
+    """Implementação anterior de PerformanceOptimizer.compress_response"""
+    if (response.status_code == 200 and
+        'gzip' in request.headers.get('Accept-Encoding', '') and
+        len(response.data) > 1000):
+        try:
+            compressed_data = gzip.compress(response.data)
+            response.data = compressed_data
+            response.headers['Content-Encoding'] = 'gzip'
+            response.headers['Content-Length'] = len(compressed_data)
+        except:
+            pass
+    return response
+
+
+def build_groups_payload(count=40):
+    """Payload parecido com /api/telegram/available-groups"""
+    return {
+        'success': True,
+        'groups': [
+            {
+                'id': f'real_{i}_{i % 7}',
+                'name': f'Trading Group {i}',
+                'type': 'supergroup' if i % 3 else 'channel',
+                'members': 1000 + i * 37,
+                'signals_count': i % 25,
+                'username': f'@trading_group_{i}',
+                'is_monitored': False,
+                'source': 'userbot_real'
+            }
+            for i in range(count)
+        ],
+        'total': count
+    }
+
+
+def cpu_per_request(mode, requests_count):
+    """CPU gasta no estágio de compressão de uma resposta JSON típica"""
+    app = Flask(__name__)
+    hook = {
+        'none': lambda response: response,
+        'legacy': legacy_compress_response,
+        'new': ResponseCompressor(app).process_response
+    }[mode]
+
+    with app.test_request_context('/groups', headers={'Accept-Encoding': 'gzip, deflate, br'}):
+        body = jsonify(build_groups_payload()).get_data()
+
+        for _ in range(50):  # aquecimento
+            hook(app.response_class(body, mimetype='application/json'))
+
+        start = time.process_time()
+        for _ in range(requests_count):
+            hook(app.response_class(body, mimetype='application/json'))
+        return (time.process_time() - start) / requests_count * 1e6
+
+
+def main():
+    requests_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    baseline = cpu_per_request('none', requests_count)
+    legacy = cpu_per_request('legacy', requests_count)
+    new = cpu_per_request('new', requests_count)
+
+    print(f"Requisições: {requests_count}")
+    print(f"Sem compressão:       {baseline:8.1f} µs CPU/req")
+    print(f"Compressão antiga:    {legacy:8.1f} µs CPU/req ({legacy - baseline:+.1f})")
+    print(f"ResponseCompressor:   {new:8.1f} µs CPU/req ({new - baseline:+.1f})")
+
+
+if __name__ == '__main__':
+    main()
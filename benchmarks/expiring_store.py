@@ -0,0 +1,94 @@
+"""
+Memória dos cadastros pendentes com 1 milhão de registros abandonados
+Relógio simulado: N cadastros distribuídos ao longo de `horas`, nenhum concluído
+Uso: python benchmarks/expiring_store.py [cadastros] [horas]
+"""
+
+import os
+import sys
+import time
+import secrets
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from expiring_store import ExpiringDict
+
+TTL = 30 * 60
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def registration():
+    # Mesmo formato de app.register
+    return {
+        'user_data': {
+            'name': 'Usuário Teste',
+            'email': f"{secrets.token_hex(6)}@exemplo.com",
+            'phone': '11999999999',
+            'password_hash': 'pbkdf2_sha256$600000$' + secrets.token_hex(32)
+        },
+        'email_code': '123456',
+        'sms_code': '654321',
+        'verified_email': False,
+        'verified_sms': False
+    }
+
+
+def run(store, clock, count, seconds):
+    step = seconds / count
+    peak_entries = 0
+    peak_bytes = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(count):
+        clock.now += step
+        store[secrets.token_urlsafe(16)] = registration()
+        if i % 10_000 == 0:
+            peak_entries = max(peak_entries, len(store))
+            peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[0])
+    elapsed = time.perf_counter() - start
+    final_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed / count * 1e6, peak_entries, peak_bytes, final_bytes, len(store)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    hours = float(sys.argv[2]) if len(sys.argv) > 2 else 24
+    seconds = hours * 3600
+    expected = count * TTL / seconds
+
+    print(f"{count} cadastros abandonados em {hours:g}h (TTL {TTL // 60} min, "
+          f"~{expected:.0f} vivos em regime)")
+
+    clock = SimulatedClock()
+    for label, store in (('dict (antigo)', {}),
+                         ('ExpiringDict (novo)', ExpiringDict('verification_codes', TTL, clock=clock))):
+        us, peak_entries, peak_bytes, final_bytes, final_entries = run(store, clock, count, seconds)
+        print(f"  {label:22s} {us:5.2f} us/cadastro  pico {peak_entries:8d} entradas "
+              f"{peak_bytes / 1024 / 1024:7.1f} MiB  final {final_entries:8d} entradas "
+              f"{final_bytes / 1024 / 1024:7.1f} MiB")
+
+    # Sem novas escritas a varredura em background esvazia o dicionário
+    store = ExpiringDict('verification_codes', TTL, clock=clock)
+    for _ in range(1000):
+        store[secrets.token_urlsafe(16)] = registration()
+    clock.now += TTL + 1
+    removed = store.sweep()
+    print(f"  Varredura após o TTL sem escritas: {removed} removidos, {len(store)} restantes")
+
+    # Critério: memória proporcional a (taxa x TTL), não ao total de cadastros
+    bounded = peak_entries <= expected * 1.1 + 10_000
+    print(f"  Memória limitada: {'OK' if bounded else 'FALHOU'}")
+    sys.exit(0 if bounded else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark de serialização: provider padrão do Flask vs FastJSONProvider
+Uso: python benchmarks/json_encoding.py [iteracoes]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+import json_provider
+from json_provider import FastJSONProvider
+
+
+def build_groups_payload(count=500):
+    """Formato de resposta de get_telegram_groups"""
+    groups = [
+        {
+            'id': f'real_{i}_{i % 6}',
+            'name': f'Binance Killers VIP {i}',
+            'type': ('supergroup', 'group', 'channel')[i % 3],
+            'is_monitored': bool(i % 2),
+            'signals_count': i % 25,
+            'last_signal': None,
+            'source': 'userbot_real',
+            'isDemo': False
+        }
+        for i in range(count)
+    ]
+    return {
+        'success': True,
+        'groups': groups,
+        'total_groups': len(groups),
+        'monitored_groups': len([g for g in groups if g['is_monitored']])
+    }
+
+
+def build_signals_payload(count=500):
+    """Formato de resposta de get_signals (sinais convertidos do Telegram)"""
+    return [
+        {
+            'id': i + 1,
+            'pair': 'BTCUSDT',
+            'direction': 'LONG' if i % 2 else 'SHORT',
+            'entry': 115000.5 + i,
+            'currentPrice': (115000.5 + i) * 1.001,
+            'targets': [118500.0, 122000.0, 128000.0],
+            'stopLoss': 110500.0,
+            'confidence': 75,
+            'timeframe': '4H',
+            'status': 'active',
+            'created': datetime(2025, 8, 7, 22, 30),
+            'analysis': 'Sinal capturado do grupo Binance Killers VIP',
+            'source': 'Telegram Bot'
+        }
+        for i in range(count)
+    ]
+
+
+def bench(provider, payload, iterations):
+    with provider._app.app_context():
+        provider.response(payload)  # aquecimento
+        start = time.perf_counter()
+        for _ in range(iterations):
+            provider.response(payload).get_data()
+        return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    app = Flask(__name__)
+    app.debug = False
+
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+
+    # Mesmo provider sem orjson, para medir o fallback da stdlib
+    orjson_module = json_provider.orjson
+    json_provider.orjson = None
+    stdlib_provider = FastJSONProvider(app)
+
+    payloads = {
+        'groups (500)': build_groups_payload(),
+        'signals (500)': build_signals_payload()
+    }
+
+    print(f"Iterações: {iterations} (orjson disponível: {orjson_module is not None})")
+    for name, payload in payloads.items():
+        results = {}
+        json_provider.orjson = None
+        results['DefaultJSONProvider'] = bench(default_provider, payload, iterations)
+        results['FastJSONProvider (stdlib)'] = bench(stdlib_provider, payload, iterations)
+        json_provider.orjson = orjson_module
+        if orjson_module is not None:
+            results['FastJSONProvider (orjson)'] = bench(fast_provider, payload, iterations)
+
+        print(f"\n{name}")
+        base = results['DefaultJSONProvider']
+        for label, micros in results.items():
+            print(f"  {label:28s} {micros:9.1f} µs/resposta  ({base / micros:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark do hash de senhas: logins/s por núcleo e comportamento sob rajada
+Uso: python benchmarks/password_hashing.py [iterações_pbkdf2] [threads_da_rajada]
+"""
+
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from password_hashing import PasswordHasher, HashingBusy
+
+
+def per_core(hasher, encoded, seconds=2.0):
+    """Verificações por segundo numa única thread (= um núcleo)"""
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        hasher.verify_now('senha-correta', encoded)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def burst(hasher, encoded, threads):
+    """Rajada de logins simultâneos (credential stuffing) contra o pool limitado"""
+    latencies = []
+    rejected = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def attempt():
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            hasher.verify('senha-errada', encoded)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+        except HashingBusy:
+            with lock:
+                rejected.append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=attempt) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start, sorted(latencies), sorted(rejected)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    return values[min(int(len(values) * fraction), len(values) - 1)] * 1000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 600_000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    cores = os.cpu_count() or 1
+
+    for label, hasher in (
+        (f'PBKDF2-SHA256 ({iterations} iterações)',
+         PasswordHasher(iterations=iterations, max_queue=2 * cores)),
+        ('scrypt (n=2^14, r=8, p=1)',
+         PasswordHasher(algorithm='scrypt', max_queue=2 * cores)),
+    ):
+        encoded = hasher.hash_now('senha-correta')
+        rate = per_core(hasher, encoded)
+        print(f"{label}")
+        print(f"  {rate:8.1f} logins/s por núcleo  ({1000 / rate:.1f} ms por verificação)")
+
+        elapsed, accepted, rejected = burst(hasher, encoded, threads)
+        print(f"  Rajada de {threads} logins em {elapsed:.2f}s com {hasher.workers} threads de hash, "
+              f"fila {hasher.max_queue}:")
+        print(f"    aceitos  {len(accepted):4d}  p50 {percentile(accepted, 0.5):7.1f} ms  "
+              f"p99 {percentile(accepted, 0.99):7.1f} ms  "
+              f"({len(accepted) / elapsed:.1f} logins/s no total)")
+        print(f"    503      {len(rejected):4d}  p99 {percentile(rejected, 0.99):7.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
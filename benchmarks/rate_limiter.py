@@ -0,0 +1,99 @@
+"""
+Microbenchmark do rate limiter com 1 milhão de IPs distintos
+Uso: python benchmarks/rate_limiter.py [ips]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from optimizations import APIRateLimiter
+
+
+class LegacyRateLimiter:
+    """Implementação anterior (lista de timestamps por IP)"""
+
+    def __init__(self):
+        self.requests = {}
+        self.limits = {'default': {'requests': 100, 'window': 3600}}
+
+    def is_allowed(self, client_ip, endpoint_type='default'):
+        now = time.time()
+        limit_config = self.limits.get(endpoint_type, self.limits['default'])
+        if client_ip in self.requests:
+            self.requests[client_ip] = [
+                req_time for req_time in self.requests[client_ip]
+                if now - req_time < limit_config['window']
+            ]
+        else:
+            self.requests[client_ip] = []
+        if len(self.requests[client_ip]) >= limit_config['requests']:
+            return False
+        self.requests[client_ip].append(now)
+        return True
+
+
+def timed(limiter, ips, hot_hits):
+    start = time.perf_counter()
+    for ip in ips:
+        limiter.is_allowed(ip)
+    scan = time.perf_counter() - start
+
+    # IP "quente" já próximo do limite: custo por chamada com histórico cheio
+    start = time.perf_counter()
+    for _ in range(hot_hits):
+        limiter.is_allowed('10.0.0.1')
+    hot = time.perf_counter() - start
+
+    return scan / len(ips) * 1e9, hot / hot_hits * 1e9
+
+
+def memory(limiter, ips):
+    tracemalloc.start()
+    for ip in ips:
+        limiter.is_allowed(ip)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / 1024 / 1024
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    ips = [f"{(i >> 24) & 255}.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+           for i in range(1, count + 1)]
+
+    print(f"IPs distintos: {count}")
+    for label, factory in (('Lista de timestamps (antigo)', LegacyRateLimiter),
+                           ('Janela deslizante (novo)', APIRateLimiter)):
+        scan_ns, hot_ns = timed(factory(), ips, 10_000)
+        retained_mb = memory(factory(), ips)
+        print(f"  {label:30s} {scan_ns:6.0f} ns/req (varredura)  "
+              f"{hot_ns:6.0f} ns/req (IP quente)  {retained_mb:6.1f} MiB retidos")
+
+    # Tabela compartilhada entre workers (mmap): tamanho fixo, fora do heap Python
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = APIRateLimiter()
+        shared.enable_shared_state(os.path.join(tmp, 'ratelimit'))
+        scan_ns, hot_ns = timed(shared, ips, 10_000)
+        table = shared.counters['default']
+        table_mb = table.size / 1024 / 1024
+        print(f"  {'mmap compartilhado (novo)':30s} {scan_ns:6.0f} ns/req (varredura)  "
+              f"{hot_ns:6.0f} ns/req (IP quente)  {table_mb:6.1f} MiB fixos ({table.slots} slots)")
+        for counter in shared.counters.values():
+            counter.close()
+
+    # Após duas janelas sem tráfego as chaves ociosas são descartadas
+    limiter = APIRateLimiter()
+    for ip in ips:
+        limiter.is_allowed(ip)
+    before = limiter.get_stats()['default']
+    limiter.counters['default'].hit('10.0.0.1', time.time() + 2 * limiter.limits['default']['window'])
+    print(f"  Chaves rastreadas: {before} -> {limiter.get_stats()['default']} após 2 janelas ociosas")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""
+Manutenção do SQLite em background para o Backend NexoCrypto
+Vacuum incremental em lotes, PRAGMA optimize e checkpoints do WAL, cada passo
+com orçamento de tempo e executado apenas quando o tráfego está baixo
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class StepBudgetExceeded(Exception):
+    """Passo interrompido pelo orçamento de tempo"""
+
+
+class DatabaseMaintenanceScheduler:
+    def __init__(self, db_path, traffic_fn=None, tick=30, idle_rps=2.0,
+                 step_budget=0.25, vacuum_pages=128, optimize_interval=3600,
+                 truncate_wal_bytes=16 * 1024 * 1024, cleanup_tasks=(), cleanup_interval=3600):
+        self.db_path = db_path
+        # Função que retorna o total de requisições atendidas (contador crescente)
+        self.traffic_fn = traffic_fn
+        self.tick = tick
+        self.idle_rps = idle_rps
+        self.step_budget = step_budget
+        self.vacuum_pages = vacuum_pages
+        self.optimize_interval = optimize_interval
+        self.truncate_wal_bytes = truncate_wal_bytes
+        # Limpezas de retenção: funções (conn) -> linhas removidas, rodadas em janela ociosa
+        self.cleanup_tasks = list(cleanup_tasks)
+        self.cleanup_interval = cleanup_interval
+
+        self.stats_path = f"{db_path}.maintenance.json"
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.lock_file = None
+        self.last_traffic = None
+        self.last_optimize = 0
+        self.last_cleanup = 0
+        self.stats = {
+            'ticks': 0, 'idle_ticks': 0, 'pages_vacuumed': 0, 'optimize_runs': 0,
+            'checkpoints_passive': 0, 'checkpoints_truncate': 0,
+            'steps_interrupted': 0, 'steps_busy': 0, 'rows_pruned': 0
+        }
+
+    def _acquire_process_lock(self):
+        """Garante uma única manutenção por host entre os workers do gunicorn"""
+        try:
+            import fcntl
+        except ImportError:
+            return True
+
+        self.lock_file = open(f"{self.db_path}.maintenance.lock", 'w')
+        try:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self.lock_file.close()
+            self.lock_file = None
+            return False
+
+    def start(self):
+        """Inicia a thread de manutenção (no-op se outro worker já a executa)"""
+        if self.thread and self.thread.is_alive():
+            return True
+        if not self._acquire_process_lock():
+            return False
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name='nexo-db-maintenance',
+                                       daemon=True)
+        self.thread.start()
+        print(f"✅ Manutenção do banco iniciada (pid {os.getpid()}, a cada {self.tick}s)")
+        return True
+
+    def stop(self):
+        """Para a manutenção e libera o lock"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        if self.lock_file:
+            self.lock_file.close()
+            self.lock_file = None
+
+    def _connect(self):
+        # Timeout curto: se o banco está ocupado por requisições, o passo cede a vez
+        conn = sqlite3.connect(self.db_path, timeout=0.05, isolation_level=None)
+        return conn
+
+    def _with_budget(self, conn, budget, fn):
+        """Executa `fn(conn)` abortando a instrução se o orçamento estourar"""
+        deadline = time.perf_counter() + budget
+        interrupted = []
+
+        def check():
+            if time.perf_counter() > deadline:
+                interrupted.append(True)
+                return 1  # != 0 interrompe a instrução (SQLITE_INTERRUPT)
+            return 0
+
+        conn.set_progress_handler(check, 1000)
+        try:
+            return fn(conn)
+        except sqlite3.OperationalError as e:
+            if interrupted:
+                self.stats['steps_interrupted'] += 1
+                raise StepBudgetExceeded() from e
+            if 'locked' in str(e) or 'busy' in str(e):
+                self.stats['steps_busy'] += 1
+                return None
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    def _current_rps(self, now):
+        if self.traffic_fn is None:
+            return 0.0
+        total = self.traffic_fn()
+        previous, self.last_traffic = self.last_traffic, (now, total)
+        if previous is None or now <= previous[0]:
+            return float('inf')  # primeira medição: assume tráfego
+        return (total - previous[1]) / (now - previous[0])
+
+    def _loop(self):
+        while not self.stop_event.wait(self.tick):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ Erro na manutenção do banco: {e}")
+
+    def run_once(self, idle=None):
+        """Um ciclo de manutenção; `idle` força a decisão de tráfego baixo"""
+        now = time.time()
+        rps = self._current_rps(now)
+        if idle is None:
+            idle = rps <= self.idle_rps
+        self.stats['ticks'] += 1
+
+        conn = self._connect()
+        try:
+            try:
+                # Checkpoint PASSIVE não bloqueia leitores nem escritores
+                if self._with_budget(conn, self.step_budget,
+                                     lambda c: c.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()):
+                    self.stats['checkpoints_passive'] += 1
+
+                if idle:
+                    self.stats['idle_ticks'] += 1
+                    self._idle_steps(conn, now)
+            except StepBudgetExceeded:
+                # Passo cortado pelo orçamento: retoma no próximo tick
+                pass
+
+            return self.write_stats(conn, rps)
+        finally:
+            conn.close()
+
+    def _idle_steps(self, conn, now):
+        # WAL grande e tráfego baixo: TRUNCATE devolve o espaço ao sistema
+        if self._wal_size() > self.truncate_wal_bytes:
+            result = self._with_budget(conn, self.step_budget,
+                                       lambda c: c.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone())
+            if result and result[0] == 0:
+                self.stats['checkpoints_truncate'] += 1
+
+        # Sem auto_vacuum=INCREMENTAL não há o que liberar em lotes; a conversão
+        # é um VACUUM completo e fica para convert_to_incremental (ação de admin)
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+            self._incremental_vacuum(conn)
+
+        if now - self.last_optimize >= self.optimize_interval:
+            def optimize(c):
+                # analysis_limit limita o ANALYZE feito pelo optimize
+                c.execute('PRAGMA analysis_limit = 400')
+                c.execute('PRAGMA optimize')
+                return True
+            if self._with_budget(conn, self.step_budget * 4, optimize):
+                self.last_optimize = now
+                self.stats['optimize_runs'] += 1
+
+        if self.cleanup_tasks and now - self.last_cleanup >= self.cleanup_interval:
+            for task in self.cleanup_tasks:
+                removed = self._with_budget(conn, self.step_budget * 4, task)
+                self.stats['rows_pruned'] += removed or 0
+            self.last_cleanup = now
+
+    def _incremental_vacuum(self, conn):
+        """Libera páginas em lotes pequenos até esgotar o orçamento do passo"""
+        deadline = time.perf_counter() + self.step_budget
+        while time.perf_counter() < deadline and not self.stop_event.is_set():
+            free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if free_pages == 0:
+                return
+            batch = min(free_pages, self.vacuum_pages)
+            # executescript executa o PRAGMA até o fim; execute() libera só uma página
+            done = self._with_budget(
+                conn, max(deadline - time.perf_counter(), 0.01),
+                lambda c: c.executescript(f'PRAGMA incremental_vacuum({batch})') is not None
+            )
+            if not done:
+                return
+            remaining = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            self.stats['pages_vacuumed'] += free_pages - remaining
+            if remaining == 0:
+                return
+
+    def convert_to_incremental(self, busy_timeout=30):
+        """Ativa auto_vacuum=INCREMENTAL (ação explícita do administrador)
+
+        auto_vacuum só muda com um VACUUM completo, que reescreve o banco e
+        bloqueia as escritas enquanto roda; por isso o agendador nunca o faz.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=busy_timeout, isolation_level=None)
+        try:
+            before = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+            started = time.perf_counter()
+            if before != AUTO_VACUUM_INCREMENTAL:
+                conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                conn.execute('VACUUM')
+            page_count, page_size = self._page_info(conn)
+            return {
+                'auto_vacuum_before': before,
+                'auto_vacuum': conn.execute('PRAGMA auto_vacuum').fetchone()[0],
+                'db_bytes': page_count * page_size,
+                'seconds': round(time.perf_counter() - started, 3)
+            }
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _page_info(conn):
+        return (conn.execute('PRAGMA page_count').fetchone()[0],
+                conn.execute('PRAGMA page_size').fetchone()[0])
+
+    def _wal_size(self):
+        try:
+            return os.path.getsize(f"{self.db_path}-wal")
+        except OSError:
+            return 0
+
+    def write_stats(self, conn, rps):
+        """Tamanho e fragmentação do banco, legíveis por qualquer worker"""
+        page_count, page_size = self._page_info(conn)
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        snapshot = {
+            'pid': os.getpid(),
+            'updated_at': time.time(),
+            'db_bytes': page_count * page_size,
+            'wal_bytes': self._wal_size(),
+            'free_pages': free_pages,
+            'fragmentation': round(free_pages / page_count, 4) if page_count else 0,
+            'auto_vacuum': conn.execute('PRAGMA auto_vacuum').fetchone()[0],
+            'requests_per_second': None if rps == float('inf') else round(rps, 2),
+            **self.stats
+        }
+        temp_path = f"{self.stats_path}.{os.getpid()}"
+        with open(temp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, self.stats_path)
+        return snapshot
+
+    def get_stats(self):
+        """Últimas estatísticas gravadas pelo worker que executa a manutenção"""
+        try:
+            with open(self.stats_path) as f:
+                stats = json.load(f)
+        except (OSError, ValueError):
+            stats = {}
+        stats['running_here'] = bool(self.thread and self.thread.is_alive())
+        return stats
@@ -0,0 +1,194 @@
+"""
+Profiling de SQL por requisição para o Backend NexoCrypto
+Conta consultas e tempo gasto no SQLite, registra consultas lentas com
+EXPLAIN QUERY PLAN e sinaliza handlers com padrão N+1
+"""
+
+import re
+import json
+import time
+import sqlite3
+import logging
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+from flask import g, has_request_context, request
+from tracing import tracer
+
+# Somente estes comandos têm plano de execução útil
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH')
+
+_whitespace = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Forma canônica da consulta (agrupa execuções repetidas)"""
+    return _whitespace.sub(' ', sql).strip()
+
+
+class QueryProfiler:
+    def __init__(self, slow_threshold=0.05, repeat_threshold=5, max_queries=25):
+        # Consultas acima deste tempo (s) vão para o log de consultas lentas
+        self.slow_threshold = slow_threshold
+        # Mesma consulta executada mais vezes que isso numa requisição = N+1
+        self.repeat_threshold = repeat_threshold
+        self.max_queries = max_queries
+        self.expose_headers = False
+        self.logger = logging.getLogger('nexocrypto.db')
+        self.flagged = Counter()
+
+    def init_app(self, app, log_path=None):
+        """Registra os hooks e o arquivo do log de consultas lentas"""
+        self.expose_headers = app.debug or app.config.get('DB_PROFILE_HEADERS', False)
+
+        if log_path and not self.logger.handlers:
+            try:
+                handler = RotatingFileHandler(log_path, maxBytes=5 * 1024 * 1024, backupCount=3)
+                handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+                self.logger.addHandler(handler)
+                self.logger.setLevel(logging.INFO)
+                self.logger.propagate = False
+            except OSError as e:
+                print(f"Log de consultas lentas indisponível: {e}")
+
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+
+    def current(self):
+        """Estatísticas da requisição atual (None fora de requisições)"""
+        if not has_request_context():
+            return None
+        return g.get('db_profile')
+
+    def start_request(self):
+        g.db_profile = {'queries': 0, 'time': 0.0, 'statements': Counter()}
+
+    def record(self, connection, sql, params, elapsed, many=False):
+        """Registra uma execução; chamado pelo cursor instrumentado"""
+        stats = self.current()
+        if stats is not None:
+            stats['queries'] += 1
+            stats['time'] += elapsed
+            stats['statements'][normalize_sql(sql)] += 1
+
+        tracer.record_span('sqlite', 'db', time.perf_counter() - elapsed, elapsed,
+                           sql=normalize_sql(sql)[:200])
+
+        if elapsed >= self.slow_threshold:
+            self.log_slow_query(connection, sql, params, elapsed, many)
+
+    def add_time(self, elapsed):
+        """Tempo de fetch da última consulta"""
+        stats = self.current()
+        if stats is not None:
+            stats['time'] += elapsed
+
+    def explain(self, connection, sql, params):
+        if not normalize_sql(sql).upper().startswith(EXPLAINABLE):
+            return None
+        try:
+            # Cursor base: o EXPLAIN não entra nas estatísticas
+            cursor = sqlite3.Cursor(connection)
+            rows = cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+            cursor.close()
+            return [row[-1] for row in rows]
+        except sqlite3.Error as e:
+            return [f"EXPLAIN indisponível: {e}"]
+
+    def log_slow_query(self, connection, sql, params, elapsed, many=False):
+        entry = {
+            'endpoint': request.endpoint if has_request_context() else None,
+            'duration_ms': round(elapsed * 1000, 2),
+            'sql': normalize_sql(sql),
+            # Parâmetros podem conter telefones e hashes: registra só a quantidade
+            'params': len(params) if params is not None else 0,
+            'plan': None if many else self.explain(connection, sql, params or ())
+        }
+        self.logger.warning(f"slow_query {json.dumps(entry, ensure_ascii=False)}")
+
+    def finish_request(self, response):
+        stats = self.current()
+        if stats is None:
+            return response
+
+        statement, repeats = stats['statements'].most_common(1)[0] if stats['statements'] else (None, 0)
+        n_plus_one = repeats > self.repeat_threshold or stats['queries'] > self.max_queries
+        if n_plus_one:
+            self.flagged[request.endpoint] += 1
+            self.logger.warning("n_plus_one " + json.dumps({
+                'endpoint': request.endpoint,
+                'queries': stats['queries'],
+                'repeated_sql': statement,
+                'repeats': repeats
+            }, ensure_ascii=False))
+
+        if self.expose_headers:
+            response.headers['X-DB-Queries'] = str(stats['queries'])
+            response.headers['X-DB-Time'] = f"{stats['time'] * 1000:.2f}ms"
+            if n_plus_one:
+                response.headers['X-DB-Warning'] = f"n+1: {repeats}x {statement[:120]}"
+        return response
+
+    def get_stats(self):
+        return {
+            'slow_threshold_ms': self.slow_threshold * 1000,
+            'n_plus_one_endpoints': dict(self.flagged)
+        }
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor que mede o tempo de cada execução"""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            query_profiler.record(self.connection, sql, parameters, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            query_profiler.record(self.connection, sql, None, time.perf_counter() - start, many=True)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            query_profiler.add_time(time.perf_counter() - start)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            query_profiler.add_time(time.perf_counter() - start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            query_profiler.add_time(time.perf_counter() - start)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Conexão cujos cursores (inclusive de conn.execute) são instrumentados
+
+    Uso: sqlite3.connect(path, factory=ProfiledConnection)
+    """
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# Instância global
+query_profiler = QueryProfiler()
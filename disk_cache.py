@@ -0,0 +1,180 @@
+"""
+Cache compartilhado em disco para o Backend NexoCrypto
+Arquivo SQLite (WAL) com TTL, tags e locks de recomputação, usado por todos os
+workers do host como segundo nível atrás do cache em memória
+"""
+
+import os
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+
+
+class DiskCache:
+    # Entradas expiradas continuam legíveis por este tempo (servidas enquanto
+    # outro worker recalcula)
+    STALE_TTL = 60
+    PURGE_EVERY = 500
+
+    def __init__(self, path, stale_ttl=None, factory=sqlite3.Connection):
+        self.path = path
+        self.factory = factory
+        self.stale_ttl = self.STALE_TTL if stale_ttl is None else stale_ttl
+        self.local = threading.local()
+        self.writes = 0
+        self._init_db()
+
+    def _connect(self):
+        # Conexão por thread, recriada após fork
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None and self.local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, factory=self.factory)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        self.local.conn = conn
+        self.local.pid = os.getpid()
+        return conn
+
+    def _init_db(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        os.close(fd)
+        conn = self._connect()
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cache_tags (
+                tag TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (tag, key)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_cache_tags_key ON cache_tags (key);
+            CREATE TABLE IF NOT EXISTS cache_locks (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires REAL NOT NULL
+            );
+        ''')
+
+    @staticmethod
+    def make_key(key):
+        """Chave estável entre processos (tuplas de str/int/None)"""
+        if isinstance(key, str):
+            return key
+        return hashlib.blake2b(repr(key).encode('utf-8'), digest_size=16).hexdigest()
+
+    def _owner(self):
+        return f"{os.getpid()}:{threading.get_ident()}"
+
+    def get(self, key, allow_stale=False):
+        """Retorna (valor, expira_em) ou None"""
+        now = time.time()
+        row = self._connect().execute(
+            'SELECT value, expires FROM cache_entries WHERE key = ?',
+            (self.make_key(key),)
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, expires = row
+        if expires <= now and not (allow_stale and expires + self.stale_ttl > now):
+            return None
+        try:
+            return pickle.loads(value), expires
+        except Exception:
+            return None
+
+    def tags(self, key):
+        """Tags associadas à chave (para promover a entrada ao L1 sem perdê-las)"""
+        rows = self._connect().execute('SELECT tag FROM cache_tags WHERE key = ?',
+                                       (self.make_key(key),)).fetchall()
+        return tuple(row[0] for row in rows)
+
+    def set(self, key, value, timeout, tags=()):
+        disk_key = self.make_key(key)
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)',
+                (disk_key, blob, time.time() + timeout)
+            )
+            conn.executemany('INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)',
+                             [(tag, disk_key) for tag in tags])
+
+        self.writes += 1
+        if self.writes % self.PURGE_EVERY == 0:
+            self.purge()
+
+    def delete(self, key):
+        disk_key = self.make_key(key)
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM cache_entries WHERE key = ?', (disk_key,))
+            conn.execute('DELETE FROM cache_tags WHERE key = ?', (disk_key,))
+
+    def invalidate_tag(self, tag):
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.execute(
+                'DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_tags WHERE tag = ?)',
+                (tag,)
+            )
+            conn.execute('DELETE FROM cache_tags WHERE tag = ?', (tag,))
+        return cursor.rowcount
+
+    def purge(self):
+        """Remove entradas vencidas há mais que stale_ttl e locks abandonados"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM cache_entries WHERE expires < ?', (now - self.stale_ttl,))
+            conn.execute('DELETE FROM cache_tags WHERE key NOT IN (SELECT key FROM cache_entries)')
+            conn.execute('DELETE FROM cache_locks WHERE expires < ?', (now,))
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM cache_entries')
+            conn.execute('DELETE FROM cache_tags')
+            conn.execute('DELETE FROM cache_locks')
+
+    # Proteção contra stampede: um único worker recalcula cada chave
+    def acquire_lock(self, key, ttl):
+        now = time.time()
+        cursor = self._connect().execute('''
+            INSERT INTO cache_locks (key, owner, expires) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires = excluded.expires
+            WHERE cache_locks.expires < ?
+        ''', (self.make_key(key), self._owner(), now + ttl, now))
+        return cursor.rowcount == 1
+
+    def release_lock(self, key):
+        self._connect().execute('DELETE FROM cache_locks WHERE key = ? AND owner = ?',
+                                (self.make_key(key), self._owner()))
+
+    def is_locked(self, key):
+        row = self._connect().execute('SELECT expires FROM cache_locks WHERE key = ?',
+                                      (self.make_key(key),)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+
+    def get_stats(self):
+        conn = self._connect()
+        entries, size = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache_entries'
+        ).fetchone()
+        return {'entries': entries, 'bytes': size, 'path': self.path}
@@ -0,0 +1,196 @@
+"""
+Dicionários com expiração para o Backend NexoCrypto
+Cada entrada entra num slot de uma timing wheel (por segundo de expiração);
+a varredura remove slot a slot, em O(1) amortizado por entrada, sem percorrer
+o dicionário inteiro
+"""
+
+import os
+import time
+import threading
+
+
+class TimingWheel:
+    """Slots de expiração: número do slot -> chaves que vencem nele"""
+
+    def __init__(self, resolution=1.0):
+        self.resolution = resolution
+        self.slots = {}
+        # Primeiro slot ainda não varrido; nenhum slot ocupado fica abaixo dele
+        self.cursor = None
+
+    def _slot(self, expires):
+        return int(expires // self.resolution)
+
+    def schedule(self, key, expires):
+        slot = self._slot(expires)
+        bucket = self.slots.get(slot)
+        if bucket is None:
+            self.slots[slot] = [key]
+        else:
+            bucket.append(key)
+        # TTL menor que o das entradas anteriores: a varredura volta até este slot
+        if self.cursor is not None and slot < self.cursor:
+            self.cursor = slot
+
+    def pop_due(self, now):
+        """Chaves dos slots já vencidos (podem incluir chaves regravadas depois)"""
+        current = self._slot(now)
+        if self.cursor is None:
+            self.cursor = min(min(self.slots, default=current), current)
+        due = []
+        if current - self.cursor > len(self.slots):
+            # Longo tempo sem varrer: mais barato olhar só os slots ocupados
+            for slot in [slot for slot in self.slots if slot < current]:
+                due.extend(self.slots.pop(slot))
+        else:
+            for slot in range(self.cursor, current):
+                bucket = self.slots.pop(slot, None)
+                if bucket:
+                    due.extend(bucket)
+        self.cursor = max(self.cursor, current)
+        return due
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.slots.values())
+
+
+class ExpiringDict:
+    """Dicionário com TTL por entrada; entradas vencidas somem mesmo sem leitura"""
+
+    def __init__(self, name, ttl, resolution=1.0, clock=time.time):
+        self.name = name
+        self.ttl = ttl
+        self.clock = clock
+        self.data = {}  # chave -> (valor, expira_em)
+        self.wheel = TimingWheel(resolution)
+        self.lock = threading.Lock()
+        self.expired_total = 0
+        self.sweeper = None
+
+    def set(self, key, value, ttl=None):
+        now = self.clock()
+        expires = now + (self.ttl if ttl is None else ttl)
+        with self.lock:
+            self.data[key] = (value, expires)
+            self.wheel.schedule(key, expires)
+            # Varredura incremental: cada escrita paga pelos slots vencidos
+            self._sweep(now)
+        if self.sweeper is not None:
+            self.sweeper.start()
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry is None or entry[1] <= self.clock():
+            return None
+        return entry
+
+    def __getitem__(self, key):
+        entry = self._live(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry[0]
+
+    def get(self, key, default=None):
+        entry = self._live(key)
+        return default if entry is None else entry[0]
+
+    def __contains__(self, key):
+        return self._live(key) is not None
+
+    def __delitem__(self, key):
+        with self.lock:
+            del self.data[key]
+
+    def pop(self, key, default=None):
+        with self.lock:
+            entry = self.data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def __len__(self):
+        return len(self.data)
+
+    def _sweep(self, now):
+        expired = 0
+        for key in self.wheel.pop_due(now):
+            entry = self.data.get(key)
+            # Chave removida ou regravada com expiração posterior: ignora
+            if entry is not None and entry[1] <= now:
+                del self.data[key]
+                expired += 1
+        self.expired_total += expired
+        return expired
+
+    def sweep(self):
+        """Remove as entradas vencidas; retorna quantas saíram"""
+        with self.lock:
+            return self._sweep(self.clock())
+
+    def get_stats(self):
+        return {
+            'entries': len(self.data),
+            'scheduled': len(self.wheel),
+            'expired_total': self.expired_total,
+            'ttl': self.ttl
+        }
+
+
+class ExpirySweeper:
+    """Varre periodicamente os dicionários registrados (mesmo sem escritas)"""
+
+    def __init__(self, interval=30):
+        self.interval = interval
+        self.stores = []
+        self.pid = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def register(self, store):
+        self.stores.append(store)
+        store.sweeper = self
+        return store
+
+    def start(self):
+        """Inicia a varredura (chamado a cada escrita; recria a thread após fork)"""
+        if self.pid == os.getpid() and self.thread and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.pid == os.getpid() and self.thread and self.thread.is_alive():
+                return
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self._loop, name='nexo-expiry-sweeper',
+                                           daemon=True)
+            self.thread.start()
+
+    def _loop(self):
+        pid = os.getpid()
+        while self.pid == pid:
+            time.sleep(self.interval)
+            for store in self.stores:
+                try:
+                    store.sweep()
+                except Exception as e:
+                    print(f"Erro na varredura de {store.name}: {e}")
+
+    def get_stats(self):
+        return {store.name: store.get_stats() for store in self.stores}
+
+    def render_prometheus(self):
+        """Tamanho e expirações de cada dicionário no formato Prometheus"""
+        pid = os.getpid()
+        lines = [
+            '# HELP nexocrypto_expiring_entries Entradas vivas por dicionário com TTL',
+            '# TYPE nexocrypto_expiring_entries gauge'
+        ]
+        lines += [f'nexocrypto_expiring_entries{{store="{s.name}",pid="{pid}"}} {len(s)}'
+                  for s in self.stores]
+        lines += [
+            '# HELP nexocrypto_expired_entries_total Entradas removidas por expiração',
+            '# TYPE nexocrypto_expired_entries_total counter'
+        ]
+        lines += [f'nexocrypto_expired_entries_total{{store="{s.name}",pid="{pid}"}} {s.expired_total}'
+                  for s in self.stores]
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,230 @@
+"""
+Fila de jobs em background para o Backend NexoCrypto
+Executa tarefas lentas fora das threads de requisição com estado persistido em SQLite
+"""
+
+import os
+import json
+import uuid
+import sqlite3
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from process_info import pid_alive
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+
+
+class JobQueue:
+    def __init__(self, db_path, max_workers=4, factory=sqlite3.Connection,
+                 max_attempts=3, retention=7 * 24 * 3600):
+        self.db_path = db_path
+        self.factory = factory
+        self.max_workers = max_workers
+        # Job que derrubou o worker esse número de vezes (OOM, segfault, timeout
+        # do gunicorn) é marcado como falho em vez de reenfileirado
+        self.max_attempts = max_attempts
+        # Jobs concluídos ou falhos são removidos depois desse tempo (prune)
+        self.retention = retention
+        self.handlers = {}
+        self.executor = None
+        self.executor_pid = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10, factory=self.factory)
+
+    def _get_executor(self):
+        """Cria o pool sob demanda (seguro após fork do gunicorn)"""
+        with self.lock:
+            if self.executor is None or self.executor_pid != os.getpid():
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                   thread_name_prefix='nexo-job')
+                self.executor_pid = os.getpid()
+            return self.executor
+
+    def register(self, kind):
+        """Decorator que registra o handler de um tipo de job"""
+        def decorator(f):
+            self.handlers[kind] = f
+            return f
+        return decorator
+
+    def submit(self, kind, payload, owner=None):
+        """Enfileira um job e retorna seu id imediatamente (`owner`: quem pode consultá-lo)"""
+        if kind not in self.handlers:
+            raise ValueError(f"Tipo de job desconhecido: {kind}")
+
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            conn.execute('''
+                INSERT INTO background_jobs (id, kind, status, payload, progress, owner)
+                VALUES (?, ?, ?, ?, 0, ?)
+            ''', (job_id, kind, JOB_QUEUED, json.dumps(payload), owner))
+            conn.commit()
+        finally:
+            conn.close()
+
+        self._get_executor().submit(self._run, job_id)
+        return job_id
+
+    def update_progress(self, job_id, progress, message=None):
+        """Atualiza progresso (0-100) de um job em execução"""
+        conn = self._connect()
+        try:
+            conn.execute('''
+                UPDATE background_jobs
+                SET progress = ?, message = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (progress, message, job_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _claim(self, job_id):
+        """Marca o job como em execução; falha se outro worker já o pegou"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                UPDATE background_jobs
+                SET status = ?, worker_pid = ?, attempts = attempts + 1,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status = ?
+            ''', (JOB_RUNNING, os.getpid(), job_id, JOB_QUEUED))
+            conn.commit()
+            if cursor.rowcount != 1:
+                return None
+            row = conn.execute('SELECT kind, payload FROM background_jobs WHERE id = ?',
+                               (job_id,)).fetchone()
+            return row
+        finally:
+            conn.close()
+
+    def _finish(self, job_id, status, result=None, error=None):
+        conn = self._connect()
+        try:
+            conn.execute('''
+                UPDATE background_jobs
+                SET status = ?, result = ?, error = ?, updated_at = CURRENT_TIMESTAMP,
+                    progress = CASE WHEN ? = 'completed' THEN 100 ELSE progress END
+                WHERE id = ?
+            ''', (status, json.dumps(result) if result is not None else None,
+                  error, status, job_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _run(self, job_id):
+        """Executa o job dentro do pool"""
+        claimed = self._claim(job_id)
+        if not claimed:
+            return
+
+        kind, payload = claimed
+        handler = self.handlers.get(kind)
+        if handler is None:
+            self._finish(job_id, JOB_FAILED, error=f"Tipo de job desconhecido: {kind}")
+            return
+
+        try:
+            result = handler(json.loads(payload),
+                             lambda progress, message=None: self.update_progress(job_id, progress, message))
+            self._finish(job_id, JOB_COMPLETED, result=result)
+        except Exception as e:
+            print(f"❌ Job {job_id} ({kind}) falhou: {e}")
+            traceback.print_exc()
+            self._finish(job_id, JOB_FAILED, error=str(e))
+
+    def resume_pending(self):
+        """Reenfileira jobs interrompidos por reinício de worker"""
+        try:
+            conn = self._connect()
+        except sqlite3.Error:
+            return 0
+
+        try:
+            rows = conn.execute('''
+                SELECT id, worker_pid, attempts FROM background_jobs
+                WHERE status = ?
+            ''', (JOB_RUNNING,)).fetchall()
+
+            for job_id, worker_pid, attempts in rows:
+                if worker_pid == os.getpid() or pid_alive(worker_pid):
+                    continue
+                if attempts >= self.max_attempts:
+                    # Worker morreu em todas as tentativas: não reenfileira mais
+                    conn.execute('''
+                        UPDATE background_jobs
+                        SET status = ?, error = ?, updated_at = CURRENT_TIMESTAMP
+                        WHERE id = ? AND status = ?
+                    ''', (JOB_FAILED, f"Worker encerrado durante o job em {attempts} tentativas",
+                          job_id, JOB_RUNNING))
+                else:
+                    conn.execute('''
+                        UPDATE background_jobs SET status = ?, updated_at = CURRENT_TIMESTAMP
+                        WHERE id = ? AND status = ?
+                    ''', (JOB_QUEUED, job_id, JOB_RUNNING))
+            conn.commit()
+
+            pending = [row[0] for row in conn.execute(
+                'SELECT id FROM background_jobs WHERE status = ?', (JOB_QUEUED,)
+            ).fetchall()]
+        finally:
+            conn.close()
+
+        executor = self._get_executor() if pending else None
+        for job_id in pending:
+            executor.submit(self._run, job_id)
+
+        return len(pending)
+
+    def get(self, job_id):
+        """Retorna o estado atual de um job ou None"""
+        conn = self._connect()
+        try:
+            row = conn.execute('''
+                SELECT id, kind, status, progress, message, result, error,
+                       created_at, updated_at, owner
+                FROM background_jobs
+                WHERE id = ?
+            ''', (job_id,)).fetchone()
+        finally:
+            conn.close()
+
+        if not row:
+            return None
+
+        return {
+            'job_id': row[0],
+            'kind': row[1],
+            'status': row[2],
+            'progress': row[3],
+            'message': row[4],
+            'result': json.loads(row[5]) if row[5] else None,
+            'error': row[6],
+            'created_at': row[7],
+            'updated_at': row[8],
+            'owner': row[9]
+        }
+
+    def prune(self, conn=None):
+        """Remove jobs concluídos/falhos mais antigos que `retention`; retorna quantos"""
+        own = conn is None
+        if own:
+            conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                DELETE FROM background_jobs
+                WHERE status IN (?, ?) AND updated_at < datetime('now', ?)
+            ''', (JOB_COMPLETED, JOB_FAILED, f"-{int(self.retention)} seconds"))
+            if own:
+                conn.commit()
+            return cursor.rowcount
+        finally:
+            if own:
+                conn.close()
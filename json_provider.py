@@ -0,0 +1,82 @@
+"""
+Provider JSON rápido para o Backend NexoCrypto
+Usa orjson quando instalado e cai para o encoder da stdlib caso contrário
+"""
+
+import json
+import sqlite3
+import decimal
+from datetime import date, datetime
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional
+    orjson = None
+
+
+def _default(o):
+    """Tipos extras: datas em ISO-8601 e linhas compactas do SQLite"""
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, sqlite3.Row):
+        return dict(zip(o.keys(), o))
+    if hasattr(o, '_asdict'):
+        return o._asdict()
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    # Ordenar chaves custa caro em listas grandes e o frontend não depende disso
+    sort_keys = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.encoder = 'orjson' if orjson is not None else 'json'
+
+    def _orjson_options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj, indent=False):
+        """Serializa direto para bytes (sem passar por str)"""
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default, option=self._orjson_options(indent))
+        return json.dumps(
+            obj,
+            default=_default,
+            ensure_ascii=self.ensure_ascii,
+            sort_keys=self.sort_keys,
+            indent=2 if indent else None,
+            separators=None if indent else (',', ':')
+        ).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=_default,
+                                option=self._orjson_options()).decode('utf-8')
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent),
+                                        mimetype=self.mimetype)
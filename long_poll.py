@@ -0,0 +1,97 @@
+"""
+Long-polling para o Backend NexoCrypto
+Requisições esperam por chave (ex.: uuid) até que uma escrita as notifique,
+em threads (WSGI) ou no event loop (ASGI)
+"""
+
+import asyncio
+import threading
+
+
+class KeyedWaiters:
+    def __init__(self, max_waiters=200):
+        # Limite de requisições presas esperando ao mesmo tempo neste worker
+        self.max_waiters = max_waiters
+        self.waiting = 0
+        self.lock = threading.Lock()
+        # chave -> [Event, número de threads esperando]
+        self.events = {}
+        # chave -> [(loop, future)]
+        self.futures = {}
+
+    def try_acquire(self):
+        """Reserva uma vaga de espera; False se o worker já está no limite"""
+        with self.lock:
+            if self.waiting >= self.max_waiters:
+                return False
+            self.waiting += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.waiting -= 1
+
+    def wait(self, key, timeout):
+        """Bloqueia a thread até notify(key) ou timeout; True se notificado"""
+        with self.lock:
+            entry = self.events.get(key)
+            if entry is None:
+                entry = self.events[key] = [threading.Event(), 0]
+            entry[1] += 1
+            event = entry[0]
+
+        try:
+            return event.wait(timeout)
+        finally:
+            with self.lock:
+                entry[1] -= 1
+                if entry[1] == 0 and self.events.get(key) is entry:
+                    del self.events[key]
+
+    async def wait_async(self, key, timeout):
+        """Versão para o event loop: não ocupa thread durante a espera"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        item = (loop, future)
+        with self.lock:
+            self.futures.setdefault(key, []).append(item)
+
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self.lock:
+                items = self.futures.get(key)
+                if items is not None and item in items:
+                    items.remove(item)
+                    if not items:
+                        del self.futures[key]
+
+    @staticmethod
+    def _resolve(future):
+        if not future.done():
+            future.set_result(True)
+
+    def notify(self, key):
+        """Acorda todos que esperam por `key` (seguro a partir de qualquer thread)"""
+        with self.lock:
+            entry = self.events.pop(key, None)
+            items = self.futures.pop(key, [])
+
+        if entry is not None:
+            entry[0].set()
+        for loop, future in items:
+            try:
+                loop.call_soon_threadsafe(self._resolve, future)
+            except RuntimeError:  # loop já encerrado
+                pass
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'waiting': self.waiting,
+                'max_waiters': self.max_waiters,
+                'keys': len(self.events) + len(self.futures)
+            }
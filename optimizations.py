@@ -4,22 +4,457 @@ Implementa cache, compressão e otimizações de banco de dados
 """
 
 import os
-import gzip
 import json
+import math
 import time
+import zlib
+import struct
 import sqlite3
+import pickle
 import hashlib
+import threading
+from collections import OrderedDict
 from functools import wraps
 from datetime import datetime, timedelta
-from flask import request, jsonify, g
-from flask_caching import Cache
-import redis
+from flask import request, jsonify, g, current_app
+from disk_cache import DiskCache
+from process_info import process_matches, process_start_time
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional
+    brotli = None
+
+class ResponseCompressor:
+    """Compressão de respostas com negociação de conteúdo e cache LRU"""
+
+    COMPRESSIBLE_TYPES = (
+        'text/', 'application/json', 'application/javascript',
+        'application/xml', 'image/svg+xml'
+    )
+
+    def __init__(self, app=None):
+        self.level = 6
+        self.brotli_quality = 4
+        self.min_size = 1000
+        self.algorithms = ['br', 'gzip', 'deflate']
+        self.cache_max_entries = 256
+        self.cache_max_body = 256 * 1024
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'compressed': 0, 'cache_hits': 0, 'streamed': 0, 'skipped': 0}
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Lê configuração do app (COMPRESS_*)"""
+        self.level = app.config.get('COMPRESS_LEVEL', self.level)
+        self.brotli_quality = app.config.get('COMPRESS_BR_LEVEL', self.brotli_quality)
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', self.min_size)
+        self.cache_max_entries = app.config.get('COMPRESS_CACHE_SIZE', self.cache_max_entries)
+        algorithms = app.config.get('COMPRESS_ALGORITHMS', self.algorithms)
+        self.algorithms = [a for a in algorithms if a != 'br' or brotli is not None]
+
+    def choose_algorithm(self, accept_encodings):
+        """Escolhe o melhor algoritmo aceito pelo cliente (respeita q-values)"""
+        best, best_quality = None, 0
+        for algorithm in self.algorithms:
+            quality = accept_encodings[algorithm]
+            if quality > best_quality:
+                best, best_quality = algorithm, quality
+        return best
+
+    def _compressor(self, algorithm):
+        if algorithm == 'br':
+            return brotli.Compressor(quality=self.brotli_quality)
+        wbits = 31 if algorithm == 'gzip' else 15  # 31 = cabeçalho gzip, 15 = zlib
+        return zlib.compressobj(self.level, zlib.DEFLATED, wbits)
+
+    def compress(self, data, algorithm):
+        """Comprime um corpo completo, reaproveitando resultados idênticos"""
+        cacheable = len(data) <= self.cache_max_body
+        if cacheable:
+            key = (algorithm, self.level, self.brotli_quality,
+                   hashlib.blake2b(data, digest_size=16).digest())
+            with self.lock:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.cache.move_to_end(key)
+                    self.stats['cache_hits'] += 1
+                    return cached
+
+        if algorithm == 'br':
+            compressed = brotli.compress(data, quality=self.brotli_quality)
+        else:
+            compressor = self._compressor(algorithm)
+            compressed = compressor.compress(data) + compressor.flush()
+        self.stats['compressed'] += 1
+
+        if cacheable:
+            with self.lock:
+                self.cache[key] = compressed
+                if len(self.cache) > self.cache_max_entries:
+                    self.cache.popitem(last=False)
+
+        return compressed
+
+    def _stream(self, chunks, algorithm):
+        """Comprime respostas geradas sob demanda, chunk a chunk"""
+        compressor = self._compressor(algorithm)
+        for chunk in chunks:
+            if algorithm == 'br':
+                data = compressor.process(chunk) + compressor.flush()
+            else:
+                data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.finish() if algorithm == 'br' else compressor.flush()
+
+    @staticmethod
+    def _encoded_etag(response, algorithm):
+        """ETag forte vale para uma representação: a versão comprimida recebe sufixo"""
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{algorithm}")
+
+    def process_response(self, response):
+        """Aplica compressão na resposta quando apropriado"""
+        if (response.status_code < 200 or response.status_code in (204, 206, 304) or
+                request.method == 'HEAD' or
+                'Content-Encoding' in response.headers or
+                not (response.mimetype or '').startswith(self.COMPRESSIBLE_TYPES)):
+            return response
+
+        if response.is_streamed:
+            response.vary.add('Accept-Encoding')
+            algorithm = self.choose_algorithm(request.accept_encodings)
+            if not algorithm or response.direct_passthrough:
+                return response
+            response.response = self._stream(response.iter_encoded(), algorithm)
+            response.headers['Content-Encoding'] = algorithm
+            response.headers.pop('Content-Length', None)
+            self._encoded_etag(response, algorithm)
+            self.stats['streamed'] += 1
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            self.stats['skipped'] += 1
+            return response
+
+        response.vary.add('Accept-Encoding')
+        algorithm = self.choose_algorithm(request.accept_encodings)
+        if not algorithm:
+            return response
+
+        try:
+            compressed = self.compress(data, algorithm)
+        except Exception as e:
+            print(f"Erro na compressão ({algorithm}): {e}")
+            return response  # Se falhar, retorna sem compressão
+
+        if len(compressed) >= len(data):
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = algorithm
+        self._encoded_etag(response, algorithm)
+        return response
+
+_MISSING = object()
+
+
+def estimate_size(value, depth=0):
+    """Estimativa barata do tamanho em bytes de um valor cacheado"""
+    if isinstance(value, (bytes, bytearray, str)):
+        return 48 + len(value)
+    if depth >= 4:
+        return 64
+    if isinstance(value, dict):
+        return 64 + sum(estimate_size(k, depth + 1) + estimate_size(v, depth + 1)
+                        for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return 56 + sum(estimate_size(item, depth + 1) for item in value)
+    return 32
+
+
+class LRUCache:
+    """Cache em memória com TTL por entrada, orçamento de memória e invalidação por tag"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, default_timeout=300):
+        self.max_bytes = max_bytes
+        self.default_timeout = default_timeout
+        # chave -> (valor, expira_em, tamanho, tags)
+        self.entries = OrderedDict()
+        self.tags = {}
+        self.size = 0
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'invalidated': 0}
+
+    def _remove(self, key):
+        value, expires, size, tags = self.entries.pop(key)
+        self.size -= size
+        for tag in tags:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+    def get(self, key, default=_MISSING):
+        """Retorna o valor ou `default` (entradas expiradas contam como miss)"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[1] > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return entry[0]
+                self._remove(key)
+                self.stats['expired'] += 1
+            self.stats['misses'] += 1
+        return default
+
+    def set(self, key, value, timeout=None, tags=(), size=None):
+        if size is None:
+            size = estimate_size(value)
+        if size > self.max_bytes:
+            return False
+
+        expires = time.monotonic() + (self.default_timeout if timeout is None else timeout)
+        tags = frozenset(tags)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (value, expires, size, tags)
+            self.size += size
+            for tag in tags:
+                self.tags.setdefault(tag, set()).add(key)
+
+            # Remove as menos usadas até caber no orçamento
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.stats['evictions'] += 1
+        return True
+
+    def delete(self, key):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+                return True
+        return False
+
+    def invalidate_tag(self, tag):
+        """Remove todas as entradas marcadas com `tag`"""
+        with self.lock:
+            keys = list(self.tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            self.stats['invalidated'] += len(keys)
+        return len(keys)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.tags.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                **self.stats,
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes
+            }
+
+
+class TieredCache:
+    """L1 em memória (por worker) na frente de um L2 em disco compartilhado pelo host
+
+    Sem L2 se comporta como o próprio LRUCache. Com L2, o L1 guarda entradas por
+    no máximo `l1_max_ttl` segundos, o que limita o tempo em que um worker serve
+    uma entrada invalidada por outro.
+    """
+
+    def __init__(self, l1, l2=None, l1_max_ttl=5, lock_timeout=10):
+        self.l1 = l1
+        self.l2 = l2
+        self.l1_max_ttl = l1_max_ttl
+        self.lock_timeout = lock_timeout
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.stats = {'l2_hits': 0, 'computed': 0, 'coalesced': 0, 'stale_served': 0, 'l2_errors': 0}
+
+    @property
+    def default_timeout(self):
+        return self.l1.default_timeout
+
+    def _l1_timeout(self, timeout):
+        if self.l2 is None:
+            return timeout
+        return min(timeout, self.l1_max_ttl)
+
+    def get(self, key, default=_MISSING):
+        value = self.l1.get(key)
+        if value is not _MISSING or self.l2 is None:
+            return default if value is _MISSING else value
+
+        try:
+            entry = self.l2.get(key)
+        except sqlite3.Error:
+            self.stats['l2_errors'] += 1
+            return default
+        if entry is None:
+            return default
+
+        value, expires = entry
+        self.stats['l2_hits'] += 1
+        self._promote(key, value, expires)
+        return value
+
+    def _promote(self, key, value, expires):
+        """Copia uma entrada do L2 para o L1 com as mesmas tags (invalidate_tag alcança o L1)"""
+        try:
+            tags = self.l2.tags(key)
+        except sqlite3.Error:
+            self.stats['l2_errors'] += 1
+            return
+        self.l1.set(key, value, timeout=min(expires - time.time(), self.l1_max_ttl), tags=tags)
+
+    def set(self, key, value, timeout=None, tags=(), size=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        self.l1.set(key, value, timeout=self._l1_timeout(timeout), tags=tags, size=size)
+        if self.l2 is not None:
+            try:
+                self.l2.set(key, value, timeout, tags)
+            except (sqlite3.Error, pickle.PicklingError, TypeError, AttributeError):
+                self.stats['l2_errors'] += 1
+
+    # Invalidação chamada depois do commit da escrita: falha no L2 não vira 500,
+    # os outros workers deixam de servir a entrada quando o TTL do L1 vence
+    def delete(self, key):
+        self.l1.delete(key)
+        if self.l2 is not None:
+            try:
+                self.l2.delete(key)
+            except sqlite3.Error:
+                self.stats['l2_errors'] += 1
+
+    def invalidate_tag(self, tag):
+        removed = self.l1.invalidate_tag(tag)
+        if self.l2 is not None:
+            try:
+                removed += self.l2.invalidate_tag(tag)
+            except sqlite3.Error:
+                self.stats['l2_errors'] += 1
+        return removed
+
+    def clear(self):
+        self.l1.clear()
+        if self.l2 is not None:
+            try:
+                self.l2.clear()
+            except sqlite3.Error:
+                self.stats['l2_errors'] += 1
+
+    def __len__(self):
+        return len(self.l1)
+
+    def get_or_compute(self, key, compute, timeout=None, tags=(), cacheable=None, size=None):
+        """Busca nos dois níveis; em caso de miss só uma thread do host recalcula
+
+        Retorna (valor, calculado). Threads do mesmo worker esperam a que está
+        calculando; outros workers esperam o lock no L2 ou recebem a entrada
+        vencida (stale) enquanto ela é recalculada.
+        """
+        value = self.get(key)
+        if value is not _MISSING:
+            return value, False
+
+        with self.lock:
+            event = self.inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self.inflight[key] = threading.Event()
+
+        if not leader:
+            self.stats['coalesced'] += 1
+            event.wait(self.lock_timeout)
+            value = self.get(key)
+            if value is not _MISSING:
+                return value, False
+            # Resultado não cacheável (ou falha de quem calculava): calcula por conta própria
+            return compute(), True
+
+        try:
+            return self._compute_shared(key, compute, timeout, tags, cacheable, size)
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            event.set()
+
+    def _compute_shared(self, key, compute, timeout, tags, cacheable, size):
+        locked = False
+        if self.l2 is not None:
+            try:
+                locked = self.l2.acquire_lock(key, self.lock_timeout)
+                if not locked:
+                    # Outro worker está recalculando: serve a versão vencida ou espera
+                    deadline = time.monotonic() + self.lock_timeout
+                    while True:
+                        entry = self.l2.get(key, allow_stale=True)
+                        if entry is not None:
+                            value, expires = entry
+                            if expires > time.time():
+                                self._promote(key, value, expires)
+                            else:
+                                self.stats['stale_served'] += 1
+                            return value, False
+                        if time.monotonic() >= deadline or not self.l2.is_locked(key):
+                            break
+                        time.sleep(0.05)
+            except sqlite3.Error:
+                self.stats['l2_errors'] += 1
+
+        try:
+            self.stats['computed'] += 1
+            value = compute()
+            if cacheable is None or cacheable(value):
+                self.set(key, value, timeout=timeout, tags=tags, size=size)
+            return value, True
+        finally:
+            if locked:
+                try:
+                    self.l2.release_lock(key)
+                except sqlite3.Error:
+                    self.stats['l2_errors'] += 1
+
+    def get_stats(self):
+        stats = {'l1': self.l1.get_stats(), **self.stats}
+        if self.l2 is not None:
+            try:
+                stats['l2'] = self.l2.get_stats()
+            except sqlite3.Error:
+                stats['l2'] = None
+        return stats
+
+
+def user_cache_tag(uuid_code):
+    """Tag das entradas de cache derivadas dos dados de um usuário"""
+    return f"user:{uuid_code}"
+
 
 class PerformanceOptimizer:
     def __init__(self, app=None):
         self.app = app
         self.cache = None
         self.redis_client = None
+        self.compressor = ResponseCompressor()
         
         if app:
             self.init_app(app)
@@ -28,15 +463,18 @@ class PerformanceOptimizer:
         """Inicializa otimizações no app Flask"""
         self.app = app
         
-        # Configuração de cache
-        cache_config = {
-            'CACHE_TYPE': 'simple',  # Usar Redis em produção
-            'CACHE_DEFAULT_TIMEOUT': 300
-        }
-        
-        self.cache = Cache(app, config=cache_config)
+        # Cache em memória (LRU + TTL, limitado por CACHE_MAX_BYTES); o nível em
+        # disco compartilhado é ligado por enable_shared_cache
+        self.cache = TieredCache(
+            LRUCache(
+                max_bytes=app.config.get('CACHE_MAX_BYTES', 64 * 1024 * 1024),
+                default_timeout=app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
+            ),
+            l1_max_ttl=app.config.get('CACHE_L1_MAX_TTL', 5)
+        )
         
         # Middleware de compressão
+        self.compressor.init_app(app)
         app.after_request(self.compress_response)
         
         # Middleware de cache de headers
@@ -49,26 +487,21 @@ class PerformanceOptimizer:
         # Pool de conexões do banco
         self.init_db_pool()
     
+    def enable_shared_cache(self, path, factory=sqlite3.Connection):
+        """Liga o segundo nível de cache (SQLite em disco, compartilhado entre workers)"""
+        try:
+            self.cache.l2 = DiskCache(path, factory=factory)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Cache compartilhado indisponível, usando só memória local: {e}")
+    
     def init_db_pool(self):
         """Inicializa pool de conexões do banco"""
         # Em produção, usar um pool real como SQLAlchemy
         pass
     
     def compress_response(self, response):
-        """Comprime respostas grandes"""
-        if (response.status_code == 200 and 
-            'gzip' in request.headers.get('Accept-Encoding', '') and
-            len(response.data) > 1000):  # Só comprime se > 1KB
-            
-            try:
-                compressed_data = gzip.compress(response.data)
-                response.data = compressed_data
-                response.headers['Content-Encoding'] = 'gzip'
-                response.headers['Content-Length'] = len(compressed_data)
-            except:
-                pass  # Se falhar, retorna sem compressão
-        
-        return response
+        """Comprime respostas grandes (ver ResponseCompressor)"""
+        return self.compressor.process_response(response)
     
     def add_cache_headers(self, response):
         """Adiciona headers de cache apropriados"""
@@ -93,69 +526,97 @@ class PerformanceOptimizer:
     
     def start_timer(self):
         """Inicia timer para métricas"""
-        g.start_time = time.time()
+        g.start_time = time.perf_counter()
     
     def end_timer(self, response):
-        """Finaliza timer e adiciona métricas"""
+        """Finaliza timer e alimenta o histograma do endpoint"""
         if hasattr(g, 'start_time'):
-            duration = time.time() - g.start_time
+            duration = time.perf_counter() - g.start_time
             response.headers['X-Response-Time'] = f"{duration:.3f}s"
+            metrics_collector.record_request(request.endpoint or 'unknown', duration,
+                                             response.status_code)
         
         return response
     
-    def cached(self, timeout=300, key_prefix=''):
-        """Decorator para cache de funções"""
+    def cached(self, timeout=300, key_prefix='', tags=None, cacheable=None):
+        """Decorator para cache de funções
+
+        `tags` é uma sequência de tags ou uma função (*args, **kwargs) -> tags;
+        `cacheable(resultado)` decide se o resultado é guardado.
+        """
         def decorator(f):
             @wraps(f)
             def decorated_function(*args, **kwargs):
-                # Gera chave de cache
-                cache_key = f"{key_prefix}:{f.__name__}:{hashlib.md5(str(args + tuple(kwargs.items())).encode()).hexdigest()}"
-                
-                # Tenta buscar no cache
-                result = self.cache.get(cache_key)
-                if result is not None:
-                    return result
+                # Chave com os próprios argumentos (sem serializar/hashear)
+                cache_key = (key_prefix, f.__qualname__, args, tuple(sorted(kwargs.items())))
+                try:
+                    hash(cache_key)
+                except TypeError:  # argumentos não-hasheáveis: sem cache
+                    return f(*args, **kwargs)
                 
-                # Executa função e salva no cache
-                result = f(*args, **kwargs)
-                self.cache.set(cache_key, result, timeout=timeout)
+                entry_tags = tags(*args, **kwargs) if callable(tags) else (tags or ())
+                result, computed = self.cache.get_or_compute(
+                    cache_key, lambda: f(*args, **kwargs),
+                    timeout=timeout, tags=entry_tags, cacheable=cacheable
+                )
                 
+                if computed:
+                    metrics_collector.record_cache_miss()
+                else:
+                    metrics_collector.record_cache_hit()
                 return result
             
             return decorated_function
         return decorator
     
-    def cache_api_response(self, timeout=60):
-        """Decorator para cache de respostas da API"""
+    def cache_api_response(self, timeout=60, tags=None, version=None):
+        """Decorator para cache de respostas da API
+
+        Por padrão a entrada recebe a tag do usuário quando a rota tem `uuid_code`.
+        `version` (função dos argumentos da rota) entra na chave, para que escritas
+        feitas em outros workers também tornem a entrada obsoleta.
+        """
         def decorator(f):
             @wraps(f)
             def decorated_function(*args, **kwargs):
-                # Gera chave baseada na URL e parâmetros
-                cache_key = f"api:{request.endpoint}:{hashlib.md5(request.url.encode()).hexdigest()}"
+                cache_key = ('api', request.endpoint, request.full_path)
+                if version is not None:
+                    cache_key += (version(**kwargs),)
                 
-                # Verifica cache
-                cached_response = self.cache.get(cache_key)
-                if cached_response:
-                    response = jsonify(cached_response)
-                    response.headers['X-Cache'] = 'HIT'
-                    return response
+                if callable(tags):
+                    entry_tags = tags(**kwargs)
+                elif tags is not None:
+                    entry_tags = tags
+                else:
+                    entry_tags = [user_cache_tag(kwargs['uuid_code'])] if 'uuid_code' in kwargs else []
                 
-                # Executa função
-                result = f(*args, **kwargs)
+                def compute():
+                    # Corpo já serializado: o hit não passa de novo pelo JSON
+                    response = current_app.make_response(f(*args, **kwargs))
+                    return response.get_data(), response.status_code, list(response.headers.items())
                 
-                # Salva no cache se for sucesso
-                if hasattr(result, 'status_code') and result.status_code == 200:
-                    try:
-                        data = result.get_json()
-                        self.cache.set(cache_key, data, timeout=timeout)
-                        result.headers['X-Cache'] = 'MISS'
-                    except:
-                        pass
+                (body, status, headers), computed = self.cache.get_or_compute(
+                    cache_key, compute, timeout=timeout, tags=entry_tags,
+                    cacheable=lambda entry: entry[1] == 200
+                )
                 
-                return result
+                response = current_app.response_class(body, status=status, headers=headers)
+                if status == 200:
+                    response.headers['X-Cache'] = 'MISS' if computed else 'HIT'
+                    if computed:
+                        metrics_collector.record_cache_miss()
+                    else:
+                        metrics_collector.record_cache_hit()
+                return response
             
             return decorated_function
         return decorator
+    
+    def invalidate_user(self, uuid_code):
+        """Descarta as entradas em cache de um usuário (chamar após escritas)"""
+        if self.cache is None:
+            return 0
+        return self.cache.invalidate_tag(user_cache_tag(uuid_code))
 
 class DatabaseOptimizer:
     def __init__(self, db_path):
@@ -204,127 +665,730 @@ class DatabaseOptimizer:
         finally:
             self.return_connection(conn)
     
-    def optimize_database(self):
-        """Executa otimizações no banco"""
-        optimizations = [
-            "PRAGMA journal_mode = WAL",
-            "PRAGMA synchronous = NORMAL", 
-            "PRAGMA cache_size = 10000",
-            "PRAGMA temp_store = MEMORY",
-            "VACUUM",
-            "ANALYZE"
-        ]
-        
-        for optimization in optimizations:
+    SETTINGS = [
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL", 
+        "PRAGMA cache_size = 10000",
+        "PRAGMA temp_store = MEMORY"
+    ]
+    
+    # Operações caras: apenas sob demanda (a manutenção contínua fica em db_maintenance.py)
+    MAINTENANCE = [
+        "VACUUM",
+        "ANALYZE"
+    ]
+    
+    def _run(self, statements):
+        for optimization in statements:
             try:
                 self.execute_query(optimization)
             except Exception as e:
                 print(f"Erro na otimização {optimization}: {e}")
+    
+    def optimize_database(self):
+        """Passada completa (bloqueante): PRAGMAs + VACUUM/ANALYZE"""
+        self._run(self.SETTINGS + self.MAINTENANCE)
+    
+    def apply_settings(self):
+        """Apenas os PRAGMAs baratos (inicialização)"""
+        self._run(self.SETTINGS)
+
+class SlidingWindowCounter:
+    """Janela deslizante aproximada com memória constante por chave
+
+    Guarda apenas a contagem da janela fixa atual e da anterior; a estimativa
+    pondera a anterior pela fração ainda coberta pela janela deslizante.
+    Chaves ociosas somem sozinhas quando as janelas giram.
+    """
+
+    def __init__(self, max_requests, window):
+        self.max_requests = max_requests
+        self.window = window
+        self.window_index = 0
+        self.current = {}
+        self.previous = {}
+        self.lock = threading.Lock()
+
+    def _rotate(self, window_index):
+        """Avança as janelas; descarta em O(1) as chaves sem uso há 2 janelas"""
+        if window_index == self.window_index + 1:
+            self.previous = self.current
+        else:
+            self.previous = {}
+        self.current = {}
+        self.window_index = window_index
+
+    def hit(self, key, now):
+        """Registra a requisição se estiver dentro do limite"""
+        window_index = int(now // self.window)
+        if window_index != self.window_index:
+            with self.lock:
+                if window_index > self.window_index:
+                    self._rotate(window_index)
+
+        # Sem lock no caminho quente: sob o GIL a pior corrida perde um
+        # incremento, aceitável para um limite aproximado
+        current_counts = self.current
+        current = current_counts.get(key, 0)
+        elapsed_fraction = (now - window_index * self.window) / self.window
+        estimate = self.previous.get(key, 0) * (1 - elapsed_fraction) + current
+
+        if estimate >= self.max_requests:
+            return False
+
+        current_counts[key] = current + 1
+        return True
+
+    def __len__(self):
+        return len(self.current.keys() | self.previous.keys())
+
+
+class SharedSlidingWindowCounter:
+    """SlidingWindowCounter em tabela hash de tamanho fixo mapeada em memória
+
+    Compartilhada entre os workers do host via arquivo; cada faixa de slots é
+    protegida por um lock de faixa de bytes (fcntl) mais um lock de thread da
+    própria faixa. O nome do arquivo leva o formato (MAGIC e número de slots):
+    um arquivo já mapeado por outro worker nunca é truncado.
+    """
+
+    MAGIC = b'NXRL0001'
+    HEADER = struct.Struct('<8sQ')        # magic, número de slots
+    SLOT = struct.Struct('<QqII')         # hash da chave, janela, atual, anterior
+    STRIPE_SLOTS = 64
+    PROBE_LIMIT = 8
+
+    def __init__(self, path, max_requests, window, slots=65536):
+        import fcntl
+        import mmap
+
+        self.fcntl = fcntl
+        self.max_requests = max_requests
+        self.window = window
+        self.slots = max(self.STRIPE_SLOTS, slots - slots % self.STRIPE_SLOTS)
+        self.size = self.HEADER.size + self.slots * self.SLOT.size
+        self.stripe_locks = [threading.Lock() for _ in range(self.slots // self.STRIPE_SLOTS)]
+
+        # Outro formato ou tamanho usa outro arquivo (workers de versões
+        # diferentes convivem durante um deploy)
+        self.path = f"{path}.{self.MAGIC.decode().lower()}-{self.slots}"
+        expected = self.HEADER.pack(self.MAGIC, self.slots)
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX)
+            try:
+                header = os.pread(self.fd, self.HEADER.size, 0)
+                size = os.fstat(self.fd).st_size
+                if header != expected:
+                    if header.strip(b'\0') or size > self.size:
+                        raise OSError(f"Arquivo de rate limit com formato inesperado: {self.path}")
+                    # Arquivo novo (ou criação interrompida): só cresce, nunca encolhe
+                    os.ftruncate(self.fd, self.size)
+                    os.pwrite(self.fd, expected, 0)
+                elif size != self.size:
+                    raise OSError(f"Arquivo de rate limit com tamanho inesperado: {self.path}")
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN)
+
+            self.mm = mmap.mmap(self.fd, self.size)
+        except BaseException:
+            os.close(self.fd)
+            raise
+
+    @staticmethod
+    def _hash(key):
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') | 1  # 0 = slot vazio
+
+    def _offset(self, index):
+        return self.HEADER.size + index * self.SLOT.size
+
+    def hit(self, key, now):
+        """Registra a requisição se estiver dentro do limite (atômico entre processos)"""
+        key_hash = self._hash(key)
+        window_index = int(now // self.window)
+        elapsed_fraction = (now - window_index * self.window) / self.window
+
+        home = key_hash % self.slots
+        stripe_start = home - home % self.STRIPE_SLOTS
+        lock_start = self._offset(stripe_start)
+        lock_length = self.STRIPE_SLOTS * self.SLOT.size
+
+        mm, slot = self.mm, self.SLOT
+        with self.stripe_locks[stripe_start // self.STRIPE_SLOTS]:
+            self.fcntl.lockf(self.fd, self.fcntl.LOCK_EX, lock_length, lock_start)
+            try:
+                target = None
+                oldest = None
+                for probe in range(self.PROBE_LIMIT):
+                    index = stripe_start + (home - stripe_start + probe) % self.STRIPE_SLOTS
+                    offset = self._offset(index)
+                    slot_hash, slot_window, current, previous = slot.unpack_from(mm, offset)
+                    if slot_hash == key_hash:
+                        target = (offset, slot_window, current, previous)
+                        break
+                    if slot_hash == 0 or slot_window < window_index - 1:
+                        # Vazio ou ocioso há mais de uma janela: reaproveita
+                        if target is None:
+                            target = (offset, 0, 0, 0)
+                        continue
+                    if oldest is None or slot_window < oldest[1]:
+                        oldest = (offset, slot_window)
+
+                if target is None:
+                    # Região cheia: sobrescreve a chave menos recente
+                    target = (oldest[0], 0, 0, 0)
+
+                offset, slot_window, current, previous = target
+                if slot_window != window_index:
+                    previous = current if slot_window == window_index - 1 else 0
+                    current = 0
+
+                estimate = previous * (1 - elapsed_fraction) + current
+                allowed = estimate < self.max_requests
+                if allowed:
+                    current += 1
+                slot.pack_into(mm, offset, key_hash, window_index, current, previous)
+                return allowed
+            finally:
+                self.fcntl.lockf(self.fd, self.fcntl.LOCK_UN, lock_length, lock_start)
+
+    def __len__(self):
+        window_index = int(time.time() // self.window)
+        return sum(
+            1 for index in range(self.slots)
+            if self.SLOT.unpack_from(self.mm, self._offset(index))[1] >= window_index - 1
+        )
+
+    def close(self):
+        self.mm.close()
+        os.close(self.fd)
+
 
 class APIRateLimiter:
     def __init__(self):
-        self.requests = {}
         self.limits = {
             'default': {'requests': 100, 'window': 3600},  # 100 req/hora
             'auth': {'requests': 10, 'window': 300},       # 10 req/5min
-            'data': {'requests': 1000, 'window': 3600}     # 1000 req/hora
+            'data': {'requests': 1000, 'window': 3600},    # 1000 req/hora
+            'api': {'requests': 600, 'window': 60}         # 10 req/s (polling do dashboard)
         }
+        # Contadores criados no primeiro uso de cada tipo: tipos sem rota
+        # associada não alocam memória nem arquivo
+        self.counters = {}
+        self.shared_prefix = None
+        self.shared_slots = None
+        self.lock = threading.Lock()
     
-    def is_allowed(self, client_ip, endpoint_type='default'):
-        """Verifica se requisição é permitida"""
-        now = time.time()
-        limit_config = self.limits.get(endpoint_type, self.limits['default'])
-        
-        # Limpa requisições antigas
-        if client_ip in self.requests:
-            self.requests[client_ip] = [
-                req_time for req_time in self.requests[client_ip]
-                if now - req_time < limit_config['window']
-            ]
-        else:
-            self.requests[client_ip] = []
-        
-        # Verifica limite
-        if len(self.requests[client_ip]) >= limit_config['requests']:
-            return False
+    def enable_shared_state(self, path_prefix, slots=65536):
+        """Compartilha os contadores entre workers do host (um arquivo por tipo)"""
+        with self.lock:
+            self.shared_prefix = path_prefix
+            self.shared_slots = slots
+            self.counters = {}
+    
+    def _counter(self, endpoint_type):
+        if endpoint_type not in self.limits:
+            endpoint_type = 'default'
+        counter = self.counters.get(endpoint_type)
+        if counter is not None:
+            return counter
         
-        # Adiciona requisição atual
-        self.requests[client_ip].append(now)
-        return True
+        with self.lock:
+            counter = self.counters.get(endpoint_type)
+            if counter is None:
+                config = self.limits[endpoint_type]
+                if self.shared_prefix:
+                    try:
+                        counter = SharedSlidingWindowCounter(
+                            f"{self.shared_prefix}.{endpoint_type}",
+                            config['requests'], config['window'], self.shared_slots
+                        )
+                    except (ImportError, OSError) as e:
+                        print(f"Rate limit compartilhado indisponível, usando memória local: {e}")
+                if counter is None:
+                    counter = SlidingWindowCounter(config['requests'], config['window'])
+                self.counters[endpoint_type] = counter
+            return counter
+    
+    def is_allowed(self, client_ip, endpoint_type='default'):
+        """Verifica se requisição é permitida (O(1) por chamada)"""
+        return self._counter(endpoint_type).hit(client_ip, time.time())
+    
+    def get_stats(self):
+        """Número de chaves rastreadas por tipo de endpoint"""
+        return {endpoint_type: len(counter) for endpoint_type, counter in self.counters.items()}
     
     def rate_limit(self, endpoint_type='default'):
         """Decorator para rate limiting"""
         def decorator(f):
             @wraps(f)
             def decorated_function(*args, **kwargs):
-                client_ip = request.remote_addr
-                
-                if not self.is_allowed(client_ip, endpoint_type):
-                    return jsonify({
-                        'error': 'Rate limit exceeded',
-                        'message': 'Muitas requisições. Tente novamente mais tarde.'
-                    }), 429
+                error = self.check_request(endpoint_type)
+                if error is not None:
+                    return error
                 
                 return f(*args, **kwargs)
             
+            # Usado pelo asgi.py nas views assíncronas que substituem a view Flask
+            decorated_function.rate_limit_type = endpoint_type
             return decorated_function
         return decorator
+    
+    def check_request(self, endpoint_type):
+        """Resposta 429 se a requisição atual estourou o limite, senão None"""
+        if self.is_allowed(request.remote_addr, endpoint_type):
+            return None
+        return jsonify({
+            'error': 'Rate limit exceeded',
+            'message': 'Muitas requisições. Tente novamente mais tarde.'
+        }), 429
+
+class LatencyHistogram:
+    """Histograma com buckets logarítmicos (~19% de largura) de 10µs a ~45min"""
+
+    MIN_SECONDS = 0.00001
+    GROWTH = 2 ** 0.25
+    BUCKETS = 112
+    INV_LOG_GROWTH = 1 / math.log(GROWTH)
+
+    __slots__ = ('counts', 'count', 'total')
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+
+    @classmethod
+    def bucket_index(cls, seconds):
+        """Índice do bucket de uma medição"""
+        if seconds <= cls.MIN_SECONDS:
+            return 0
+        index = int(math.log(seconds / cls.MIN_SECONDS) * cls.INV_LOG_GROWTH) + 1
+        return index if index < cls.BUCKETS else cls.BUCKETS - 1
+
+    def record(self, seconds):
+        """Registra uma medição em tempo constante"""
+        self.counts[self.bucket_index(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def merge(self, other):
+        """Soma outro histograma neste"""
+        for index, value in enumerate(other.counts):
+            self.counts[index] += value
+        self.count += other.count
+        self.total += other.total
+        return self
+
+    def quantile(self, q):
+        """Estimativa do quantil q (ponto médio geométrico do bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, value in enumerate(self.counts):
+            cumulative += value
+            if cumulative >= rank and value:
+                if index == 0:
+                    return self.MIN_SECONDS
+                return self.MIN_SECONDS * self.GROWTH ** (index - 0.5)
+        return self.MIN_SECONDS * self.GROWTH ** (self.BUCKETS - 1)
+
+
+class MetricsStore:
+    """Histogramas em layout binário fixo (bytearray local ou arquivo mmap por processo)
+
+    Palavras de 64 bits: cabeçalho [magic, pid, cache_hits, cache_misses, séries,
+    tempo de inicialização (double), início do processo, geração]
+    seguido de slots [nome (6 palavras), status, soma (double), buckets...].
+    """
+
+    MAGIC = 0x31544D584E  # 'NXMT1'
+    HEADER_WORDS = 8
+    KEY_BYTES = 48
+    SLOT_WORDS = 8 + LatencyHistogram.BUCKETS
+    MAX_SERIES = 512
+    OVERFLOW_KEY = ('__overflow__', 0)
+    SIZE = (HEADER_WORDS + MAX_SERIES * SLOT_WORDS) * 8
+
+    def __init__(self, buffer, mm=None):
+        self.buffer = buffer
+        self.mm = mm
+        self.words = memoryview(buffer).cast('Q')
+        self.floats = memoryview(buffer).cast('d')
+        if self.words[0] != self.MAGIC:
+            self.words[0] = self.MAGIC
+        # Índice local das séries já existentes no buffer
+        self.slots = {key: base for key, base in self._iter_slots()}
+
+    @classmethod
+    def in_memory(cls):
+        return cls(bytearray(cls.SIZE))
+
+    @classmethod
+    def open_file(cls, path, pid, generation, started=0):
+        """Abre (ou cria) o arquivo mmap de um processo; conteúdo de outra geração é zerado"""
+        import mmap
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size != cls.SIZE:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, cls.SIZE)
+            mm = mmap.mmap(fd, cls.SIZE)
+        finally:
+            os.close(fd)
+        store = cls(mm, mm)
+        if store.generation != generation or store.started != started:
+            store.reset()
+        store.words[1] = pid
+        store.words[6] = started
+        store.words[7] = generation
+        return store
+
+    @classmethod
+    def read_file(cls, path):
+        """Cópia somente-leitura do arquivo de outro processo"""
+        with open(path, 'rb') as f:
+            data = bytearray(f.read())
+        if len(data) != cls.SIZE:
+            return None
+        return cls(data)
+
+    def reset(self):
+        self.buffer[:] = bytes(self.SIZE)
+        self.words[0] = self.MAGIC
+        self.slots = {}
+
+    def _iter_slots(self):
+        for series in range(min(self.words[4], self.MAX_SERIES)):
+            base = self.HEADER_WORDS + series * self.SLOT_WORDS
+            raw = bytes(self.buffer[base * 8:base * 8 + self.KEY_BYTES])
+            endpoint = raw.rstrip(b'\0').decode('utf-8', 'replace')
+            yield (endpoint, self.words[base + 6]), base
+
+    def _slot(self, key):
+        base = self.slots.get(key)
+        if base is not None:
+            return base
+
+        series = self.words[4]
+        if series >= self.MAX_SERIES - 1 and key != self.OVERFLOW_KEY:
+            return self._slot(self.OVERFLOW_KEY)
+
+        base = self.HEADER_WORDS + series * self.SLOT_WORDS
+        name = str(key[0]).encode('utf-8')[:self.KEY_BYTES]
+        self.buffer[base * 8:base * 8 + self.KEY_BYTES] = name.ljust(self.KEY_BYTES, b'\0')
+        self.words[base + 6] = key[1]
+        # Série só fica visível para leitores depois de escrita
+        self.words[4] = series + 1
+        self.slots[key] = base
+        return base
+
+    def record(self, endpoint, status_code, seconds):
+        # Tempo constante, mas não livre de alocação: a tupla da chave e os
+        # int/float dos contadores são objetos novos a cada chamada (~0,7µs);
+        # só a série nova escreve o nome no buffer
+        base = self._slot((endpoint, status_code))
+        self.words[base + 8 + LatencyHistogram.bucket_index(seconds)] += 1
+        self.floats[base + 7] += seconds
+
+    def add_cache(self, hits=0, misses=0):
+        self.words[2] += hits
+        self.words[3] += misses
+
+    @property
+    def startup_seconds(self):
+        return self.floats[5]
+
+    @startup_seconds.setter
+    def startup_seconds(self, seconds):
+        self.floats[5] = seconds
+
+    @property
+    def pid(self):
+        return self.words[1]
+
+    @property
+    def started(self):
+        """Início do processo dono (ticks desde o boot; 0 se desconhecido)"""
+        return self.words[6]
+
+    @property
+    def generation(self):
+        return self.words[7]
+
+    @property
+    def cache_hits(self):
+        return self.words[2]
+
+    @property
+    def cache_misses(self):
+        return self.words[3]
+
+    def histograms(self):
+        """Converte o buffer em {(endpoint, status): LatencyHistogram}"""
+        result = {}
+        for key, base in self._iter_slots():
+            histogram = LatencyHistogram()
+            histogram.counts = list(self.words[base + 8:base + 8 + LatencyHistogram.BUCKETS])
+            histogram.count = sum(histogram.counts)
+            histogram.total = self.floats[base + 7]
+            result[key] = histogram
+        return result
+
+    def merge_from(self, other):
+        """Soma outro store neste (usado para arquivar workers mortos)"""
+        for key, base in other._iter_slots():
+            target = self._slot(key)
+            for offset in range(LatencyHistogram.BUCKETS):
+                self.words[target + 8 + offset] += other.words[base + 8 + offset]
+            self.floats[target + 7] += other.floats[base + 7]
+        self.add_cache(other.cache_hits, other.cache_misses)
+
 
 class MetricsCollector:
+    QUANTILES = (0.5, 0.95, 0.99)
+    ARCHIVE_FILE = 'metrics_archive.bin'
+
     def __init__(self):
-        self.metrics = {
-            'requests_total': 0,
-            'requests_by_endpoint': {},
-            'response_times': [],
-            'errors_total': 0,
-            'cache_hits': 0,
-            'cache_misses': 0
-        }
+        self.lock = threading.Lock()
+        self.store = MetricsStore.in_memory()
+        self.directory = None
+        self.pid = os.getpid()
+        self.generation = 0
     
-    def record_request(self, endpoint, response_time, status_code):
-        """Registra métricas de requisição"""
-        self.metrics['requests_total'] += 1
-        
-        if endpoint not in self.metrics['requests_by_endpoint']:
-            self.metrics['requests_by_endpoint'][endpoint] = 0
-        self.metrics['requests_by_endpoint'][endpoint] += 1
-        
-        self.metrics['response_times'].append(response_time)
-        
-        # Mantém apenas últimas 1000 medições
-        if len(self.metrics['response_times']) > 1000:
-            self.metrics['response_times'] = self.metrics['response_times'][-1000:]
+    @staticmethod
+    def _current_generation():
+        """Geração do servidor: METRICS_GENERATION (id do deploy) ou o processo master
+
+        Workers do mesmo master gunicorn compartilham a geração; reiniciar o
+        master ou fazer deploy começa uma nova, e o arquivo morto é descartado.
+        """
+        label = os.environ.get('METRICS_GENERATION')
+        if not label:
+            parent = os.getppid()
+            label = f"{parent}:{process_start_time(parent)}"
+        digest = hashlib.blake2b(label.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') or 1
+    
+    def enable_multiprocess(self, directory):
+        """Cada worker grava em seu arquivo mmap; a coleta soma todos os arquivos"""
+        try:
+            os.makedirs(directory, exist_ok=True)
+            self.directory = directory
+            self._open_process_store()
+        except OSError as e:
+            self.directory = None
+            print(f"Métricas multiprocesso indisponíveis, usando memória local: {e}")
+    
+    def _open_process_store(self):
+        import fcntl
         
-        if status_code >= 400:
-            self.metrics['errors_total'] += 1
+        self.pid = os.getpid()
+        self.generation = self._current_generation()
+        started = process_start_time(self.pid) or 0
+        path = os.path.join(self.directory, f"metrics_{self.pid}.bin")
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Arquivo deixado por um processo antigo com o mesmo PID: arquiva antes de reaproveitar
+            if os.path.exists(path):
+                stale = MetricsStore.read_file(path)
+                if stale is not None and stale.started != started:
+                    self._retire(path, stale)
+            self.store = MetricsStore.open_file(path, self.pid, self.generation, started)
+    
+    def _retire(self, path, store):
+        """Worker encerrado: soma no arquivo da geração atual (se for dela) e remove"""
+        if store.generation == self.generation:
+            archive = MetricsStore.open_file(
+                os.path.join(self.directory, self.ARCHIVE_FILE), 0, self.generation)
+            archive.merge_from(store)
+            archive.mm.flush()
+        os.unlink(path)
+    
+    def _current_store(self):
+        # Após fork (gunicorn --preload) cada worker precisa do próprio arquivo
+        if self.directory and os.getpid() != self.pid:
+            with self.lock:
+                if os.getpid() != self.pid:
+                    self._open_process_store()
+        return self.store
+    
+    def record_request(self, endpoint, response_time, status_code):
+        """Registra métricas de requisição (tempo constante, sem crescer memória por requisição)"""
+        store = self._current_store()
+        with self.lock:
+            store.record(endpoint, status_code, response_time)
     
     def record_cache_hit(self):
         """Registra cache hit"""
-        self.metrics['cache_hits'] += 1
+        store = self._current_store()
+        with self.lock:
+            store.add_cache(hits=1)
     
     def record_cache_miss(self):
         """Registra cache miss"""
-        self.metrics['cache_misses'] += 1
+        store = self._current_store()
+        with self.lock:
+            store.add_cache(misses=1)
+    
+    def _collect_stores(self):
+        """Lê os arquivos dos workers desta geração; arquiva e remove os de workers mortos
+
+        Um arquivo pertence a um processo vivo só se PID e instante de início
+        baterem (PIDs são reaproveitados). Arquivos e arquivo morto de gerações
+        anteriores não entram na soma.
+        """
+        import fcntl
+        
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            
+            stores = []
+            for name in os.listdir(self.directory):
+                if not (name.startswith('metrics_') and name.endswith('.bin')) or name == self.ARCHIVE_FILE:
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    pid = int(name[len('metrics_'):-len('.bin')])
+                except ValueError:
+                    continue
+                
+                if pid == os.getpid():
+                    stores.append(self.store)
+                    continue
+                
+                store = MetricsStore.read_file(path)
+                if store is None:
+                    continue
+                
+                if not process_matches(pid, store.started):
+                    self._retire(path, store)
+                elif store.generation == self.generation:
+                    stores.append(store)
+            
+            archive_path = os.path.join(self.directory, self.ARCHIVE_FILE)
+            if os.path.exists(archive_path):
+                archived = MetricsStore.read_file(archive_path)
+                if archived is None or archived.generation != self.generation:
+                    # Arquivo morto de um master/deploy anterior
+                    os.unlink(archive_path)
+                else:
+                    stores.append(archived)
+        
+        return stores
+    
+    def snapshot(self):
+        """Histogramas agregados (de todos os workers no modo multiprocesso)"""
+        if not self.directory:
+            with self.lock:
+                return self.store.histograms()
+        
+        self._current_store()
+        merged = {}
+        for store in self._collect_stores():
+            for key, histogram in store.histograms().items():
+                if key in merged:
+                    merged[key].merge(histogram)
+                else:
+                    merged[key] = histogram
+        return merged
+    
+    def record_startup(self, seconds):
+        """Tempo de inicialização deste worker"""
+        store = self._current_store()
+        with self.lock:
+            store.startup_seconds = seconds
+    
+    def startup_times(self):
+        """{pid: segundos} dos workers vivos"""
+        if not self.directory:
+            stores = [self.store]
+        else:
+            stores = self._collect_stores()
+        return {store.pid or os.getpid(): store.startup_seconds
+                for store in stores if store.startup_seconds and (store.pid or not self.directory)}
+    
+    def total_requests(self):
+        """Requisições atendidas desde o início (todos os workers, inclusive os encerrados)"""
+        return sum(histogram.count for histogram in self.snapshot().values())
+    
+    def cache_totals(self):
+        """(hits, misses) somados entre os workers"""
+        if not self.directory:
+            return self.store.cache_hits, self.store.cache_misses
+        stores = self._collect_stores()
+        return sum(s.cache_hits for s in stores), sum(s.cache_misses for s in stores)
     
     def get_metrics(self):
         """Retorna métricas atuais"""
-        avg_response_time = 0
-        if self.metrics['response_times']:
-            avg_response_time = sum(self.metrics['response_times']) / len(self.metrics['response_times'])
+        histograms = self.snapshot()
+        
+        overall = LatencyHistogram()
+        by_endpoint = {}
+        errors_total = 0
+        for (endpoint, status_code), histogram in histograms.items():
+            overall.merge(histogram)
+            by_endpoint.setdefault(endpoint, LatencyHistogram()).merge(histogram)
+            if status_code >= 400:
+                errors_total += histogram.count
         
+        avg_response_time = overall.total / overall.count if overall.count else 0
+        
+        cache_hits, cache_misses = self.cache_totals()
         cache_hit_rate = 0
-        total_cache_requests = self.metrics['cache_hits'] + self.metrics['cache_misses']
+        total_cache_requests = cache_hits + cache_misses
         if total_cache_requests > 0:
-            cache_hit_rate = self.metrics['cache_hits'] / total_cache_requests * 100
+            cache_hit_rate = cache_hits / total_cache_requests * 100
         
         return {
-            'requests_total': self.metrics['requests_total'],
-            'requests_by_endpoint': self.metrics['requests_by_endpoint'],
+            'requests_total': overall.count,
+            'requests_by_endpoint': {endpoint: h.count for endpoint, h in by_endpoint.items()},
             'avg_response_time': round(avg_response_time, 3),
-            'errors_total': self.metrics['errors_total'],
+            'latency_by_endpoint': {
+                endpoint: {f"p{int(q * 100)}": round(h.quantile(q), 4) for q in self.QUANTILES}
+                for endpoint, h in by_endpoint.items()
+            },
+            'errors_total': errors_total,
             'cache_hit_rate': round(cache_hit_rate, 2),
+            'worker_startup_seconds': {str(pid): round(seconds, 3) for pid, seconds in self.startup_times().items()},
             'uptime': time.time() - getattr(self, 'start_time', time.time())
         }
+    
+    def render_prometheus(self):
+        """Exposição no formato texto do Prometheus"""
+        histograms = self.snapshot()
+        cache_hits, cache_misses = self.cache_totals()
+        name = 'nexocrypto_request_duration_seconds'
+        lines = [
+            f'# HELP {name} Latência das requisições HTTP por endpoint e status',
+            f'# TYPE {name} summary'
+        ]
+        
+        for (endpoint, status_code), histogram in sorted(histograms.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+            labels = f'endpoint="{endpoint}",status="{status_code}"'
+            for q in self.QUANTILES:
+                lines.append(f'{name}{{{labels},quantile="{q}"}} {histogram.quantile(q):.6f}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.total:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+        
+        lines += [
+            '# HELP nexocrypto_cache_hits_total Cache hits',
+            '# TYPE nexocrypto_cache_hits_total counter',
+            f"nexocrypto_cache_hits_total {cache_hits}",
+            '# HELP nexocrypto_cache_misses_total Cache misses',
+            '# TYPE nexocrypto_cache_misses_total counter',
+            f"nexocrypto_cache_misses_total {cache_misses}",
+            '# HELP nexocrypto_worker_startup_seconds Tempo de inicialização de cada worker',
+            '# TYPE nexocrypto_worker_startup_seconds gauge',
+            *(f'nexocrypto_worker_startup_seconds{{pid="{pid}"}} {seconds:.6f}'
+              for pid, seconds in sorted(self.startup_times().items())),
+            '# HELP nexocrypto_uptime_seconds Tempo desde a inicialização',
+            '# TYPE nexocrypto_uptime_seconds gauge',
+            f"nexocrypto_uptime_seconds {time.time() - getattr(self, 'start_time', time.time()):.0f}"
+        ]
+        return '\n'.join(lines) + '\n'
 
 # Instâncias globais
 performance_optimizer = PerformanceOptimizer()
@@ -333,10 +1397,20 @@ rate_limiter = APIRateLimiter()
 metrics_collector = MetricsCollector()
 
 # Funções de conveniência
-def init_optimizations(app):
-    """Inicializa todas as otimizações"""
+def init_optimizations(app, db_path=None, factory=sqlite3.Connection):
+    """Inicializa todas as otimizações
+
+    VACUUM/ANALYZE não rodam na inicialização: a manutenção incremental em
+    background (db_maintenance.py) é iniciada pelo app.
+    """
+    if db_path:
+        db_optimizer.db_path = db_path
+        rate_limiter.enable_shared_state(f"{db_path}.ratelimit")
+        metrics_collector.enable_multiprocess(f"{db_path}.metrics")
     performance_optimizer.init_app(app)
-    db_optimizer.optimize_database()
+    if db_path:
+        performance_optimizer.enable_shared_cache(f"{db_path}.cache", factory)
+    db_optimizer.apply_settings()
     metrics_collector.start_time = time.time()
 
 def get_performance_metrics():
@@ -0,0 +1,158 @@
+"""
+Hash de senhas para o Backend NexoCrypto
+KDF lento (PBKDF2-SHA256 ou scrypt) executado num pool dedicado e limitado:
+rajadas de login recebem 503 rápido em vez de ocupar todas as threads do worker
+"""
+
+import os
+import time
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class HashingBusy(Exception):
+    """Fila de hashing cheia (ou espera maior que o limite)"""
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+class PasswordHasher:
+    # Formatos: pbkdf2_sha256$iterações$salt$hash e scrypt$n$r$p$salt$hash
+    SALT_BYTES = 16
+
+    def __init__(self, algorithm='pbkdf2_sha256', iterations=600_000,
+                 scrypt_n=2 ** 14, scrypt_r=8, scrypt_p=1,
+                 workers=None, max_queue=32, queue_timeout=2.0):
+        if algorithm not in ('pbkdf2_sha256', 'scrypt'):
+            raise ValueError(f"Algoritmo de hash desconhecido: {algorithm}")
+        self.algorithm = algorithm
+        self.iterations = iterations
+        self.scrypt_n = scrypt_n
+        self.scrypt_r = scrypt_r
+        self.scrypt_p = scrypt_p
+        # hashlib libera o GIL durante o KDF: uma thread por núcleo
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        # Tarefas que esperaram mais que isso na fila são descartadas
+        self.queue_timeout = queue_timeout
+
+        self.executor = None
+        self.pid = None
+        self.slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self.lock = threading.Lock()
+        self.dummy_hash = None
+        self.stats = {'completed': 0, 'rejected': 0, 'expired': 0, 'total_seconds': 0.0}
+
+    # KDF (execução direta, sem o pool)
+    def _derive(self, password, algorithm, params, salt):
+        password = password.encode('utf-8')
+        if algorithm == 'pbkdf2_sha256':
+            return hashlib.pbkdf2_hmac('sha256', password, salt, params[0])
+        n, r, p = params
+        return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p,
+                              maxmem=128 * r * (n + p + 2), dklen=32)
+
+    def _params(self):
+        if self.algorithm == 'pbkdf2_sha256':
+            return (self.iterations,)
+        return (self.scrypt_n, self.scrypt_r, self.scrypt_p)
+
+    def hash_now(self, password):
+        salt = secrets.token_bytes(self.SALT_BYTES)
+        params = self._params()
+        digest = self._derive(password, self.algorithm, params, salt)
+        return '$'.join([self.algorithm, *map(str, params), _b64encode(salt), _b64encode(digest)])
+
+    def verify_now(self, password, encoded):
+        try:
+            algorithm, *fields = encoded.split('$')
+            params = tuple(int(value) for value in fields[:-2])
+            salt, expected = _b64decode(fields[-2]), _b64decode(fields[-1])
+            if algorithm not in ('pbkdf2_sha256', 'scrypt'):
+                return False
+        except (ValueError, IndexError, AttributeError):
+            return False
+        return hmac.compare_digest(self._derive(password, algorithm, params, salt), expected)
+
+    def needs_rehash(self, encoded):
+        """True se o hash foi gerado com parâmetros diferentes dos atuais"""
+        prefix = '$'.join([self.algorithm, *map(str, self._params())]) + '$'
+        return not encoded.startswith(prefix)
+
+    # Pool limitado
+    def _get_executor(self):
+        # Recriado após fork (threads não sobrevivem ao fork do gunicorn)
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    self.executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                       thread_name_prefix='nexo-hash')
+                    self.pid = os.getpid()
+        return self.executor
+
+    def _run(self, fn, *args):
+        """Executa no pool; HashingBusy se a fila estiver cheia"""
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.stats['rejected'] += 1
+            raise HashingBusy()
+
+        queued_at = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            if started - queued_at > self.queue_timeout:
+                with self.lock:
+                    self.stats['expired'] += 1
+                raise HashingBusy()
+            result = fn(*args)
+            with self.lock:
+                self.stats['completed'] += 1
+                self.stats['total_seconds'] += time.perf_counter() - started
+            return result
+
+        try:
+            future = self._get_executor().submit(task)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future.result()
+
+    def hash(self, password):
+        return self._run(self.hash_now, password)
+
+    def _verify_missing(self, password):
+        if self.dummy_hash is None:
+            self.dummy_hash = self.hash_now(secrets.token_urlsafe(16))
+        self.verify_now(password, self.dummy_hash)
+        return False
+
+    def verify(self, password, encoded):
+        """Verifica a senha; sem hash (usuário inexistente) gasta o mesmo tempo"""
+        if encoded is None:
+            return self._run(self._verify_missing, password)
+        return self._run(self.verify_now, password, encoded)
+
+    def get_stats(self):
+        with self.lock:
+            completed = self.stats['completed']
+            return {
+                'algorithm': self.algorithm,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'completed': completed,
+                'rejected': self.stats['rejected'],
+                'expired': self.stats['expired'],
+                'avg_ms': round(self.stats['total_seconds'] / completed * 1000, 2) if completed else 0
+            }
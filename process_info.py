@@ -0,0 +1,41 @@
+"""
+Identificação de processos para o Backend NexoCrypto
+PID sozinho não basta para saber se um arquivo pertence a um processo vivo:
+o kernel reaproveita PIDs. O instante de início (/proc/<pid>/stat) desambigua.
+"""
+
+import os
+
+
+def pid_alive(pid):
+    """Verifica se o processo ainda existe"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def process_start_time(pid):
+    """Início do processo em ticks desde o boot (None fora do Linux ou se não existir)"""
+    try:
+        with open(f"/proc/{pid}/stat", 'rb') as f:
+            stat = f.read()
+        # O nome do comando pode conter espaços: os campos começam após o último ')'
+        return int(stat[stat.rindex(b')') + 2:].split()[19])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def process_matches(pid, start_time):
+    """True se o PID está vivo e é o mesmo processo (não um PID reaproveitado)"""
+    if not pid_alive(pid):
+        return False
+    if not start_time:
+        return True
+    current = process_start_time(pid)
+    return current is None or current == start_time
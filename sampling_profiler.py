@@ -0,0 +1,128 @@
+"""
+Profiler estatístico sob demanda para o Backend NexoCrypto
+Amostra as pilhas das threads do processo atual e agrega por endpoint Flask
+em formato "folded" (entrada do flamegraph.pl / speedscope)
+
+Nada é instalado nas requisições: fora de uma coleta o custo é zero.
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import Counter, defaultdict
+
+
+class ProfilerBusy(Exception):
+    """Já existe uma coleta em andamento neste processo"""
+
+
+class SamplingProfiler:
+    MAX_SECONDS = 60
+    MIN_INTERVAL = 0.001
+
+    def __init__(self, app=None):
+        self.app = app
+        self.lock = threading.Lock()
+
+    def _view_codes(self):
+        """code object -> endpoint, incluindo funções envolvidas por decorators"""
+        codes = {}
+        shared = set()
+        for endpoint, view in self.app.view_functions.items():
+            while view is not None:
+                code = getattr(view, '__code__', None)
+                if code is not None:
+                    if codes.setdefault(code, endpoint) != endpoint:
+                        shared.add(code)
+                view = getattr(view, '__wrapped__', None)
+        # Wrappers usados por vários endpoints não identificam a view
+        for code in shared:
+            del codes[code]
+        return codes
+
+    @staticmethod
+    def _label(code):
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self, frames, view_codes, samples, own_ident):
+        for ident, frame in frames.items():
+            if ident == own_ident:
+                continue
+
+            stack = []
+            endpoint = None
+            while frame is not None:
+                code = frame.f_code
+                stack.append(code)
+                if endpoint is None:
+                    endpoint = view_codes.get(code)
+                frame = frame.f_back
+
+            # Threads fora de uma view (pool ocioso, scheduler, jobs) são ignoradas
+            if endpoint is None:
+                continue
+            samples[endpoint][tuple(reversed(stack))] += 1
+
+    def profile(self, seconds, interval=0.005):
+        """Coleta amostras por `seconds` segundos; bloqueia quem chamou"""
+        seconds = min(max(float(seconds), 0.1), self.MAX_SECONDS)
+        interval = max(float(interval), self.MIN_INTERVAL)
+
+        if not self.lock.acquire(blocking=False):
+            raise ProfilerBusy()
+
+        try:
+            view_codes = self._view_codes()
+            own_ident = threading.get_ident()
+            samples = defaultdict(Counter)
+            ticks = 0
+            started = time.perf_counter()
+            deadline = started + seconds
+            next_tick = started
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if now < next_tick:
+                    time.sleep(next_tick - now)
+                next_tick += interval
+                self._sample(sys._current_frames(), view_codes, samples, own_ident)
+                ticks += 1
+
+            return {
+                'duration': round(time.perf_counter() - started, 3),
+                'interval': interval,
+                'ticks': ticks,
+                'endpoints': {
+                    endpoint: self.fold(stacks) for endpoint, stacks in samples.items()
+                }
+            }
+        finally:
+            self.lock.release()
+
+    def fold(self, stacks):
+        """Counter de pilhas -> linhas "frame;frame;frame contagem" """
+        labels = {}
+        lines = []
+        for stack, count in stacks.most_common():
+            names = []
+            for code in stack:
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = self._label(code)
+                names.append(label)
+            lines.append(f"{';'.join(names)} {count}")
+        return {'samples': sum(stacks.values()), 'folded': lines}
+
+    @staticmethod
+    def to_folded_text(result):
+        """Todas as pilhas em um arquivo, com o endpoint como raiz"""
+        lines = []
+        for endpoint, data in result['endpoints'].items():
+            lines.extend(f"{endpoint};{line}" for line in data['folded'])
+        return '\n'.join(lines) + '\n'
+
+
+# Instância global (app associado em app.py)
+sampling_profiler = SamplingProfiler()
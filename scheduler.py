@@ -0,0 +1,216 @@
+"""
+Agendador de atualização periódica de grupos para o Backend NexoCrypto
+Distribui as sincronizações de forma uniforme ao longo do período, com backoff por usuário
+"""
+
+import os
+import time
+import zlib
+import random
+import sqlite3
+import calendar
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _parse_db_timestamp(value):
+    """Converte TIMESTAMP do SQLite (UTC) em epoch"""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    return calendar.timegm(dt.timetuple())
+
+
+class GroupRefreshScheduler:
+    def __init__(self, db_path, refresh_fn, period=3600, max_concurrency=2,
+                 fresh_for=None, base_backoff=60, max_backoff=3600,
+                 reload_interval=60, tick=1.0, factory=sqlite3.Connection):
+        self.db_path = db_path
+        self.factory = factory
+        self.refresh_fn = refresh_fn
+        self.period = period
+        self.max_concurrency = max_concurrency
+        self.fresh_for = fresh_for if fresh_for is not None else period / 2
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.reload_interval = reload_interval
+        self.tick = tick
+
+        # uuid -> {'phone', 'next_due', 'last_sync', 'failures'}
+        self.users = {}
+        self.in_flight = set()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.executor = None
+        self.lock_file = None
+        self.last_reload = 0
+        self.stats = {'refreshed': 0, 'failed': 0, 'skipped_fresh': 0}
+
+    def _acquire_process_lock(self):
+        """Garante um único agendador por host entre os workers do gunicorn"""
+        try:
+            import fcntl
+        except ImportError:
+            return True
+
+        self.lock_file = open(f"{self.db_path}.scheduler.lock", 'w')
+        try:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self.lock_file.close()
+            self.lock_file = None
+            return False
+
+    def start(self):
+        """Inicia a thread do agendador (no-op se outro worker já o executa)"""
+        if self.thread and self.thread.is_alive():
+            return True
+        if not self._acquire_process_lock():
+            return False
+
+        self.stop_event.clear()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                           thread_name_prefix='nexo-refresh')
+        self.thread = threading.Thread(target=self._loop, name='nexo-group-refresh',
+                                       daemon=True)
+        self.thread.start()
+        print(f"✅ Agendador de grupos iniciado (pid {os.getpid()}, período {self.period}s)")
+        return True
+
+    def stop(self):
+        """Para o agendador e libera o lock"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        if self.executor:
+            self.executor.shutdown(wait=False)
+        if self.lock_file:
+            self.lock_file.close()
+            self.lock_file = None
+
+    def _phase(self, uuid_code):
+        """Deslocamento fixo do usuário dentro do período (espalha a carga)"""
+        return (zlib.crc32(uuid_code.encode()) / 0xFFFFFFFF) * self.period
+
+    def _next_slot(self, uuid_code, after):
+        """Próximo horário do slot do usuário estritamente após `after`"""
+        phase = self._phase(uuid_code)
+        cycles = int((after - phase) // self.period) + 1
+        return phase + cycles * self.period
+
+    def _load_users(self, now):
+        """Recarrega usuários validados e o horário da última sincronização"""
+        conn = sqlite3.connect(self.db_path, timeout=10, factory=self.factory)
+        try:
+            rows = conn.execute('''
+                SELECT u.uuid, u.phone_number,
+                       (SELECT MAX(g.added_at) FROM telegram_groups g
+                        WHERE g.user_uuid = u.uuid AND g.source = 'userbot_real')
+                FROM telegram_users u
+                WHERE u.is_active = 1 AND u.phone_number IS NOT NULL
+            ''').fetchall()
+        finally:
+            conn.close()
+
+        with self.lock:
+            seen = set()
+            for uuid_code, phone_number, last_added in rows:
+                seen.add(uuid_code)
+                state = self.users.get(uuid_code)
+                if state is None:
+                    self.users[uuid_code] = {
+                        'phone': phone_number,
+                        'next_due': self._next_slot(uuid_code, now),
+                        'last_sync': _parse_db_timestamp(last_added),
+                        'failures': 0
+                    }
+                else:
+                    state['phone'] = phone_number
+                    db_sync = _parse_db_timestamp(last_added)
+                    if db_sync and (not state['last_sync'] or db_sync > state['last_sync']):
+                        state['last_sync'] = db_sync
+
+            for uuid_code in list(self.users):
+                if uuid_code not in seen and uuid_code not in self.in_flight:
+                    del self.users[uuid_code]
+
+        self.last_reload = now
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            now = time.time()
+            try:
+                if now - self.last_reload >= self.reload_interval:
+                    self._load_users(now)
+                self._dispatch_due(now)
+            except Exception as e:
+                print(f"❌ Erro no agendador de grupos: {e}")
+            self.stop_event.wait(self.tick)
+
+    def _dispatch_due(self, now):
+        with self.lock:
+            due = sorted(
+                (state['next_due'], uuid_code)
+                for uuid_code, state in self.users.items()
+                if state['next_due'] <= now and uuid_code not in self.in_flight
+            )
+
+            for _, uuid_code in due:
+                if len(self.in_flight) >= self.max_concurrency:
+                    break
+
+                state = self.users[uuid_code]
+
+                # Dados ainda recentes: apenas reagenda
+                if state['last_sync'] and now - state['last_sync'] < self.fresh_for:
+                    state['next_due'] = self._next_slot(uuid_code, now)
+                    self.stats['skipped_fresh'] += 1
+                    continue
+
+                self.in_flight.add(uuid_code)
+                self.executor.submit(self._refresh, uuid_code, state['phone'])
+
+    def _refresh(self, uuid_code, phone_number):
+        try:
+            self.refresh_fn(uuid_code, phone_number)
+        except Exception as e:
+            now = time.time()
+            with self.lock:
+                self.in_flight.discard(uuid_code)
+                self.stats['failed'] += 1
+                state = self.users.get(uuid_code)
+                if state is not None:
+                    state['failures'] += 1
+                    backoff = min(self.base_backoff * (2 ** (state['failures'] - 1)),
+                                  self.max_backoff)
+                    # Jitter evita que falhas simultâneas voltem juntas
+                    state['next_due'] = now + backoff * random.uniform(0.8, 1.2)
+            print(f"❌ Falha ao atualizar grupos de {uuid_code}: {e}")
+            return
+
+        now = time.time()
+        with self.lock:
+            self.in_flight.discard(uuid_code)
+            self.stats['refreshed'] += 1
+            state = self.users.get(uuid_code)
+            if state is not None:
+                state['failures'] = 0
+                state['last_sync'] = now
+                state['next_due'] = self._next_slot(uuid_code, now)
+
+    def get_stats(self):
+        """Retorna estatísticas do agendador"""
+        with self.lock:
+            return {
+                'running': bool(self.thread and self.thread.is_alive()),
+                'users': len(self.users),
+                'in_flight': len(self.in_flight),
+                'backing_off': sum(1 for s in self.users.values() if s['failures']),
+                **self.stats
+            }
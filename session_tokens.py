@@ -0,0 +1,201 @@
+"""
+Tokens de sessão assinados para o Backend NexoCrypto
+HMAC-SHA256 sobre (usuário, plano, emissão, expiração, id do token): qualquer
+worker verifica sem consultar o banco; revogações ficam numa lista pequena no
+SQLite, sincronizada em memória a cada poucos segundos
+"""
+
+import os
+import hmac
+import time
+import base64
+import hashlib
+import secrets
+import sqlite3
+import threading
+
+
+class InvalidToken(Exception):
+    """Token malformado, com assinatura inválida, expirado ou revogado"""
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+SECRET_BYTES = 32
+MIN_SECRET_BYTES = 16
+
+
+def load_or_create_secret(path, timeout=5.0):
+    """Segredo compartilhado pelos workers do host (criado uma única vez)
+
+    O arquivo nasce completo: o segredo é gravado num temporário e publicado
+    com link(), que falha se outro worker já publicou o dele. Um arquivo
+    curto (gravado por uma versão antiga ou cortado por queda) é esperado até
+    `timeout` e então recusado; nunca se aceita um segredo vazio.
+    """
+    secret = secrets.token_bytes(SECRET_BYTES)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(secret)
+            f.flush()
+            os.fsync(f.fileno())
+        os.link(tmp_path, path)
+        return secret
+    except FileExistsError:
+        pass
+    finally:
+        os.unlink(tmp_path)
+
+    deadline = time.monotonic() + timeout
+    while True:
+        with open(path, 'rb') as f:
+            secret = f.read()
+        if len(secret) >= SECRET_BYTES:
+            return secret
+        if time.monotonic() >= deadline:
+            raise RuntimeError(f"Segredo de sessão incompleto em {path} "
+                               f"({len(secret)} bytes); remova o arquivo para recriá-lo")
+        time.sleep(0.05)
+
+
+class SessionTokens:
+    VERSION = 'v1'
+
+    def __init__(self, secret, db_path=None, ttl=24 * 3600, sync_interval=2.0,
+                 factory=sqlite3.Connection):
+        self.secret = secret if isinstance(secret, bytes) else secret.encode('utf-8')
+        if len(self.secret) < MIN_SECRET_BYTES:
+            raise ValueError(f"Segredo de sessão deve ter ao menos {MIN_SECRET_BYTES} bytes")
+        self.db_path = db_path
+        self.factory = factory
+        self.ttl = ttl
+        # Atraso máximo para uma revogação feita em outro worker valer aqui
+        self.sync_interval = sync_interval
+        # jti -> expiração do token; user_id -> (ms) tokens emitidos até esse instante são inválidos
+        self.revoked_tokens = {}
+        self.revoked_users = {}
+        self.last_rowid = 0
+        self.last_sync = 0
+        self.sync_lock = threading.Lock()
+
+    def _sign(self, message):
+        return hmac.new(self.secret, message.encode('ascii'), hashlib.sha256).digest()
+
+    def issue(self, user_id, plan, ttl=None):
+        """Retorna (token, expira_em); `ttl` nunca passa de self.ttl"""
+        now = time.time()
+        # As revogações por usuário vivem self.ttl: um token mais longo sobreviveria a elas
+        expires = int(now) + min(ttl or self.ttl, self.ttl)
+        # Emissão em milissegundos: revoke_user não derruba logins feitos logo depois
+        payload = '|'.join([str(user_id), str(plan), str(int(now * 1000)), str(expires),
+                            secrets.token_hex(8)])
+        message = f"{self.VERSION}.{_b64encode(payload.encode('utf-8'))}"
+        return f"{message}.{_b64encode(self._sign(message))}", expires
+
+    def verify(self, token):
+        """Claims do token; InvalidToken se não for aceito"""
+        try:
+            message, signature = token.rsplit('.', 1)
+            version, encoded = message.split('.')
+            if version != self.VERSION:
+                raise ValueError()
+            if not hmac.compare_digest(self._sign(message), _b64decode(signature)):
+                raise InvalidToken('Assinatura inválida')
+            user_id, plan, issued, expires, jti = _b64decode(encoded).decode('utf-8').rsplit('|', 4)
+            issued, expires = int(issued), int(expires)
+        except InvalidToken:
+            raise
+        except (ValueError, AttributeError, UnicodeDecodeError):
+            raise InvalidToken('Token malformado')
+
+        if expires <= time.time():
+            raise InvalidToken('Token expirado')
+
+        self._sync()
+        if jti in self.revoked_tokens or issued <= self.revoked_users.get(user_id, -1):
+            raise InvalidToken('Token revogado')
+
+        return {'user_id': user_id, 'plan': plan, 'iat': issued / 1000, 'exp': expires, 'jti': jti}
+
+    # Revogação
+    def revoke(self, claims):
+        """Revoga um token (logout) até sua expiração"""
+        self.revoked_tokens[claims['jti']] = claims['exp']
+        self._store(f"jti:{claims['jti']}", 0, claims['exp'])
+
+    def revoke_user(self, user_id):
+        """Revoga todos os tokens já emitidos para o usuário (ex.: troca de senha)"""
+        now = time.time()
+        # Emitidos até este milissegundo (inclusive) ficam inválidos
+        cutoff = int(now * 1000)
+        self.revoked_users[user_id] = cutoff
+        self._store(f"user:{user_id}", cutoff, now + self.ttl)
+
+    def _store(self, key, revoked_before, expires):
+        if not self.db_path:
+            return
+        conn = sqlite3.connect(self.db_path, timeout=10, factory=self.factory)
+        try:
+            conn.execute('DELETE FROM revoked_tokens WHERE key = ? OR expires < ?',
+                         (key, time.time()))
+            conn.execute('INSERT INTO revoked_tokens (key, revoked_before, expires) VALUES (?, ?, ?)',
+                         (key, revoked_before, expires))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _sync(self):
+        """Carrega revogações novas de outros workers (incremental por rowid)"""
+        now = time.monotonic()
+        if not self.db_path or now - self.last_sync < self.sync_interval:
+            return
+        # Uma thread sincroniza; as demais seguem com a lista atual
+        if not self.sync_lock.acquire(blocking=False):
+            return
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=1, factory=self.factory)
+            try:
+                rows = conn.execute('''
+                    SELECT id, key, revoked_before, expires FROM revoked_tokens
+                    WHERE id > ? ORDER BY id
+                ''', (self.last_rowid,)).fetchall()
+            finally:
+                conn.close()
+
+            for rowid, key, revoked_before, expires in rows:
+                kind, value = key.split(':', 1)
+                if kind == 'jti':
+                    self.revoked_tokens[value] = expires
+                else:
+                    self.revoked_users[value] = max(revoked_before,
+                                                    self.revoked_users.get(value, 0))
+                self.last_rowid = rowid
+
+            self._prune()
+            self.last_sync = now
+        except sqlite3.Error as e:
+            print(f"Erro ao sincronizar revogações: {e}")
+        finally:
+            self.sync_lock.release()
+
+    def _prune(self):
+        wall = time.time()
+        for jti in [jti for jti, expires in list(self.revoked_tokens.items()) if expires < wall]:
+            del self.revoked_tokens[jti]
+        for user_id in [u for u, cutoff in list(self.revoked_users.items()) if cutoff / 1000 + self.ttl < wall]:
+            del self.revoked_users[user_id]
+
+    def get_stats(self):
+        return {
+            'revoked_tokens': len(self.revoked_tokens),
+            'revoked_users': len(self.revoked_users),
+            'ttl': self.ttl
+        }
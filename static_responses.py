@@ -0,0 +1,72 @@
+"""
+Respostas estáticas pré-codificadas para o Backend NexoCrypto
+Guarda o JSON já serializado, sua versão gzip e um ETag forte por representação
+"""
+
+import gzip
+import json
+import hashlib
+import threading
+from flask import current_app, request
+
+
+class PrecomputedResponse:
+    """Payload JSON serializado uma única vez"""
+
+    __slots__ = ('body', 'gzip_body', 'etag', 'gzip_etag')
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload, ensure_ascii=True, sort_keys=True,
+                               separators=(',', ':')).encode('utf-8')
+        # mtime=0 mantém o gzip determinístico entre workers
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        # ETag forte identifica a representação: o corpo gzip tem o seu
+        self.gzip_etag = f"{self.etag}-gz"
+
+
+class StaticResponseRegistry:
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def register(self, name, payload):
+        """Registra (ou substitui) o conteúdo de uma resposta estática"""
+        entry = PrecomputedResponse(payload)
+        with self.lock:
+            self.entries[name] = entry
+        return entry
+
+    def get(self, name):
+        """Retorna a entrada pré-codificada ou None"""
+        return self.entries.get(name)
+
+    def respond(self, name, status=200):
+        """Monta a resposta HTTP sem passar pelo serializador"""
+        entry = self.entries[name]
+        # Respeita q-values (gzip;q=0 recusa o gzip)
+        use_gzip = request.accept_encodings['gzip'] > 0
+        etag = entry.gzip_etag if use_gzip else entry.etag
+
+        # Cliente já tem a versão atual desta representação
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            response.headers['Vary'] = 'Accept-Encoding'
+            return response
+
+        if use_gzip:
+            response = current_app.response_class(entry.gzip_body, status=status,
+                                                  mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = current_app.response_class(entry.body, status=status,
+                                                  mimetype='application/json')
+
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+
+# Instância global
+static_responses = StaticResponseRegistry()
@@ -0,0 +1,77 @@
+"""
+Testes do ExpiringDict com relógio simulado
+Uso: python -m pytest tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from expiring_store import ExpiringDict
+
+TTL = 30 * 60
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def registration(i):
+    # Mesmo formato de app.register (reduzido)
+    return {
+        'user_data': {'email': f"{i}@exemplo.com", 'phone': '11999999999'},
+        'email_code': '123456',
+        'sms_code': '654321',
+        'verified_email': False,
+        'verified_sms': False
+    }
+
+
+def test_memory_bounded_by_rate_times_ttl():
+    """Cadastros abandonados: entradas vivas ~ taxa x TTL, não o total de cadastros"""
+    clock = SimulatedClock()
+    store = ExpiringDict('verification_codes', TTL, clock=clock)
+    count, seconds = 1_000_000, 24 * 3600
+    step = seconds / count
+    expected = count * TTL / seconds
+
+    peak = 0
+    for i in range(count):
+        clock.now += step
+        store[i] = registration(i)
+        if i % 10_000 == 0:
+            peak = max(peak, len(store), len(store.wheel))
+
+    assert peak <= expected * 1.01 + 100
+    assert len(store.wheel) <= len(store) + 100
+
+    # Sem novas escritas a varredura esvazia o dicionário
+    clock.now += TTL + 1
+    store.sweep()
+    assert len(store) == 0
+    assert len(store.wheel) == 0
+
+
+def test_short_ttl_after_long_ttl_entry_is_swept():
+    """Entrada de TTL longo primeiro não pode esconder as de TTL curto da varredura"""
+    clock = SimulatedClock()
+    store = ExpiringDict('reset_tokens', TTL, clock=clock)
+    store['long'] = 'x'
+    store.sweep()
+
+    for i in range(100):
+        store.set(f"short-{i}", i, ttl=10)
+    clock.now += 11
+
+    assert store.sweep() == 100
+    assert len(store) == 1
+    assert 'long' in store
+
+    clock.now += TTL
+    assert store.sweep() == 1
+    assert len(store) == 0
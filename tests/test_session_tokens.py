@@ -0,0 +1,136 @@
+"""
+Testes dos tokens de sessão assinados (verificação, adulteração, expiração e revogação)
+Uso: python -m pytest tests
+"""
+
+import os
+import sys
+import time
+import sqlite3
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import session_tokens as tokens_module
+from session_tokens import SessionTokens, InvalidToken, _b64encode, _b64decode
+
+SECRET = b'0123456789abcdef0123456789abcdef'
+
+
+def revocation_db(path):
+    # Mesmo DDL de app.init_telegram_db
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE revoked_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT UNIQUE NOT NULL,
+            revoked_before INTEGER NOT NULL DEFAULT 0,
+            expires REAL NOT NULL
+        )
+    ''')
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_issue_and_verify_roundtrip():
+    store = SessionTokens(SECRET, ttl=3600)
+    token, expires = store.issue('alice', 'free')
+
+    claims = store.verify(token)
+    assert claims['user_id'] == 'alice'
+    assert claims['plan'] == 'free'
+    assert claims['exp'] == expires
+
+
+def test_tampered_payload_or_signature_is_rejected():
+    store = SessionTokens(SECRET, ttl=3600)
+    token, _ = store.issue('alice', 'free')
+    version, encoded, signature = token.split('.')
+
+    # Troca o plano mantendo a assinatura original
+    payload = _b64decode(encoded).decode('utf-8').replace('|free|', '|admin|')
+    forged = f"{version}.{_b64encode(payload.encode('utf-8'))}.{signature}"
+    with pytest.raises(InvalidToken):
+        store.verify(forged)
+
+    # Primeiro caractere: o último carrega bits de preenchimento do base64
+    flipped = ('A' if signature[0] != 'A' else 'B') + signature[1:]
+    with pytest.raises(InvalidToken):
+        store.verify(f"{version}.{encoded}.{flipped}")
+
+    # Assinado com outro segredo
+    other = SessionTokens(b'another-secret-with-32-bytes!!!!', ttl=3600)
+    with pytest.raises(InvalidToken):
+        store.verify(other.issue('alice', 'free')[0])
+
+    for garbage in ('', 'abc', 'v1.abc', 'v2.' + encoded + '.' + signature):
+        with pytest.raises(InvalidToken):
+            store.verify(garbage)
+
+
+def test_expired_token_is_rejected(monkeypatch):
+    store = SessionTokens(SECRET, ttl=60)
+    token, _ = store.issue('alice', 'free')
+
+    real_time = time.time
+    monkeypatch.setattr(tokens_module.time, 'time', lambda: real_time() + 61)
+    with pytest.raises(InvalidToken, match='expirado'):
+        store.verify(token)
+
+
+def test_ttl_is_capped_at_store_ttl():
+    store = SessionTokens(SECRET, ttl=60)
+    _, expires = store.issue('alice', 'free', ttl=10 * 365 * 24 * 3600)
+    assert expires <= time.time() + 60
+
+
+def test_revoke_single_token():
+    store = SessionTokens(SECRET, ttl=3600)
+    token, _ = store.issue('alice', 'free')
+    other, _ = store.issue('alice', 'free')
+
+    store.revoke(store.verify(token))
+    with pytest.raises(InvalidToken, match='revogado'):
+        store.verify(token)
+    assert store.verify(other)['user_id'] == 'alice'
+
+
+def test_revoke_user_invalidates_only_earlier_tokens():
+    store = SessionTokens(SECRET, ttl=3600)
+    before, _ = store.issue('alice', 'free')
+    bob, _ = store.issue('bob', 'free')
+
+    store.revoke_user('alice')
+    with pytest.raises(InvalidToken, match='revogado'):
+        store.verify(before)
+    assert store.verify(bob)['user_id'] == 'bob'
+
+    # Login feito depois da revogação (milissegundo seguinte) continua valendo
+    time.sleep(0.002)
+    after, _ = store.issue('alice', 'free')
+    assert store.verify(after)['user_id'] == 'alice'
+
+
+def test_revocations_reach_other_workers(tmp_path):
+    db_path = revocation_db(str(tmp_path / 'tokens.db'))
+    worker_a = SessionTokens(SECRET, db_path=db_path, ttl=3600, sync_interval=0)
+    worker_b = SessionTokens(SECRET, db_path=db_path, ttl=3600, sync_interval=0)
+
+    token, _ = worker_a.issue('alice', 'free')
+    assert worker_b.verify(token)['user_id'] == 'alice'
+
+    worker_a.revoke(worker_a.verify(token))
+    with pytest.raises(InvalidToken):
+        worker_b.verify(token)
+
+    other, _ = worker_b.issue('carol', 'free')
+    worker_b.revoke_user('carol')
+    with pytest.raises(InvalidToken):
+        worker_a.verify(other)
+
+
+def test_short_secret_is_refused():
+    with pytest.raises(ValueError):
+        SessionTokens(b'short', ttl=60)
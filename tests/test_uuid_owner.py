@@ -0,0 +1,70 @@
+"""
+Testes da checagem de dono do UUID nas rotas com require_auth
+Uso: python -m pytest tests
+"""
+
+import os
+import sys
+import importlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    """app importado num diretório temporário (o banco usa caminho relativo)"""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(tmp_path_factory.mktemp('app'))
+        patch.setenv('PASSWORD_HASH_ITERATIONS', '1000')
+        patch.setenv('CACHE_WARMUP', '0')
+        patch.setenv('DB_MAINTENANCE_ENABLED', '0')
+        yield importlib.import_module('app')
+
+
+def bearer(app_module, user_id, plan='free'):
+    token, _ = app_module.session_tokens.issue(user_id, plan)
+    return {'Authorization': f'Bearer {token}'}
+
+
+def generate_uuid(client, headers):
+    response = client.post('/api/telegram/generate-uuid', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()['uuid']
+
+
+def test_other_account_gets_403_on_owned_uuid(app_module):
+    client = app_module.app.test_client()
+    alice = bearer(app_module, 'alice')
+    uuid_code = generate_uuid(client, alice)
+
+    response = client.get(f'/api/telegram/user-groups/{uuid_code}', headers=bearer(app_module, 'bob'))
+    assert response.status_code == 403
+    assert response.get_json()['success'] is False
+
+    # UUID no corpo JSON também é checado
+    response = client.post('/api/telegram/toggle-group-monitoring', headers=bearer(app_module, 'bob'),
+                           json={'uuid': uuid_code, 'group_id': 'demo_1', 'is_monitored': True})
+    assert response.status_code == 403
+
+    response = client.get(f'/api/telegram/user-groups/{uuid_code}', headers=alice)
+    assert response.status_code == 200
+
+
+def test_exempt_plans_reach_any_uuid(app_module):
+    client = app_module.app.test_client()
+    uuid_code = generate_uuid(client, bearer(app_module, 'alice'))
+
+    response = client.get(f'/api/telegram/user-groups/{uuid_code}',
+                          headers=bearer(app_module, 'ops', plan='admin'))
+    assert response.status_code == 200
+
+
+def test_invalid_token_is_401_when_auth_required(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'AUTH_REQUIRED', True)
+    client = app_module.app.test_client()
+
+    response = client.get('/api/telegram/user-groups/any', headers={'Authorization': 'Bearer v1.x.y'})
+    assert response.status_code == 401
+    assert response.headers['WWW-Authenticate'] == 'Bearer'
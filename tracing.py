@@ -0,0 +1,306 @@
+"""
+Tracing leve para o Backend NexoCrypto
+Spans de requisição, SQLite e HTTP com propagação do trace id para o userbot;
+traces amostrados são gravados em lotes num arquivo rotativo por worker
+"""
+
+import os
+import json
+import time
+import random
+import inspect
+import secrets
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from flask import request
+
+# (trace, id do span atual); None = requisição não amostrada
+_current = ContextVar('nexocrypto_trace', default=None)
+
+# Chave do environ WSGI que marca requisições despachadas pelo próprio app
+INTERNAL_REQUEST_KEY = 'nexocrypto.internal_request'
+
+
+class Trace:
+    __slots__ = ('trace_id', 'name', 'started_at', 'origin', 'spans', 'attrs')
+
+    def __init__(self, trace_id, name):
+        self.trace_id = trace_id
+        self.name = name
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        # (span_id, parent_id, nome, tipo, início_ms, duração_ms, atributos, erro)
+        self.spans = []
+        self.attrs = {}
+
+    def to_dict(self, duration_ms):
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'started_at': round(self.started_at, 3),
+            'duration_ms': round(duration_ms, 3),
+            'attrs': self.attrs,
+            'spans': [
+                {
+                    'span_id': span_id,
+                    'parent_id': parent_id,
+                    'name': name,
+                    'kind': kind,
+                    'start_ms': round(start_ms, 3),
+                    'duration_ms': round(span_ms, 3),
+                    'attrs': attrs,
+                    'error': error
+                }
+                for span_id, parent_id, name, kind, start_ms, span_ms, attrs, error in self.spans
+            ]
+        }
+
+
+class TraceSink:
+    """Grava traces finalizados em lotes (JSON por linha) com rotação por tamanho"""
+
+    def __init__(self, directory, batch_size=50, flush_interval=2.0,
+                 max_bytes=10 * 1024 * 1024, backup_count=3):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.flusher = None
+        self.pid = None
+
+    @property
+    def path(self):
+        # Um arquivo por worker: rotação sem disputa entre processos
+        return os.path.join(self.directory, f"traces_{os.getpid()}.jsonl")
+
+    def write(self, record):
+        with self.lock:
+            self.buffer.append(record)
+            full = len(self.buffer) >= self.batch_size
+        self._ensure_flusher()
+        if full:
+            self.flush()
+
+    def _ensure_flusher(self):
+        # Também recria a thread após fork
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.flusher = threading.Thread(target=self._flush_loop, daemon=True,
+                                            name='nexo-trace-sink')
+            self.flusher.start()
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self.pid == pid:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            batch, self.buffer = self.buffer, []
+            if not batch:
+                return
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                path = self.path
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in batch))
+                if os.path.getsize(path) > self.max_bytes:
+                    self._rotate(path)
+            except OSError as e:
+                print(f"Erro ao gravar traces: {e}")
+
+    def _rotate(self, path):
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{path}.{index + 1}")
+        os.replace(path, f"{path}.1")
+
+    def recent(self, min_duration_ms=0, limit=50, tail_bytes=512 * 1024):
+        """Traces recentes de todos os workers, mais lentos primeiro"""
+        self.flush()
+        traces = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+
+        for name in names:
+            if not name.endswith('.jsonl'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'rb') as f:
+                    f.seek(0, os.SEEK_END)
+                    size = f.tell()
+                    f.seek(max(0, size - tail_bytes))
+                    lines = f.read().splitlines()
+            except OSError:
+                continue
+            # Primeira linha pode estar cortada pelo seek
+            if size > tail_bytes:
+                lines = lines[1:]
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('duration_ms', 0) >= min_duration_ms:
+                    traces.append(record)
+
+        traces.sort(key=lambda r: r['duration_ms'], reverse=True)
+        return traces[:limit]
+
+
+def _is_hex(value):
+    try:
+        int(value, 16)
+    except ValueError:
+        return False
+    return True
+
+
+class Tracer:
+    def __init__(self, sample_rate=0.1, sink=None):
+        self.sample_rate = sample_rate
+        self.sink = sink
+
+    # Ciclo de vida do trace
+    def start_trace(self, name, trace_id=None, sampled=None):
+        """Inicia um trace no contexto atual; retorna None se não amostrado"""
+        if sampled is None:
+            sampled = self.sink is not None and random.random() < self.sample_rate
+        if not sampled or self.sink is None:
+            _current.set(None)
+            return None
+
+        trace = Trace(trace_id or secrets.token_hex(16), name)
+        _current.set((trace, None))
+        return trace
+
+    def finish_trace(self, **attrs):
+        state = _current.get()
+        _current.set(None)
+        if state is None:
+            return None
+
+        trace = state[0]
+        trace.attrs.update(attrs)
+        record = trace.to_dict((time.perf_counter() - trace.origin) * 1000)
+        self.sink.write(record)
+        return record
+
+    def current_trace_id(self):
+        state = _current.get()
+        return state[0].trace_id if state is not None else None
+
+    # Spans
+    @contextmanager
+    def span(self, name, kind='internal', **attrs):
+        """Mede o bloco como filho do span atual (no-op fora de traces amostrados)"""
+        state = _current.get()
+        if state is None:
+            yield None
+            return
+
+        trace, parent_id = state
+        span_id = secrets.token_hex(8)
+        token = _current.set((trace, span_id))
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            end = time.perf_counter()
+            _current.reset(token)
+            trace.spans.append((span_id, parent_id, name, kind,
+                                (start - trace.origin) * 1000, (end - start) * 1000,
+                                attrs, error))
+
+    def traced(self, name=None, kind='internal'):
+        """Decorator: cada chamada vira um span (funções síncronas e assíncronas)"""
+        def decorator(f):
+            span_name = name or f.__name__
+
+            if inspect.iscoroutinefunction(f):
+                @wraps(f)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name, kind):
+                        return await f(*args, **kwargs)
+                return async_wrapper
+
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, kind):
+                    return f(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record_span(self, name, kind, start, duration, **attrs):
+        """Adiciona um span já medido (ex.: instrumentação do SQLite)"""
+        state = _current.get()
+        if state is None:
+            return
+        trace, parent_id = state
+        trace.spans.append((secrets.token_hex(8), parent_id, name, kind,
+                            (start - trace.origin) * 1000, duration * 1000, attrs, None))
+
+    def outbound_headers(self):
+        """Headers para propagar o trace em chamadas HTTP de saída"""
+        state = _current.get()
+        if state is None:
+            return {}
+        trace, span_id = state
+        return {
+            'X-Trace-Id': trace.trace_id,
+            'traceparent': f"00-{trace.trace_id}-{span_id or '0' * 16}-01"
+        }
+
+    # Integração Flask
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        # Só sub-requisições internas (batch, aquecimento) decidem a amostragem:
+        # um cliente externo não pode forçar a gravação de traces
+        internal = request.environ.get(INTERNAL_REQUEST_KEY, False)
+        trace_id, sampled = None, None
+        traceparent = request.headers.get('traceparent', '')
+        parts = traceparent.split('-')
+        if len(parts) == 4 and len(parts[1]) == 32 and _is_hex(parts[1]):
+            # Id externo é mantido para correlação; a amostragem segue sample_rate
+            trace_id = parts[1]
+            if internal:
+                sampled = parts[3] == '01'
+        elif internal and request.headers.get('X-Trace-Id'):
+            # Trace id da requisição que originou a sub-requisição segue amostrado
+            trace_id, sampled = request.headers['X-Trace-Id'][:64], True
+
+        self.start_trace(f"{request.method} {request.path}", trace_id, sampled)
+
+    def _after_request(self, response):
+        trace_id = self.current_trace_id()
+        if trace_id:
+            response.headers['X-Trace-Id'] = trace_id
+            state = _current.get()
+            state[0].attrs['status'] = response.status_code
+        return response
+
+    def _teardown_request(self, exc=None):
+        if _current.get() is not None:
+            self.finish_trace(endpoint=request.endpoint,
+                              error=f"{type(exc).__name__}: {exc}" if exc else None)
+
+
+# Instância global (sink configurado em app.py)
+tracer = Tracer()
@@ -0,0 +1,120 @@
+"""
+Versões de dados por usuário para o Backend NexoCrypto
+Cada escrita nas linhas de um usuário incrementa sua versão, usada como ETag
+"""
+
+import time
+import zlib
+import sqlite3
+import threading
+from functools import wraps
+from flask import current_app, request, make_response
+
+
+class UserDataVersions:
+    def __init__(self, db_path, sync_interval=1.0, factory=sqlite3.Connection):
+        self.db_path = db_path
+        # Classe da conexão (ex.: ProfiledConnection para entrar no profiling de SQL)
+        self.factory = factory
+        # Intervalo em que a versão em memória é considerada válida sem
+        # consultar o SQLite (escritas feitas por outros workers)
+        self.sync_interval = sync_interval
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def _load(self, uuid_code):
+        conn = sqlite3.connect(self.db_path, timeout=10, factory=self.factory)
+        try:
+            row = conn.execute('SELECT version FROM user_data_versions WHERE uuid = ?',
+                               (uuid_code,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else 0
+
+    def get(self, uuid_code):
+        """Retorna a versão atual dos dados do usuário"""
+        entry = self.versions.get(uuid_code)
+        now = time.monotonic()
+        if entry is not None and now - entry[1] < self.sync_interval:
+            return entry[0]
+
+        version = self._load(uuid_code)
+        self.versions[uuid_code] = (version, now)
+        return version
+
+    def bump(self, uuid_code, cursor=None):
+        """Incrementa a versão do usuário (na mesma transação se `cursor` for passado)
+
+        Com `cursor`, a versão nova só vale em memória depois que o chamador
+        fizer commit e chamar bump_committed: antes disso uma requisição
+        concorrente geraria o ETag novo lendo os dados antigos.
+        """
+        conn = None
+        if cursor is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, factory=self.factory)
+            cursor = conn.cursor()
+
+        try:
+            cursor.execute('''
+                INSERT INTO user_data_versions (uuid, version) VALUES (?, 1)
+                ON CONFLICT(uuid) DO UPDATE SET version = version + 1
+            ''', (uuid_code,))
+            cursor.execute('SELECT version FROM user_data_versions WHERE uuid = ?',
+                           (uuid_code,))
+            version = cursor.fetchone()[0]
+            if conn is not None:
+                conn.commit()
+        finally:
+            if conn is not None:
+                conn.close()
+
+        if conn is not None:
+            self.bump_committed(uuid_code, version)
+        return version
+
+    def bump_committed(self, uuid_code, version):
+        """Publica em memória a versão retornada por bump() após o commit"""
+        with self.lock:
+            entry = self.versions.get(uuid_code)
+            # Nunca volta para uma versão anterior (commits concorrentes)
+            if entry is None or entry[0] <= version:
+                self.versions[uuid_code] = (version, time.monotonic())
+
+    def etag(self, uuid_code, scope):
+        """ETag da visão `scope` dos dados do usuário"""
+        etag = f"{scope}-v{self.get(uuid_code)}"
+        # Parâmetros como ?fields= mudam a representação
+        if request.query_string:
+            etag += f"-{zlib.crc32(request.query_string):08x}"
+        return etag
+
+    @staticmethod
+    def _is_success(response):
+        """Respostas de erro com status 200 ({'success': False}) não recebem ETag"""
+        body = response.get_json(silent=True) if response.is_json else None
+        return not (isinstance(body, dict) and body.get('success') is False)
+
+    def conditional(self, scope):
+        """Decorator que responde 304 quando a versão do usuário não mudou"""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                uuid_code = kwargs.get('uuid_code')
+
+                # ETag calculado antes da consulta: escritas concorrentes
+                # apenas invalidam a próxima requisição
+                etag = self.etag(uuid_code, scope)
+                if request.if_none_match.contains_weak(etag):
+                    response = current_app.response_class(status=304)
+                    response.set_etag(etag, weak=True)
+                    return response
+
+                response = make_response(f(*args, **kwargs))
+                # ETag fraco: identifica a versão dos dados, não os bytes (o
+                # ResponseCompressor comprime o corpo depois, conforme Accept-Encoding)
+                if response.status_code == 200 and self._is_success(response):
+                    response.set_etag(etag, weak=True)
+                return response
+
+            return decorated_function
+        return decorator
@@ -4,9 +4,11 @@ Endpoints do UserBot para integração com o backend
 import requests
 import json
 from flask import jsonify
+from tracing import tracer
 
 USERBOT_API_URL = "http://localhost:5003"
 
+@tracer.traced('userbot.start_userbot_session', kind='http')
 def start_userbot_session(uuid, phone_number):
     """Inicia sessão do userbot com telefone"""
     try:
@@ -15,6 +17,7 @@ def start_userbot_session(uuid, phone_number):
                                    "uuid": uuid,
                                    "phone_number": phone_number
                                }, 
+                               headers=tracer.outbound_headers(),
                                timeout=30)
         
         if response.status_code == 200:
@@ -30,6 +33,7 @@ def start_userbot_session(uuid, phone_number):
             "error": f"Erro de conexão com userbot: {str(e)}"
         }
 
+@tracer.traced('userbot.verify_userbot_code', kind='http')
 def verify_userbot_code(uuid, phone_number, code):
     """Verifica código de autorização do userbot"""
     try:
@@ -39,6 +43,7 @@ def verify_userbot_code(uuid, phone_number, code):
                                    "phone_number": phone_number,
                                    "code": code
                                }, 
+                               headers=tracer.outbound_headers(),
                                timeout=30)
         
         if response.status_code == 200:
@@ -54,10 +59,12 @@ def verify_userbot_code(uuid, phone_number, code):
             "error": f"Erro de conexão: {str(e)}"
         }
 
+@tracer.traced('userbot.get_userbot_groups', kind='http')
 def get_userbot_groups(uuid):
     """Obtém grupos do usuário via userbot"""
     try:
         response = requests.get(f"{USERBOT_API_URL}/api/userbot/user-groups/{uuid}", 
+                              headers=tracer.outbound_headers(),
                               timeout=30)
         
         if response.status_code == 200: